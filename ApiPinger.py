@@ -1,24 +1,190 @@
+# Importa asyncio para la tarea periódica del monitor de latencia
+import asyncio
+import time
+# Importa urlsplit para separar el host y el puerto de la URL
+from urllib.parse import urlsplit
 # Importa la biblioteca para hacer peticiones HTTP asíncronas
 import httpx
 # Importa el gestor de configuración para obtener la URL
 from ConfigManager import ConfigManager
 # Importa datetime para añadir marcas de tiempo a los logs
 from datetime import datetime
+# Importa los histogramas de latencia y el registro de métricas
+from LatencyHistogram import RollingHistogram
+from Metrics import metrics
+
+# Define la ruta del archivo de log
+LOG_PATH = "logs/logs.log"
+
+def _normalize_url(url):
+    # El valor 'ping' puede ser solo un host ("api.ejemplo.com");
+    # en ese caso se asume HTTPS.
+    if url and "://" not in url:
+        return f"https://{url}"
+    return url
+
+# Define una clase que mide la latencia de la API de forma continua.
+# Usa UN cliente HTTP reutilizable (con pool de conexiones) y separa
+# cada petición en fases: DNS, conexión TCP, TLS y tiempo hasta el
+# primer byte (TTFB). Cada fase tiene su propio histograma deslizante.
+class LatencyMonitor:
+    # Fases medidas por cada sonda
+    PHASES = ("dns", "connect", "tls", "ttfb", "total")
+
+    # Constructor de la clase
+    def __init__(self, window_seconds=900):
+        # Un histograma deslizante (p50/p95/p99) por fase
+        self.histograms = {phase: RollingHistogram(window_seconds) for phase in self.PHASES}
+        # Cliente HTTP compartido; se crea en la primera sonda
+        self._client = None
+        # Cliente pendiente de cerrar tras un cambio de host
+        self._client_to_close = None
+        # Contadores de sondas
+        self.probes = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_probe_at = None
+        # Si cambia el host en la configuración, se descarta el pool
+        # para no medir conexiones abiertas contra el host anterior.
+        ConfigManager.subscribe(self._on_config_change)
+
+    def _on_config_change(self, changes):
+        if "ping" in changes:
+            self._client_to_close, self._client = self._client, None
+
+    async def _get_client(self):
+        # Cierra el cliente anterior si la configuración cambió
+        old = self._client_to_close
+        if old is not None:
+            self._client_to_close = None
+            await old.aclose()
+        if self._client is None:
+            # 'httpx.AsyncClient' mantiene las conexiones abiertas (keep-alive)
+            # entre sondas, igual que lo hace la sincronización.
+            self._client = httpx.AsyncClient(timeout=5.0)
+        return self._client
+
+    async def probe(self, url=None):
+        """
+        Realiza una sonda HEAD contra la API y registra la duración de
+        cada fase. Devuelve (respuesta, tiempos) y lanza las excepciones
+        de httpx si la sonda falla.
+        """
+        url = _normalize_url(url or ConfigManager().get_ping())
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        timings = {}
+        marks = {}
+        loop = asyncio.get_running_loop()
+        self.probes += 1
+        self.last_probe_at = datetime.now().isoformat(timespec="seconds")
+
+        # 'trace' es un gancho de httpcore que se llama al inicio y al final
+        # de cada etapa de la petición; se guarda el instante de cada evento.
+        async def trace(event_name, info):
+            # Se quita el prefijo del protocolo ("http11." / "http2.")
+            name = event_name.split(".", 1)[1] if event_name.startswith("http") else event_name
+            marks[name] = time.perf_counter()
+
+        try:
+            # 1. DNS: se mide aparte, porque con un pool de conexiones
+            #    la resolución no ocurre en cada petición.
+            start = time.perf_counter()
+            try:
+                await loop.getaddrinfo(parts.hostname, port)
+            except OSError as e:
+                # Un fallo de DNS se trata como un fallo de conexión
+                raise httpx.ConnectError(f"No se pudo resolver {parts.hostname}: {e}") from e
+            timings["dns"] = time.perf_counter() - start
+
+            # 2. Petición HEAD sobre el cliente reutilizable.
+            client = await self._get_client()
+            start = time.perf_counter()
+            response = await client.head(url, extensions={"trace": trace})
+            timings["total"] = time.perf_counter() - start
+            response.raise_for_status()
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            raise
+
+        # 3. Conexión y TLS: solo existen si se abrió una conexión nueva.
+        for phase, event in (("connect", "connection.connect_tcp"), ("tls", "connection.start_tls")):
+            if f"{event}.started" in marks and f"{event}.complete" in marks:
+                timings[phase] = marks[f"{event}.complete"] - marks[f"{event}.started"]
+        # 4. TTFB: desde que se envían las cabeceras hasta que llegan las de la respuesta.
+        if "send_request_headers.started" in marks and "receive_response_headers.complete" in marks:
+            timings["ttfb"] = marks["receive_response_headers.complete"] - marks["send_request_headers.started"]
+
+        for phase, seconds in timings.items():
+            self.histograms[phase].record(seconds)
+        self.last_error = None
+        return response, timings
+
+    def summary(self):
+        """Devuelve los percentiles de cada fase y los contadores de sondas."""
+        return {
+            "probes": self.probes,
+            "failures": self.failures,
+            "last_probe_at": self.last_probe_at,
+            "last_error": self.last_error,
+            "phases": {phase: h.summary() for phase, h in self.histograms.items()},
+        }
+
+    def format_summary(self):
+        """Devuelve una tabla de texto con los percentiles por fase."""
+        lines = [f"{'Fase':<8}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for phase, data in self.summary()["phases"].items():
+            def cell(v):
+                return f"{v:>10.2f}" if v is not None else f"{'-':>10}"
+            lines.append(f"{phase:<8}{data['count']:>6}{cell(data['p50_ms'])}{cell(data['p95_ms'])}"
+                         f"{cell(data['p99_ms'])}{cell(data['max_ms'])}")
+        lines.append(f"Sondas: {self.probes}  Fallos: {self.failures}")
+        return "\n".join(lines)
+
+    def publish(self):
+        """Vuelca el resumen a la salida de métricas ('logs/metrics.json')."""
+        metrics.update("latency", self.summary())
+        metrics.write()
+
+    async def run(self, config_manager):
+        """
+        Tarea en segundo plano: lanza una sonda cada
+        'latency_probe_seconds' segundos y publica las métricas.
+        """
+        try:
+            while True:
+                try:
+                    await self.probe()
+                except Exception:
+                    # El fallo ya quedó contado en 'self.failures'
+                    pass
+                self.publish()
+                await asyncio.sleep(config_manager.get_latency_probe_interval())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            # Cierra el pool de conexiones al detener la tarea
+            if self._client is not None:
+                await self._client.aclose()
+                self._client = None
+
+# --- Instancia Global ---
+# Un único monitor compartido por la tarea en segundo plano y el menú.
+latency_monitor = LatencyMonitor()
 
 # Define una función asíncrona (corutina) para probar la conexión con la API
 async def ping_api(mostrar_en_pantalla: bool = False):
     """
     Realiza una petición HEAD a la API para comprobar si está en línea.
-    Registra el resultado en un archivo de log y, opcionalmente,
-    en la consola.
+    Registra el resultado (con el desglose de tiempos) en un archivo de
+    log y, opcionalmente, en la consola junto a los percentiles acumulados.
     """
-    
+
     # Crea una instancia del gestor de configuración
     config_manager = ConfigManager()
     # Obtiene la URL específica para el 'ping' desde la configuración
-    url = config_manager.get_ping()
-    # Define la ruta del archivo de log
-    log_path = "logs/logs.log"
+    url = _normalize_url(config_manager.get_ping())
 
     # Define una función anidada (helper) para centralizar el registro
     def log_message(msg: str):
@@ -26,12 +192,12 @@ async def ping_api(mostrar_en_pantalla: bool = False):
         timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
         # Crea el mensaje completo con la marca de tiempo
         mensaje = f"{timestamp} {msg}"
-        
+
         # Abre el archivo de log en modo 'append' (añadir al final)
-        with open(log_path, "a", encoding="utf-8") as log:
+        with open(LOG_PATH, "a", encoding="utf-8") as log:
             # Escribe el mensaje en el archivo
             log.write(mensaje + "\n")
-        
+
         # Si la función fue llamada con mostrar_en_pantalla=True...
         if mostrar_en_pantalla:
             # ...también imprime el mensaje en la consola
@@ -47,42 +213,42 @@ async def ping_api(mostrar_en_pantalla: bool = False):
 
     # Registra el inicio del intento de ping
     log_message(f"Haciendo ping a {url}...")
-    
+
     # Inicia un bloque try para capturar errores de red o de la API
     try:
-        # Crea un cliente HTTP asíncrono con un timeout de 5 segundos
-        # 'async with' asegura que el cliente se cierre correctamente
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            
-            # Realiza una petición 'HEAD' (await la hace asíncrona)
-            # 'HEAD' es más rápido que 'GET' porque solo pide las cabeceras,
-            # no el cuerpo de la respuesta. Es ideal para un ping.
-            response = await client.head(url)
-            
-            # Lanza una excepción si el código de estado es un error (ej. 404, 500)
-            response.raise_for_status()
-            
+        # Usa el monitor de latencia: la petición 'HEAD' reutiliza su pool
+        # de conexiones y queda registrada en los histogramas.
+        response, timings = await latency_monitor.probe(url)
+
         # Si 'raise_for_status()' no dio error, la conexión fue exitosa
         log_message(f"¡Éxito! Código de estado: {response.status_code}. La API está disponible.")
-    
+        detail = ", ".join(f"{phase}={seconds * 1000:.1f}ms" for phase, seconds in timings.items())
+        log_message(f"Tiempos: {detail}")
+
     # --- Manejo de Errores Específicos ---
-    
+
     # Captura el error si la conexión tarda más de 5 segundos
     except httpx.ConnectTimeout:
         log_message(f"Error: Timeout. No se pudo conectar a {url}.")
-    
+
     # Captura errores de conexión (ej. el servidor está apagado)
     except httpx.ConnectError:
         log_message(f"Error: Fallo de conexión. ¿Está el servidor corriendo en {url}?")
-    
+
     # Captura errores de estado HTTP (ej. 404 No Encontrado, 401 No Autorizado)
     except httpx.HTTPStatusError as e:
         log_message(f"Error: La API respondió con un error: {e}")
-    
+
     # Captura otros errores generales de la solicitud httpx
     except httpx.RequestError as e:
         log_message(f"Error: Ocurrió un error de solicitud: {type(e).__name__}")
-    
+
     # Captura cualquier otro error inesperado
     except Exception as e:
-        log_message(f"Error inesperado: {e}")
\ No newline at end of file
+        log_message(f"Error inesperado: {e}")
+
+    # Publica las métricas y muestra los percentiles acumulados
+    latency_monitor.publish()
+    if mostrar_en_pantalla:
+        print("\n--- Latencia de la API (últimos 15 min) ---")
+        print(latency_monitor.format_summary())
@@ -1,30 +1,52 @@
-# 'freeze_support' es necesario para que 'multiprocessing' (usado por SynchronyService)
-# funcione correctamente al crear un ejecutable especialmente en Windows.
-from multiprocessing import freeze_support
+import sys
+
+# --- Informe de Arranque (opcional) ---
+# Con 'python App.py --startup-report' se cronometra cada importación y el
+# tiempo hasta que el menú es visible (ver StartupProfiler.py). Se instala
+# ANTES del resto de importaciones para poder medirlas.
+_startup_profiler = None
+if __name__ == "__main__" and "--startup-report" in sys.argv:
+    sys.argv.remove("--startup-report")
+    import StartupProfiler
+    _startup_profiler = StartupProfiler.start()
+
+# --- Perfilado (opcional) ---
+# Con 'python App.py --profile' (o "profiling": true en 'config.json') cada
+# opción del menú, ciclo del descargador y sincronización se perfila con
+# cProfile y tracemalloc. Los informes quedan en 'logs/profiles' (ver Profiler.py).
+_profile_flag = __name__ == "__main__" and "--profile" in sys.argv
+if _profile_flag:
+    sys.argv.remove("--profile")
 
 # --- Importaciones de Componentes ---
-from Controllers.ContactsController import ContactsController
+# Solo se importa lo necesario para mostrar el menú. El resto (httpx,
+# multiprocessing, controladores, vistas de cada opción) se importa dentro
+# de la opción que lo usa, la primera vez que se elige.
 import asyncio
 import os
-from Controllers.SynchronyController import SynchronyController
-from Views.ListContactsView import list_contacts_view
-from Views.isLoadingView import is_loading
 from Views.MainMenuView import MainMenuView
+from Views.ScreenRenderer import screen
 from ConfigManager import ConfigManager
-import FileManager
-from ApiPinger import ping_api
 # Importa la instancia única del estado global
 from SharedState import global_state
 # Importa el módulo que contiene las corutinas de las tareas en segundo plano
 import BackgroundTasks
-from Views.ManageFileMenu import manage_files_menu
-from Views.ManageConfigMenuView import manage_config_menu
+# Importa la instancia única del perfilador
+from Profiler import profiler
+# Importa el monitor de salud del bucle de asyncio
+from LoopMonitor import loop_monitor
+# Importa el pool de procesos persistente de la sincronización
+from WorkerPool import worker_pool
 
 # --- Funciones de Utilidad ---
 
 def clear():
-    """Función de utilidad para limpiar la consola."""
-    os.system("cls" if os.name == "nt" else "clear")
+    """
+    Función de utilidad para limpiar la consola.
+    Usa secuencias ANSI (ver Views/ScreenRenderer.py) en lugar de
+    'os.system("clear")', que creaba un proceso en cada llamada.
+    """
+    screen.clear()
 
 async def blocking_input(prompt):
     """
@@ -49,6 +71,8 @@ def list_contacts():
     leen archivos de forma bloqueante.
     Será llamada usando 'run_in_executor'.
     """
+    from Controllers.ContactsController import ContactsController
+    from Views.ListContactsView import list_contacts_view
     contacts_controller = ContactsController()
     contacts = contacts_controller.get_all_contacts()
     list_contacts_view(contacts)
@@ -63,18 +87,20 @@ async def selectMenu(option, config_manager):
         clear()
         # Ejecuta la función síncrona 'list_contacts' en un hilo
         # para no bloquear el bucle de asyncio.
-        await asyncio.get_event_loop().run_in_executor(None, list_contacts)
+        await asyncio.get_event_loop().run_in_executor(None, profiler.wrap(list_contacts))
         await blocking_input("\nPresione Enter para volver al menú...")
     
     elif option == 2:
         clear()
+        from Controllers.SynchronyController import SynchronyController
+        from Views.isLoadingView import is_loading
         s_controller = SynchronyController()
         print("Iniciando sincronización manual...")
 
         # Llama al 'wrapper' asíncrono 'is_loading'.
         # 'is_loading' ejecutará 's_controller.synchronize' (que es bloqueante)
         # en un hilo separado, mostrando "Cargando..." mientras tanto.
-        response = await is_loading(s_controller.synchronize)
+        response = await is_loading(profiler.wrap(s_controller.synchronize))
         print("\n" + response)
         
         # Después de sincronizar, fuerza una actualización de la lista de archivos
@@ -85,20 +111,35 @@ async def selectMenu(option, config_manager):
     
     elif option == 3:
         # Llama a la corutina del submenú de gestión de archivos.
+        import FileManager
+        from Views.ManageFileMenu import manage_files_menu
         await manage_files_menu(clear, global_state, blocking_input, FileManager, BackgroundTasks)
         
     elif option == 4:
         # Llama a la corutina del submenú de configuración.
+        from Views.ManageConfigMenuView import manage_config_menu
         await manage_config_menu(config_manager, clear, blocking_input)
     
     elif option == 5:
         clear()
         # Llama a la corutina de 'ping_api', pasándole 'True'
         # para que imprima los resultados en la pantalla.
+        from ApiPinger import ping_api
         await ping_api(True)
         await blocking_input("\nPresione Enter para volver al menú...")
         
     elif option == 6:
+        clear()
+        # Las estadísticas leen los archivos de 'db' (bloqueante): en un hilo.
+        from Controllers.AnalyticsController import AnalyticsController
+        from Views.AnalyticsView import analytics_view
+        print("Calculando estadísticas...")
+        summary = await asyncio.get_event_loop().run_in_executor(
+            None, profiler.wrap(AnalyticsController().get_summary))
+        analytics_view(summary)
+        await blocking_input("\nPresione Enter para volver al menú...")
+        
+    elif option == 7:
         clear()
         print("Saliendo...")
         # Devuelve 'False' para indicar al bucle principal que debe detenerse.
@@ -107,6 +148,20 @@ async def selectMenu(option, config_manager):
     # Devuelve 'True' para indicar al bucle principal que continúe.
     return True 
 
+async def run_latency_monitor(config):
+    """
+    Tarea en segundo plano del monitor de latencia. Importa ApiPinger (y
+    con él httpx) cuando la tarea empieza, es decir, con el menú ya visible.
+    """
+    from ApiPinger import latency_monitor
+    await latency_monitor.run(config)
+
+def _finish_startup_report():
+    # Registra "menú visible" y escribe el informe en 'logs'.
+    path = _startup_profiler.finish()
+    if path:
+        print(f"\n[Informe de arranque guardado en '{path}']")
+
 # --- Punto de Entrada Principal (Asíncrono) ---
 
 async def main():
@@ -117,6 +172,20 @@ async def main():
     os.makedirs("db", exist_ok=True)
     os.makedirs("logs", exist_ok=True)
     config = ConfigManager()
+    profiler.configure(config, force=_profile_flag)
+    # El ejecutor medido debe instalarse antes del primer 'run_in_executor'.
+    loop_monitor.install()
+    # El pool se crea una vez aquí (sin procesos todavía: se crean en la
+    # primera sincronización y después se reutilizan).
+    worker_pool.start(config)
+    if _startup_profiler:
+        _startup_profiler.mark("configuración cargada")
+    
+    # El informe de arranque se cierra justo después de dibujar el menú:
+    # 'call_soon' se ejecuta cuando el menú queda esperando la entrada y,
+    # al registrarse ANTES de crear las tareas, también antes que ellas.
+    if _startup_profiler:
+        asyncio.get_running_loop().call_soon(_finish_startup_report)
     
     # --- LANZAR TAREAS EN SEGUNDO PLANO ---
     print("Iniciando tareas en segundo plano...")
@@ -127,10 +196,13 @@ async def main():
     downloader_task = asyncio.create_task(BackgroundTasks.run_downloader(config))
     # Tarea 2: El vigilante de archivos (ej. cada 5 seg)
     watcher_task = asyncio.create_task(BackgroundTasks.run_file_watcher())
-    
-    # Da un breve momento para que las tareas se inicien
-    # (y actualicen la lista inicial de archivos)
-    await asyncio.sleep(1) 
+    # Tarea 3: El monitor de latencia de la API (ej. cada 30 seg)
+    latency_task = asyncio.create_task(run_latency_monitor(config))
+    # Tarea 4: El monitor del bucle (retraso, bloqueos y ejecutor)
+    loop_task = asyncio.create_task(loop_monitor.run())
+    # No hace falta esperar a las tareas: empiezan en cuanto el menú pide
+    # la primera opción, y el menú de archivos se redibuja solo cuando
+    # el vigilante publica la lista inicial.
     
     # --- BUCLE PRINCIPAL DEL MENÚ ---
     while True:
@@ -138,10 +210,11 @@ async def main():
         # Llama a la vista del menú (que usa 'blocking_input' asíncrono)
         option = await MainMenuView(clear, blocking_input)
         
-        # Llama al 'router' del menú
-        keep_running = await selectMenu(option, config)
+        # Llama al 'router' del menú (perfilado si está activo)
+        with profiler.session(f"menu_{option}"):
+            keep_running = await selectMenu(option, config)
         
-        # Si 'selectMenu' (Opción 6) devolvió 'False', rompe el bucle.
+        # Si 'selectMenu' (Opción 7) devolvió 'False', rompe el bucle.
         if not keep_running:
             break
     
@@ -151,13 +224,28 @@ async def main():
     # permitiéndoles un cierre limpio (como se ve en sus bucles 'try...except').
     downloader_task.cancel()
     watcher_task.cancel()
+    latency_task.cancel()
+    loop_task.cancel()
+    # Detiene los procesos del pool (en un hilo: espera a que terminen)
+    await asyncio.get_running_loop().run_in_executor(None, worker_pool.shutdown)
 
     print("Aplicación cerrada.")
 
 # --- Bloque de Ejecución ---
 if __name__ == "__main__":
-    # Llama a 'freeze_support()' al inicio, por si la app es compilada.
-    freeze_support()
+    # 'freeze_support' es necesario para que 'multiprocessing' (usado por
+    # SynchronyService) funcione al crear un ejecutable, especialmente en
+    # Windows. Solo se importa si la app está compilada.
+    if getattr(sys, "frozen", False):
+        from multiprocessing import freeze_support
+        freeze_support()
+    if _startup_profiler:
+        _startup_profiler.mark("importaciones de App.py")
+    # Con argumentos (ej. 'python App.py list --json') se usa el modo de
+    # línea de comandos, sin menú. Ver Cli.py.
+    if len(sys.argv) > 1:
+        import Cli
+        sys.exit(Cli.main(["--profile", *sys.argv[1:]] if _profile_flag else None))
     try:
         # 'asyncio.run(main())' es la forma moderna de iniciar
         # una aplicación asyncio. Crea el bucle de eventos,
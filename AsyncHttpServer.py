@@ -0,0 +1,165 @@
+# AsyncHttpServer.py
+# Servidor HTTP/1.1 mínimo sobre 'asyncio' (solo librería estándar).
+# Lo usan la API local de consulta (QueryApiServer.py) y las herramientas
+# de pruebas. Soporta conexiones persistentes (keep-alive), HEAD y cuerpos
+# con 'Content-Length'. No soporta 'chunked' en las peticiones.
+import asyncio
+import json
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs, unquote
+
+# Límites de seguridad para las peticiones
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+# Segundos que se mantiene abierta una conexión sin peticiones
+KEEP_ALIVE_TIMEOUT = 15
+
+# Define una clase con los datos de una petición ya analizada.
+class Request:
+    __slots__ = ("method", "target", "path", "query", "headers", "body")
+
+    # Constructor de la clase
+    def __init__(self, method, target, headers, body=b""):
+        self.method = method
+        self.target = target
+        parts = urlsplit(target)
+        self.path = unquote(parts.path)
+        # {parámetro: último valor} (ej. "?page=2" -> {"page": "2"})
+        self.query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        # Cabeceras con el nombre en minúsculas
+        self.headers = headers
+        self.body = body
+
+# Define una clase con los datos de una respuesta.
+class Response:
+    __slots__ = ("status", "body", "headers", "chunks")
+
+    # Constructor de la clase
+    # 'chunks' (opcional) es una función que recibe el cuerpo y devuelve un
+    # iterador asíncrono de bloques: permite enviarlo poco a poco (ej. para
+    # simular un ancho de banda limitado). 'Content-Length' sigue siendo
+    # la longitud de 'body'.
+    def __init__(self, status=200, body=b"", headers=None, chunks=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+        self.chunks = chunks
+
+def json_response(data, status=200, headers=None):
+    """Crea una respuesta JSON (UTF-8)."""
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    headers = dict(headers or {})
+    headers.setdefault("Content-Type", "application/json; charset=utf-8")
+    return Response(status, body, headers)
+
+def error_response(status, message=None):
+    """Crea una respuesta de error en JSON: {"error": mensaje}."""
+    return json_response({"error": message or HTTPStatus(status).phrase}, status)
+
+# Define la clase HttpServer: acepta conexiones y llama a 'handler(request)'.
+# 'handler' es una corutina que devuelve un 'Response'.
+class HttpServer:
+
+    # Constructor de la clase
+    def __init__(self, handler, host="127.0.0.1", port=8765):
+        self._handler = handler
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        """Empieza a escuchar. Si 'port' es 0 se elige uno libre (ver 'self.port')."""
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        """Deja de aceptar conexiones y espera a que se cierre el servidor."""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self):
+        """Arranca (si hace falta) y atiende peticiones hasta que se cancele."""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    # --- Conexiones ---
+
+    async def _read_request(self, reader):
+        # Lee y analiza una petición. Devuelve None si el cliente cerró.
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            return None
+        except asyncio.LimitOverrunError:
+            raise ValueError("Cabeceras demasiado grandes")
+        if len(head) > MAX_HEADER_BYTES:
+            raise ValueError("Cabeceras demasiado grandes")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            raise ValueError("Línea de petición inválida")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        if version == "HTTP/1.0" and headers.get("connection", "").lower() != "keep-alive":
+            headers.setdefault("connection", "close")
+        length = int(headers.get("content-length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Cuerpo demasiado grande")
+        body = await reader.readexactly(length) if length else b""
+        return Request(method.upper(), target, headers, body)
+
+    async def _serve_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError) as e:
+                    await self._write(writer, error_response(400, str(e)), head_only=False, close=True)
+                    break
+                if request is None:
+                    break
+                try:
+                    response = await self._handler(request)
+                except Exception as e:
+                    # Un error en el manejador no debe tumbar el servidor.
+                    response = error_response(500, f"{type(e).__name__}: {e}")
+                close = request.headers.get("connection", "").lower() == "close"
+                await self._write(writer, response, request.method == "HEAD", close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write(writer, response, head_only, close):
+        # Escribe la respuesta completa (cabeceras + cuerpo) de una vez.
+        try:
+            phrase = HTTPStatus(response.status).phrase
+        except ValueError:
+            phrase = "Unknown"
+        headers = dict(response.headers)
+        headers["Content-Length"] = str(len(response.body))
+        headers["Connection"] = "close" if close else "keep-alive"
+        head = f"HTTP/1.1 {response.status} {phrase}\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write((head + "\r\n").encode("latin-1"))
+        if not head_only and response.status not in (204, 304):
+            if response.chunks is None:
+                writer.write(response.body)
+            else:
+                await writer.drain()
+                async for chunk in response.chunks(response.body):
+                    writer.write(chunk)
+                    await writer.drain()
+        await writer.drain()
@@ -3,8 +3,11 @@ import os
 import time
 # Importa las clases necesarias
 from ConfigManager import ConfigManager
-from Services.SynchronyService import SynchronyService
 from SharedState import global_state # Importa el objeto de estado global
+# Importa el catálogo de archivos (tamaño, fecha, registros, hash)
+from FileCatalog import file_catalog
+# Perfilado opcional de cada ciclo del descargador
+from Profiler import profiler
 
 # Define las rutas como constantes
 DB_PATH = "db"
@@ -17,49 +20,92 @@ async def run_downloader(config_manager):
     descargar nuevos datos de la API.
     """
     log = None # Inicializa la variable del archivo log
+    on_config_change = None # Suscriptor de cambios de configuración
+    profile_sync = None # Sincronización de varios perfiles (si hay)
     try:
         # Abre el archivo de log en modo 'append' (añadir al final)
-        with open(f"{LOGS_PATH}\\logs.log", 'a', encoding='utf-8') as log:
+        with open(os.path.join(LOGS_PATH, "logs.log"), 'a', encoding='utf-8') as log:
             
-            # Instancia el servicio que contiene la lógica de sincronización
+            # Instancia el servicio que contiene la lógica de sincronización.
+            # Se importa aquí (y no al cargar el módulo) porque arrastra httpx
+            # y multiprocessing, que no hacen falta para mostrar el menú.
+            from Services.SynchronyService import SynchronyService
+            from Services.ProfileSyncService import ProfileSyncService
             s_service = SynchronyService()
+            # Con perfiles adicionales en 'config.json', todos se sincronizan
+            # a la vez en este proceso, con un pool de conexiones compartido.
+            profile_sync = ProfileSyncService(config_manager)
             # Obtiene el bucle de eventos de asyncio
             loop = asyncio.get_event_loop()
             log.write("[Downloader] Tarea de descarga automática iniciada.\n")
             log.flush() # Asegura que se escriba en el disco
+
+            # Evento que despierta la espera cuando cambia el intervalo.
+            # El aviso puede llegar desde otro hilo (ej. el menú de
+            # configuración), por eso se usa 'call_soon_threadsafe'.
+            interval_changed = asyncio.Event()
+
+            def on_config_change(changes):
+                if "download_interval_minutes" in changes:
+                    loop.call_soon_threadsafe(interval_changed.set)
+
+            config_manager.subscribe(on_config_change)
+            # Momento de referencia para calcular la próxima ejecución.
+            last_run = loop.time()
             
             # Bucle principal: se ejecuta indefinidamente hasta que se cancele
             while True:
                 try:
-                    # 1. Obtener el intervalo desde el config
-                    # Se obtiene DENTRO del bucle, para que los cambios de config
-                    # se apliquen en la siguiente iteración.
+                    # 1. Obtener el intervalo desde el config (en memoria)
                     interval_min = config_manager.get_download_interval()
                     log.write(f"[Downloader] Próxima ejecución en {interval_min} minutos...\n")
                     log.flush()
                     
-                    # 3. Dormir (de forma no bloqueante)
-                    # La primera vez duerme antes de ejecutar.
-                    # 'asyncio.sleep' pausa esta tarea, pero permite que otras
-                    # (como la UI) sigan funcionando.
-                    await asyncio.sleep(interval_min * 60)
+                    # 2. Dormir (de forma no bloqueante) hasta la próxima ejecución
+                    # o hasta que el intervalo cambie. En ese caso se vuelve a
+                    # calcular la espera con el nuevo valor, sin sondear el archivo.
+                    remaining = last_run + interval_min * 60 - loop.time()
+                    if remaining > 0:
+                        interval_changed.clear()
+                        try:
+                            await asyncio.wait_for(interval_changed.wait(), remaining)
+                            log.write("[Downloader] Intervalo de descarga modificado.\n")
+                            log.flush()
+                            continue # Recalcula la espera con el nuevo intervalo
+                        except asyncio.TimeoutError:
+                            pass # Se cumplió el intervalo
                     
                     log.write(f"\n[Downloader] {time.strftime('%H:%M:%S')} - Iniciando descarga automática...\n")
                     log.flush()
                     
-                    # 2. Ejecutar la sincronización (que es bloqueante) en un hilo
-                    # 's_service.run_process' es una función normal (síncrona)
-                    # 'loop.run_in_executor' la ejecuta en un hilo separado
-                    # para no congelar el bucle de asyncio.
-                    await loop.run_in_executor(None, s_service.run_process)
-                    
-                    # 3. Forzar a la otra tarea (File Watcher) a que se actualice
-                    # para que el usuario vea los nuevos archivos de timestamp
-                    # (Esta función también debe estar definida en el mismo contexto)
-                    await run_file_watcher(force_update=True)
+                    # Con el perfilado activo, el ciclo completo (sincronización
+                    # y actualización del catálogo) se mide como una sesión.
+                    with profiler.session("downloader"):
+                        # (los perfiles omitidos por mal configurados también
+                        # pasan por aquí, para que su error quede en el log)
+                        if len(config_manager.get_profiles()) > 1 or config_manager.get_invalid_profiles():
+                            # 2a. Varios perfiles: se descargan a la vez en el bucle
+                            # (cada uno guarda sus archivos en un hilo).
+                            done, errors = await profile_sync.sync_all()
+                            for name, message in done.items():
+                                log.write(f"[Downloader] [{name}] {message}\n")
+                            for name, error in errors.items():
+                                log.write(f"[Downloader] [{name}] Error: {error}\n")
+                            log.flush()
+                        else:
+                            # 2. Ejecutar la sincronización (que es bloqueante) en un hilo
+                            # 's_service.run_process' es una función normal (síncrona)
+                            # 'loop.run_in_executor' la ejecuta en un hilo separado
+                            # para no congelar el bucle de asyncio.
+                            await loop.run_in_executor(None, profiler.wrap(s_service.run_process))
+                        
+                        # 3. Actualizar la lista de archivos y el catálogo
+                        # para que el usuario vea los nuevos archivos de timestamp
+                        await refresh_file_list_once()
                     
                     log.write(f"[Downloader] {time.strftime('%H:%M:%S')} - Descarga automática completada.\n")
                     log.flush()
+                    last_run = loop.time()
                     
                 # Se lanza si la tarea es cancelada (ej. al salir de la app)
                 except asyncio.CancelledError:
@@ -73,22 +119,46 @@ async def run_downloader(config_manager):
                     log.flush()
                     # Esperar un poco antes de reintentar en caso de error
                     await asyncio.sleep(60)
+                    last_run = loop.time()
                     
     except IOError as e:
         # Error si no se puede abrir el archivo de log
         print(f"Error al Guardar Logs {e}")
     finally:
+        # Deja de escuchar los cambios de configuración
+        if on_config_change:
+            config_manager.unsubscribe(on_config_change)
+        # Cierra el pool de conexiones compartido de los perfiles
+        if profile_sync:
+            await profile_sync.aclose()
         # Se asegura de cerrar el archivo de log si se abrió
         if log:
             log.close()
 
+def _scan_db():
+    """
+    Función BLOQUEANTE (se ejecuta en un hilo): lista los archivos '.json'
+    de 'db' y actualiza el catálogo. Solo se vuelven a leer los archivos
+    cuyo tamaño o 'mtime' cambiaron.
+    Devuelve (lista ordenada de archivos, conjunto de archivos cambiados).
+    """
+    # Solo archivos: las carpetas de los perfiles (ej. 'db/acme') no cuentan
+    files = sorted(f for f in os.listdir(DB_PATH)
+                   if f.endswith('.json') and os.path.isfile(os.path.join(DB_PATH, f)))
+    changed = file_catalog.refresh(files)
+    # Si cambió algún archivo, la caché de datasets se vacía si ya no
+    # coincide con lo que hay en disco (ej. un archivo editado a mano).
+    if changed:
+        global_state.validate_datasets(file_catalog.get)
+    return files, changed
+
 # Define la segunda tarea en segundo plano
 async def run_file_watcher(force_update=False):
     log = None
     try:
         # Abre el log en modo escritura ('w'), borrando el contenido anterior.
         # (Esto puede ser intencional o un bug, el downloader usa 'a')
-        with open(f"{LOGS_PATH}\\logs.log", "w", encoding="utf-8") as log:
+        with open(os.path.join(LOGS_PATH, "logs.log"), "w", encoding="utf-8") as log:
             """
             Tarea en segundo plano: vigila el directorio 'db' 
             y actualiza el estado global.
@@ -102,20 +172,16 @@ async def run_file_watcher(force_update=False):
             # Bucle principal de la tarea
             while True:
                 try:
-                    # 1. Obtener la lista de archivos (es I/O bloqueante)
-                    # 'os.listdir' es síncrono. Se ejecuta en un hilo.
-                    # 'lambda' se usa para pasar la función al ejecutor.
-                    files = await loop.run_in_executor(
-                        None, 
-                        lambda: [f for f in os.listdir(DB_PATH) if f.endswith('.json')]
-                    )
-                    files.sort() # Ordenar para que la comparación sea fiable
+                    # 1. Obtener la lista de archivos y actualizar el catálogo
+                    # (es I/O bloqueante, se ejecuta en un hilo).
+                    files, changed = await loop.run_in_executor(None, _scan_db)
 
                     # 2. Actualizar el estado global SOLO si hay cambios
-                    # O si otra tarea (el downloader) ha forzado la actualización.
-                    if files != last_files or force_update:
-                        # Actualiza el objeto de estado compartido
-                        global_state.set_files(files)
+                    # (archivos nuevos/eliminados o metadatos del catálogo)
+                    # O si se ha forzado la actualización.
+                    if files != last_files or changed or force_update:
+                        # Actualiza el objeto de estado compartido (nueva versión)
+                        global_state.set_files(files, force=bool(changed) or force_update)
                         # Actualiza la caché local
                         last_files = files
                         
@@ -150,13 +216,9 @@ async def refresh_file_list_once():
     """
     try:
         loop = asyncio.get_event_loop()
-        # Obtiene la lista de archivos (bloqueante, en un hilo)
-        files = await loop.run_in_executor(
-            None,
-            lambda: [f for f in os.listdir(DB_PATH) if f.endswith('.json')]
-        )
-        files.sort()
-        # Establece el estado global inicial
-        global_state.set_files(files)
+        # Obtiene la lista de archivos y actualiza el catálogo (bloqueante, en un hilo)
+        files, changed = await loop.run_in_executor(None, _scan_db)
+        # Establece el estado global (nueva versión solo si algo cambió)
+        global_state.set_files(files, force=bool(changed))
     except Exception as e:
         print(f"[FileWatcher] Error al actualizar archivos una vez: {e}")
\ No newline at end of file
@@ -0,0 +1,83 @@
+# Benchmarks/DatasetGenerator.py
+# Genera datos sintéticos con la MISMA forma que devuelve la API:
+#   contacts.json          -> {"Num Contactos": N, "contactos": [{email, id, name}, ...]}
+#   clients.json           -> {"Clientes": [...], "Num clientes": N}
+#   featured_clients.json  -> {"Clientes destacados": [...]}
+# Uso: python -m Benchmarks.DatasetGenerator --contacts 100000 --output db
+import argparse
+import json
+import os
+import random
+
+# Piezas para construir nombres y dominios "realistas" (con tildes y eñes)
+FIRST_NAMES = ("Ana", "Íñigo", "María", "José", "Lucía", "Jon", "Nerea", "Álvaro", "Ainhoa",
+               "Carlos", "Begoña", "Raúl", "Sofía", "Mikel", "Elena", "Andrés", "Irene", "Unai")
+LAST_NAMES = ("García", "Méndez", "Etxeberria", "López", "Martínez", "Zubizarreta", "Núñez",
+              "Fernández", "Aguirre", "Sánchez", "Ibáñez", "Ortiz", "Goikoetxea", "Pérez")
+COMPANY_WORDS = ("Soluciones", "Grupo", "Industrias", "Servicios", "Tecnologías", "Logística",
+                 "Consultores", "Distribuciones", "Talleres", "Innovación")
+COMPANY_SUFFIXES = ("S.L.", "S.A.", "LTDA", "Coop.", "SL")
+DOMAINS = ("example.com", "gmail.com", "empresa.es", "lhusurbil.eus", "correo.net")
+
+def _contact(rng, contact_id):
+    # Un contacto: persona o empresa. Una pequeña parte viene sin email o
+    # sin nombre ('False'), como ocurre en la API real.
+    if rng.random() < 0.3:
+        name = f"{rng.choice(COMPANY_WORDS)} {rng.choice(LAST_NAMES)} {rng.choice(COMPANY_SUFFIXES)}"
+    else:
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}"
+    user = name.lower().split()[0].strip(".")
+    email = f"{user}{contact_id}@{rng.choice(DOMAINS)}"
+    if rng.random() < 0.02:
+        email = False
+    if rng.random() < 0.01:
+        name = False
+    return {"email": email, "id": contact_id, "name": name}
+
+def generate(contacts, client_ratio=0.3, featured_ratio=0.05, seed=42):
+    """
+    Devuelve (contactos, clientes, destacados) como diccionarios con la forma
+    de la API. Los clientes son un subconjunto de los contactos y los
+    destacados un subconjunto de los clientes. Con la misma 'seed' el
+    resultado es siempre el mismo.
+    """
+    rng = random.Random(seed)
+    records = [_contact(rng, contact_id) for contact_id in rng.sample(range(1, contacts * 10 + 1), contacts)]
+    clients = [r for r in records if rng.random() < client_ratio]
+    featured = [r for r in clients if rng.random() < featured_ratio / max(client_ratio, 1e-9)]
+    return (
+        {"Num Contactos": len(records), "contactos": records},
+        {"Clientes": clients, "Num clientes": len(clients)},
+        {"Clientes destacados": featured},
+    )
+
+def write_dataset(db_path, contacts, **kwargs):
+    """
+    Genera los tres archivos en 'db_path' (con el mismo formato que
+    guarda la sincronización: 'indent=2'). Devuelve (contactos, clientes, destacados).
+    """
+    os.makedirs(db_path, exist_ok=True)
+    data = generate(contacts, **kwargs)
+    for name, payload in zip(("contacts.json", "clients.json", "featured_clients.json"), data):
+        with open(os.path.join(db_path, name), "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+    return data
+
+def main(argv=None):
+    """Punto de entrada de línea de comandos."""
+    parser = argparse.ArgumentParser(description="Genera un dataset sintético de contactos/clientes.")
+    parser.add_argument("--contacts", type=int, default=1000, help="Número de contactos (ej. 1000 a 1000000)")
+    parser.add_argument("--client-ratio", type=float, default=0.3, help="Proporción de contactos que son clientes")
+    parser.add_argument("--featured-ratio", type=float, default=0.05, help="Proporción de contactos destacados")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla (mismo valor = mismos datos)")
+    parser.add_argument("--output", default="db", help="Directorio de salida")
+    args = parser.parse_args(argv)
+    contacts, clients, featured = write_dataset(args.output, args.contacts, client_ratio=args.client_ratio,
+                                                featured_ratio=args.featured_ratio, seed=args.seed)
+    print(f"Generados {contacts['Num Contactos']} contactos, {clients['Num clientes']} clientes y "
+          f"{len(featured['Clientes destacados'])} destacados en '{args.output}'.")
+    return 0
+
+# --- Bloque de Ejecución ---
+if __name__ == "__main__":
+    raise SystemExit(main())
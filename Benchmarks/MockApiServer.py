@@ -0,0 +1,325 @@
+# Benchmarks/MockApiServer.py
+# Sustituto local de la API para medir (y someter a carga) la sincronización
+# sin red. Implementa las rutas que usa SynchronyRepository:
+#   POST /login                -> {"token": ...}
+#   GET  /clientes             -> clients.json
+#   GET  /clientes/destacados  -> featured_clients.json
+#   GET  /contactos            -> contacts.json
+#
+# Opciones para simular condiciones reales (ver 'MockConfig'):
+# - Tamaño de los datos (número de contactos y relleno por registro).
+# - Latencia por petición con una distribución (const, uniform, normal, lognormal).
+# - Ancho de banda máximo por respuesta.
+# - Tasa de errores (500/503) y caducidad de los tokens (401).
+# - ETag / If-None-Match (304) y paginación opcional (?page=&per_page=).
+# - Cambios periódicos en los datos (para forzar escrituras en cada sync).
+#
+# Uso: python -m Benchmarks.MockApiServer --port 8080 --contacts 100000 \
+#          --latency lognormal:80:0.5 --bandwidth-kbps 4000 --error-rate 0.02 --token-ttl 60
+# Y en config.json: "api_url": "http://127.0.0.1:8080"
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+
+# Raíz del proyecto (para importar los módulos de la app desde cualquier cwd)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from AsyncHttpServer import HttpServer, Response, json_response, error_response
+
+# Clave del array de registros de cada ruta
+RECORD_KEYS = {"/contactos": "contactos", "/clientes": "Clientes", "/clientes/destacados": "Clientes destacados"}
+# Tamaño de los bloques al limitar el ancho de banda
+CHUNK_BYTES = 16 * 1024
+
+# Define una clase con un modelo de latencia: "tipo:param1:param2" (en ms).
+class LatencyModel:
+
+    # Constructor de la clase
+    def __init__(self, spec="const:0", seed=None):
+        self.spec = spec
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        self._rng = random.Random(seed)
+        if kind not in ("const", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Distribución de latencia desconocida: {kind}")
+
+    def sample(self):
+        """Devuelve una latencia en SEGUNDOS."""
+        p = self.params
+        if self.kind == "const":
+            ms = p[0] if p else 0.0
+        elif self.kind == "uniform":      # uniform:mín:máx
+            ms = self._rng.uniform(p[0], p[1])
+        elif self.kind == "normal":       # normal:media:desviación
+            ms = self._rng.gauss(p[0], p[1])
+        else:                             # lognormal:mediana:sigma (cola larga)
+            ms = p[0] * self._rng.lognormvariate(0.0, p[1])
+        return max(0.0, ms) / 1000
+
+# Define una clase con toda la configuración de la simulación.
+class MockConfig:
+
+    # Constructor de la clase
+    def __init__(self, latency="const:0", bandwidth_kbps=0, error_rate=0.0, error_status=503,
+                 token_ttl=0, record_padding=0, seed=None):
+        self.latency = LatencyModel(latency, seed)
+        # Ancho de banda por respuesta en kilobytes/s (0 = sin límite)
+        self.bandwidth_kbps = bandwidth_kbps
+        # Proporción de GET que fallan con 'error_status'
+        self.error_rate = error_rate
+        self.error_status = error_status
+        # Segundos de validez de cada token (0 = no caducan)
+        self.token_ttl = token_ttl
+        # Bytes de relleno añadidos a cada registro (para inflar las respuestas)
+        self.record_padding = record_padding
+        self.rng = random.Random(seed)
+
+# Define la clase MockApi: guarda los datos y responde a las peticiones.
+class MockApi:
+
+    # Constructor de la clase
+    def __init__(self, contacts, clients, featured, config=None, token=None):
+        self.config = config or MockConfig()
+        # Token fijo (opcional): útil para pruebas deterministas
+        self._fixed_token = token
+        # Tokens emitidos: {token: momento de caducidad o None}
+        self._tokens = {}
+        # Datos, cuerpos ya serializados y ETags por ruta
+        self._data = {}
+        self._bodies = {}
+        self._etags = {}
+        self.set_data(contacts, clients, featured)
+        # Estadísticas: peticiones por ruta y por código de estado
+        self.requests = {}
+        self.statuses = {}
+
+    def set_data(self, contacts, clients, featured):
+        """Reemplaza los datos servidos (ej. para simular un cambio en la API)."""
+        padding = self.config.record_padding
+        for path, payload in (("/contactos", contacts), ("/clientes", clients), ("/clientes/destacados", featured)):
+            if padding:
+                key = RECORD_KEYS[path]
+                payload = dict(payload)
+                payload[key] = [dict(record, pad="x" * padding) for record in payload[key]]
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self._data[path] = payload
+            self._bodies[path] = body
+            self._etags[path] = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+    # --- Autenticación ---
+
+    def _issue_token(self):
+        token = self._fixed_token or secrets.token_hex(16)
+        ttl = self.config.token_ttl
+        self._tokens[token] = time.monotonic() + ttl if ttl else None
+        return token
+
+    def _token_valid(self, request):
+        auth = request.headers.get("authorization", "")
+        if not auth.startswith("Bearer "):
+            return False
+        token = auth[len("Bearer "):]
+        if token not in self._tokens:
+            return False
+        expires = self._tokens[token]
+        if expires is not None and time.monotonic() > expires:
+            del self._tokens[token]
+            return False
+        return True
+
+    # --- Respuestas ---
+
+    def _throttled(self):
+        # Devuelve la función que envía el cuerpo por bloques al ritmo
+        # del ancho de banda configurado (o None si no hay límite).
+        rate = self.config.bandwidth_kbps * 1024
+        if not rate:
+            return None
+
+        async def chunks(body):
+            for start in range(0, len(body), CHUNK_BYTES):
+                chunk = body[start:start + CHUNK_BYTES]
+                yield chunk
+                await asyncio.sleep(len(chunk) / rate)
+        return chunks
+
+    def _page(self, path, query):
+        # Respuesta paginada: el mismo objeto con solo los registros de la página.
+        key = RECORD_KEYS[path]
+        payload = self._data[path]
+        page = max(1, int(query.get("page", 1)))
+        per_page = max(1, int(query.get("per_page", 100)))
+        records = payload[key]
+        result = dict(payload)
+        result[key] = records[(page - 1) * per_page:page * per_page]
+        result.update({"page": page, "per_page": per_page, "total": len(records)})
+        return json.dumps(result, ensure_ascii=False).encode("utf-8")
+
+    def _record(self, path, status):
+        self.requests[path] = self.requests.get(path, 0) + 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    async def handle(self, request):
+        """Manejador de peticiones para 'HttpServer'."""
+        response = await self._handle(request)
+        self._record(request.path.rstrip("/"), response.status)
+        return response
+
+    async def _handle(self, request):
+        path = request.path.rstrip("/")
+        config = self.config
+        # Latencia simulada (antes de cualquier respuesta, también del login)
+        delay = config.latency.sample()
+        if delay:
+            await asyncio.sleep(delay)
+
+        if path == "/login":
+            if request.method != "POST":
+                return error_response(405)
+            return json_response({"token": self._issue_token()})
+
+        if path not in self._bodies:
+            return error_response(404)
+        if not self._token_valid(request):
+            return error_response(401, "Token inválido o caducado")
+        if config.error_rate and config.rng.random() < config.error_rate:
+            return error_response(config.error_status, "Error simulado")
+
+        etag = self._etags[path]
+        headers = {"Content-Type": "application/json; charset=utf-8", "ETag": etag}
+        if request.headers.get("if-none-match") == etag:
+            return Response(304, b"", headers)
+        if "page" in request.query or "per_page" in request.query:
+            try:
+                body = self._page(path, request.query)
+            except ValueError:
+                return error_response(400, "'page' y 'per_page' deben ser enteros")
+        else:
+            body = self._bodies[path]
+        return Response(200, body, headers, self._throttled())
+
+# Define una clase que ejecuta el servidor en un hilo con su propio bucle,
+# para poder usarlo desde código bloqueante (ej. SynchronyService.run_process).
+class MockServerThread:
+
+    # Constructor de la clase
+    def __init__(self, api, host="127.0.0.1", port=0):
+        self.api = api
+        self._server = HttpServer(api.handle, host, port)
+        self._loop = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self._server.host}:{self._server.port}"
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self._server.start())
+        self._ready.set()
+        self._loop.run_forever()
+        # Cancela las tareas que sigan vivas (ej. 'mutate') antes de cerrar
+        pending = asyncio.all_tasks(self._loop)
+        for task in pending:
+            task.cancel()
+        if pending:
+            self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self._loop.run_until_complete(self._server.close())
+        self._loop.close()
+
+    def start(self):
+        """Arranca el servidor y espera a que esté escuchando. Devuelve la URL."""
+        self._thread = threading.Thread(target=self._run, name="MockApiServer", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self.url
+
+    def run(self, coro):
+        """Ejecuta una corutina en el bucle del servidor (ej. 'mutate')."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def stop(self):
+        """Detiene el servidor."""
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+# --- Línea de Comandos ---
+
+def build_parser():
+    """Opciones de línea de comandos (las reutiliza Benchmarks.load_test)."""
+    parser = argparse.ArgumentParser(description="API simulada para pruebas de carga de la sincronización.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--contacts", type=int, default=1000, help="Número de contactos servidos")
+    parser.add_argument("--record-padding", type=int, default=0, help="Bytes de relleno por registro")
+    parser.add_argument("--latency", default="const:0",
+                        help="Latencia en ms: const:N, uniform:MIN:MAX, normal:MEDIA:DESV, lognormal:MEDIANA:SIGMA")
+    parser.add_argument("--bandwidth-kbps", type=float, default=0, help="Ancho de banda por respuesta (KB/s, 0 = sin límite)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proporción de GET que fallan (0-1)")
+    parser.add_argument("--error-status", type=int, default=503, help="Código HTTP de los errores simulados")
+    parser.add_argument("--token-ttl", type=float, default=0, help="Segundos de validez de los tokens (0 = no caducan)")
+    parser.add_argument("--mutate-every", type=float, default=0,
+                        help="Cambiar un contacto cada N segundos (0 = datos fijos)")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser
+
+def create_api(args):
+    """Crea un 'MockApi' a partir de las opciones de línea de comandos."""
+    from Benchmarks.DatasetGenerator import generate
+    config = MockConfig(args.latency, args.bandwidth_kbps, args.error_rate, args.error_status,
+                        args.token_ttl, args.record_padding, args.seed)
+    return MockApi(*generate(args.contacts, seed=args.seed), config=config)
+
+async def mutate(api, every):
+    """Cambia el nombre del primer contacto cada 'every' segundos."""
+    contacts = api._data["/contactos"]
+    generation = 0
+    while True:
+        await asyncio.sleep(every)
+        generation += 1
+        contacts["contactos"][0]["name"] = f"Cambio {generation}"
+        api.set_data(contacts, api._data["/clientes"], api._data["/clientes/destacados"])
+
+async def _serve(args):
+    api = create_api(args)
+    server = await HttpServer(api.handle, args.host, args.port).start()
+    if args.mutate_every:
+        asyncio.create_task(mutate(api, args.mutate_every))
+    print(f"API simulada escuchando en http://{server.host}:{server.port}", flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        print(f"Peticiones: {api.requests} Estados: {api.statuses}")
+
+def main(argv=None):
+    """Punto de entrada de línea de comandos."""
+    args = build_parser().parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+# --- Bloque de Ejecución ---
+if __name__ == "__main__":
+    sys.exit(main())
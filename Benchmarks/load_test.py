@@ -0,0 +1,138 @@
+# Benchmarks/load_test.py
+# Prueba de carga de la sincronización contra la API simulada
+# (Benchmarks/MockApiServer.py). Uso (desde la raíz del proyecto):
+#   python -m Benchmarks.load_test --instances 8 --iterations 20 --interval 0.5 \
+#       --contacts 50000 --latency lognormal:80:0.6 --error-rate 0.05 --token-ttl 5
+#
+# Lanza 'instances' procesos; cada uno simula una instalación de la app
+# (su propio directorio temporal con 'db', 'logs' y 'config.json') y
+# ejecuta SynchronyService.run_process 'iterations' veces, esperando
+# 'interval' segundos entre una y otra (como el descargador con un
+# intervalo muy corto). Al final se muestran tiempos y fallos.
+# Con --url se usa un servidor ya arrancado en lugar de uno propio.
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from multiprocessing import Process, Queue
+
+# Raíz del proyecto (para importar los módulos de la app desde cualquier cwd)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from Benchmarks.MockApiServer import MockServerThread, build_parser, create_api, mutate
+
+def _instance(index, url, iterations, interval, results):
+    # Proceso de una instancia: sincroniza en bucle y envía cada resultado
+    # a 'results' como (instancia, segundos, estado, error).
+    workdir = tempfile.mkdtemp(prefix=f"nova_load_{index}_")
+    try:
+        os.chdir(workdir)
+        os.makedirs("logs", exist_ok=True)
+        from ConfigManager import ConfigManager
+        with open("config.json", "w", encoding="utf-8") as f:
+            json.dump({"api_url": url, "ping": url, "download_interval_minutes": 5,
+                       "username": f"load{index}@example.com", "password": "load"}, f)
+        ConfigManager.invalidate()
+
+        from Services.SynchronyService import SynchronyService
+        service = SynchronyService()
+        for _ in range(iterations):
+            start = time.perf_counter()
+            try:
+                status = service.run_process()
+                results.put((index, time.perf_counter() - start, status, None))
+            except RuntimeError as e:
+                results.put((index, time.perf_counter() - start, None, str(e)))
+            time.sleep(interval)
+    finally:
+        # Cierra el pool de procesos de la sincronización: si no, al salir
+        # esta instancia se queda esperando a sus procesos para siempre.
+        from WorkerPool import worker_pool
+        worker_pool.shutdown()
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+        results.put((index, None, None, None))
+
+def _percentile(values, p):
+    # Percentil por el método del rango más cercano.
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))]
+
+def report(samples):
+    """Muestra el resumen de la prueba. Devuelve el número de fallos."""
+    times = [s[1] for s in samples if s[3] is None]
+    failures = [s for s in samples if s[3] is not None]
+    written = sum(1 for s in samples if s[2] and s[2].startswith("Sincronización completada"))
+    print(f"\nSincronizaciones: {len(samples)} (correctas: {len(times)}, con escritura: {written}, "
+          f"fallidas: {len(failures)})")
+    if times:
+        print(f"Tiempo por sincronización: mediana {statistics.median(times) * 1000:.1f} ms, "
+              f"p95 {_percentile(times, 95) * 1000:.1f} ms, máx {max(times) * 1000:.1f} ms")
+    # Agrupa los errores por mensaje (sin repetir el mismo cien veces)
+    errors = {}
+    for failure in failures:
+        errors[failure[3]] = errors.get(failure[3], 0) + 1
+    for message, count in sorted(errors.items(), key=lambda item: -item[1]):
+        print(f"  {count:>4} x {message}")
+    return len(failures)
+
+def main(argv=None):
+    """Punto de entrada de línea de comandos. Devuelve el código de salida."""
+    parser = build_parser()
+    parser.description = "Prueba de carga de la sincronización contra la API simulada."
+    parser.set_defaults(port=0)
+    parser.add_argument("--url", default=None, help="URL de un servidor ya arrancado (no se arranca uno propio)")
+    parser.add_argument("--instances", type=int, default=4, help="Instancias concurrentes")
+    parser.add_argument("--iterations", type=int, default=10, help="Sincronizaciones por instancia")
+    parser.add_argument("--interval", type=float, default=0.5, help="Segundos entre sincronizaciones")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        url = args.url
+    else:
+        server = MockServerThread(create_api(args), args.host, args.port)
+        url = server.start()
+        if args.mutate_every:
+            # Cambios periódicos en los datos (en el bucle del servidor)
+            server.run(mutate(server.api, args.mutate_every))
+    print(f"Servidor: {url} | {args.instances} instancias x {args.iterations} sincronizaciones", flush=True)
+
+    results = Queue()
+    # No son 'daemon': cada instancia crea a su vez el pool de procesos de run_process (WorkerPool.py).
+    workers = [Process(target=_instance, args=(i, url, args.iterations, args.interval, results))
+               for i in range(args.instances)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    samples = []
+    finished = 0
+    try:
+        # Cada instancia envía un marcador (segundos=None) al terminar.
+        while finished < len(workers):
+            sample = results.get()
+            if sample[1] is None:
+                finished += 1
+            else:
+                samples.append(sample)
+    finally:
+        for worker in workers:
+            worker.join()
+        if server:
+            server.stop()
+    elapsed = time.perf_counter() - start
+
+    failures = report(samples)
+    print(f"Duración total: {elapsed:.1f} s ({len(samples) / elapsed:.1f} sincronizaciones/s)")
+    if server:
+        print(f"Peticiones al servidor: {server.api.requests} Estados: {server.api.statuses}")
+    return 1 if failures else 0
+
+# --- Bloque de Ejecución ---
+if __name__ == "__main__":
+    sys.exit(main())
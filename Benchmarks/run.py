@@ -0,0 +1,228 @@
+# Benchmarks/run.py
+# Suite de rendimiento. Uso (desde la raíz del proyecto):
+#   python -m Benchmarks.run [--sizes 1000,10000,100000] [--repeat 5]
+#                            [--compare archivo.json] [--fail-on-regression]
+#
+# Para cada tamaño genera un dataset sintético en un directorio temporal
+# (la app usa rutas relativas: 'db', 'logs', 'config.json'), mide las
+# operaciones principales y guarda los resultados en
+# 'Benchmarks/results/bench_<timestamp>.json'. Si hay una ejecución anterior
+# (o se indica con --compare), muestra la diferencia y marca las regresiones.
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from unittest import mock
+
+# Raíz del proyecto (para importar los módulos de la app desde cualquier cwd)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from Benchmarks.DatasetGenerator import write_dataset
+from Benchmarks.MockApiServer import MockApi, MockServerThread
+
+# Directorio donde se guardan los resultados
+RESULTS_PATH = os.path.join(ROOT, "Benchmarks", "results")
+# Diferencia (en %) a partir de la cual se considera una regresión
+DEFAULT_THRESHOLD = 15.0
+# Diferencia absoluta mínima (ms) para marcar una regresión: por debajo de
+# esto las variaciones son ruido de medida
+MIN_DELTA_MS = 1.0
+
+def measure(fn, repeat, setup=None):
+    """
+    Ejecuta 'fn' 'repeat' veces (llamando antes a 'setup', que no se mide)
+    y devuelve las estadísticas en milisegundos.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": round(min(times), 3),
+        "median_ms": round(statistics.median(times), 3),
+        "mean_ms": round(statistics.fmean(times), 3),
+        "runs": len(times),
+    }
+
+def _silent(fn, inputs=()):
+    # Ejecuta 'fn' con la salida descartada y 'input()' respondiendo 'inputs'.
+    def run():
+        answers = iter(inputs)
+        with contextlib.redirect_stdout(io.StringIO()), \
+                mock.patch("builtins.input", lambda prompt="": next(answers, "q")):
+            fn()
+    return run
+
+def _write_config(api_url):
+    # Configuración mínima que apunta al servidor simulado.
+    from ConfigManager import ConfigManager
+    with open("config.json", "w", encoding="utf-8") as f:
+        json.dump({"api_url": api_url, "ping": api_url, "download_interval_minutes": 5,
+                   "username": "bench@example.com", "password": "bench"}, f)
+    ConfigManager.invalidate()
+
+def run_size(size, repeat, seed):
+    """Mide todas las operaciones para un tamaño de dataset. Devuelve {caso: estadísticas}."""
+    import FileManager
+    from SharedState import global_state
+    from Services.ContactsService import ContactsService
+    from Services.SynchronyService import SynchronyService, prepare_dataset
+    from WorkerPool import worker_pool
+
+    contacts, clients, featured = write_dataset("db", size, seed=seed)
+    last_id = contacts["contactos"][-1]["id"]
+    results = {}
+
+    # --- Lectura de contactos ---
+    service = ContactsService()
+    results["contacts.get_all_contacts (frío)"] = measure(
+        service.get_all_contacts, repeat, setup=global_state.clear_datasets)
+    results["contacts.get_all_contacts (caliente)"] = measure(service.get_all_contacts, repeat)
+
+    # --- Sincronización: comprobación de cambios y escritura ---
+    with MockServerThread(MockApi(contacts, clients, featured)) as server:
+        _write_config(server.url)
+        s_service = SynchronyService()
+        # La misma etapa que la sincronización: decodificar, comparar y
+        # codificar, en el pool de procesos (incluye el coste de enviar la
+        # respuesta al proceso y recibir el resultado).
+        body = json.dumps(contacts, ensure_ascii=False).encode("utf-8")
+        # El pool es persistente en la app: se arrancan sus procesos antes de medir
+        worker_pool.start()
+        worker_pool.map(prepare_dataset, [("db", "contacts.json", body, False)] * worker_pool.size)
+        results["sync.prepare_dataset (sin cambios)"] = measure(
+            lambda: worker_pool.map(prepare_dataset, [("db", "contacts.json", body, False)]), repeat)
+        # Sin archivo previo: todo es nuevo y se escribe el temporal
+        results["sync.prepare_dataset (con cambios)"] = measure(
+            lambda: worker_pool.map(prepare_dataset, [("db", "bench_contacts.json", body, False)]), repeat)
+        for name in os.listdir("db"):
+            if name.startswith("bench_contacts.json.") and name.endswith(".tmp"):
+                os.remove(os.path.join("db", name))
+
+        # --- Visor de archivos (streaming) ---
+        results["filemanager.view (primera página)"] = measure(
+            _silent(lambda: FileManager.view_db_file("contacts.json"), ["q"]), repeat)
+        results["filemanager.view (buscar último id)"] = measure(
+            _silent(lambda: FileManager.view_db_file("contacts.json"), [f"id {last_id}", "q"]), repeat)
+
+        # --- Sincronización completa contra el servidor simulado ---
+        results["sync.run_process (sin cambios)"] = measure(s_service.run_process, repeat)
+        generation = [0]
+
+        def change_data():
+            # Cambia un contacto para que la sincronización tenga que escribir.
+            generation[0] += 1
+            contacts["contactos"][0]["name"] = f"Cambio {generation[0]}"
+            server.api.set_data(contacts, clients, featured)
+        results["sync.run_process (con cambios)"] = measure(s_service.run_process, repeat, setup=change_data)
+    return results
+
+def latest_result():
+    """Ruta del último archivo de resultados guardado (o None)."""
+    if not os.path.isdir(RESULTS_PATH):
+        return None
+    files = sorted(f for f in os.listdir(RESULTS_PATH) if f.startswith("bench_") and f.endswith(".json"))
+    return os.path.join(RESULTS_PATH, files[-1]) if files else None
+
+def compare(current, previous, threshold):
+    """
+    Compara dos resultados (mediana a mediana). Devuelve una lista de
+    (caso, tamaño, antes, ahora, diferencia %, es_regresión).
+    """
+    rows = []
+    for case, sizes in current["results"].items():
+        for size, stats in sizes.items():
+            before = previous.get("results", {}).get(case, {}).get(size)
+            if not before:
+                continue
+            delta = (stats["median_ms"] - before["median_ms"]) / max(before["median_ms"], 1e-9) * 100
+            regression = delta > threshold and stats["median_ms"] - before["median_ms"] > MIN_DELTA_MS
+            rows.append((case, size, before["median_ms"], stats["median_ms"], delta, regression))
+    return rows
+
+def main(argv=None):
+    """Punto de entrada de línea de comandos. Devuelve el código de salida."""
+    parser = argparse.ArgumentParser(description="Suite de rendimiento de NovaAppConsola.")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="Tamaños de dataset separados por comas (ej. 1000,1000000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por caso")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla del generador")
+    parser.add_argument("--compare", default=None, help="Resultados con los que comparar (por defecto, el último)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Porcentaje de empeoramiento que se considera regresión")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Devolver código 1 si hay alguna regresión")
+    args = parser.parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    results = {}
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="nova_bench_")
+    try:
+        # Todo se ejecuta en un directorio temporal: no se toca 'db' ni 'logs'.
+        os.chdir(workdir)
+        os.makedirs("logs", exist_ok=True)
+        for size in sizes:
+            print(f"Midiendo con {size} contactos...", flush=True)
+            for case, stats in run_size(size, args.repeat, args.seed).items():
+                results.setdefault(case, {})[str(size)] = stats
+    finally:
+        # Cierra los procesos del pool de sincronización (si se crearon)
+        from WorkerPool import worker_pool
+        worker_pool.shutdown()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    current = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+    # Guarda los resultados (y busca los anteriores antes de hacerlo).
+    previous_path = args.compare or latest_result()
+    os.makedirs(RESULTS_PATH, exist_ok=True)
+    output = os.path.join(RESULTS_PATH, f"bench_{datetime.now():%Y%m%d%H%M%S}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(current, f, ensure_ascii=False, indent=2)
+
+    # Tabla de resultados
+    print(f"\n{'caso':<42} {'tamaño':>8} {'mediana ms':>11} {'mín ms':>10}")
+    for case, sizes_stats in results.items():
+        for size, stats in sizes_stats.items():
+            print(f"{case:<42} {size:>8} {stats['median_ms']:>11.2f} {stats['min_ms']:>10.2f}")
+    print(f"\nResultados guardados en '{output}'.")
+
+    # Comparación con la ejecución anterior
+    regressions = 0
+    if previous_path and os.path.exists(previous_path):
+        with open(previous_path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        print(f"\nComparación con '{previous_path}':")
+        for case, size, before, now, delta, regression in compare(current, previous, args.threshold):
+            mark = "  <-- REGRESIÓN" if regression else ""
+            print(f"{case:<42} {size:>8} {before:>10.2f} -> {now:>10.2f} ms ({delta:+.1f}%){mark}")
+            regressions += regression
+    return 1 if regressions and args.fail_on_regression else 0
+
+# --- Bloque de Ejecución ---
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# Bitset.py
+# Conjunto de posiciones guardado como bits en un 'bytearray' (1 bit por
+# posición). Se usa para marcar qué contactos (por su posición en la
+# lista) son clientes o clientes destacados: 1 millón de contactos ocupan
+# ~122 KB por marca, y combinar marcas (AND, OR, NOT) se hace de golpe
+# sobre los bytes, sin recorrer los contactos uno a uno.
+class Bitset:
+    __slots__ = ("size", "_bits")
+
+    # Constructor de la clase
+    # 'size' es el número de posiciones; 'bits' (opcional) los bytes ya hechos.
+    def __init__(self, size, bits=None):
+        self.size = size
+        self._bits = bytearray(bits) if bits is not None else bytearray((size + 7) // 8)
+
+    @classmethod
+    def from_positions(cls, size, positions):
+        """Crea un conjunto con las posiciones indicadas marcadas."""
+        bitset = cls(size)
+        for position in positions:
+            bitset.add(position)
+        return bitset
+
+    @classmethod
+    def full(cls, size):
+        """Crea un conjunto con todas las posiciones marcadas."""
+        return cls._from_int(size, (1 << size) - 1)
+
+    # --- Conversión (las operaciones se hacen con enteros, en C) ---
+
+    def _to_int(self):
+        return int.from_bytes(self._bits, "little")
+
+    @classmethod
+    def _from_int(cls, size, value):
+        return cls(size, value.to_bytes((size + 7) // 8, "little"))
+
+    # --- Operaciones ---
+
+    def add(self, position):
+        """Marca una posición (solo mientras se construye el conjunto)."""
+        if not 0 <= position < self.size:
+            raise IndexError(f"Posición fuera de rango: {position}")
+        self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __getitem__(self, position):
+        return bool(self._bits[position >> 3] >> (position & 7) & 1)
+
+    def __and__(self, other):
+        return self._from_int(self.size, self._to_int() & other._to_int())
+
+    def __or__(self, other):
+        return self._from_int(self.size, self._to_int() | other._to_int())
+
+    def __invert__(self):
+        return self._from_int(self.size, self._to_int() ^ ((1 << self.size) - 1))
+
+    def __eq__(self, other):
+        return isinstance(other, Bitset) and self.size == other.size and self._bits == other._bits
+
+    def __len__(self):
+        return self.size
+
+    def count(self):
+        """Número de posiciones marcadas."""
+        return self._to_int().bit_count()
+
+    def positions(self):
+        """Genera las posiciones marcadas, en orden. Salta los bytes a cero."""
+        for index, byte in enumerate(self._bits):
+            if byte:
+                base = index << 3
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        yield base + bit
@@ -0,0 +1,257 @@
+# Changelog.py
+# Registro de cambios (NDJSON) de cada sincronización, registro a registro.
+# Cada vez que una sincronización guarda datos nuevos, se añade al final de
+# 'db/changelog.ndjson' una línea por cada registro añadido, eliminado o
+# modificado (alineados por 'id', ver SnapshotDiff.py):
+#   {"seq": 1042, "sync": "20251105123819", "dataset": "contacts",
+#    "op": "modified", "id": 17, "data": {"email": {"old": ..., "new": ...}}}
+# 'seq' crece de uno en uno y nunca se repite. 'sync' es el timestamp de
+# los snapshots que guardó esa sincronización.
+#
+# Para leer "los cambios desde la secuencia X" sin recorrer todo el archivo,
+# 'db/changelog.idx' guarda pares (seq, posición en bytes) al empezar cada
+# sincronización y cada INDEX_STRIDE registros: se busca por bisección,
+# se salta a esa posición y solo se leen las líneas siguientes. Así el
+# coste de un consumidor es proporcional a los cambios, no al historial.
+#
+# Los cambios se añaden ANTES de sustituir los archivos principales y quedan
+# pendientes hasta que se confirma cada dataset ('confirm'). Mientras,
+# 'db/changelog.pending' guarda hasta dónde están confirmados: los lectores
+# no ven lo pendiente y, si la sincronización falla o el proceso muere a
+# medias, el siguiente 'append' descarta los cambios de los datasets cuyo
+# archivo no llegó a sustituirse (la siguiente sincronización los vuelve a
+# calcular contra el archivo antiguo, que sigue en disco).
+# Ninguno de estos archivos termina en '.json': el vigilante los ignora.
+import bisect
+import contextlib
+import json
+import os
+import struct
+import threading
+
+# Define la ruta del directorio base para todos los archivos
+DB_PATH = "db"
+CHANGELOG_FILE = "changelog.ndjson"
+INDEX_FILE = "changelog.idx"
+PENDING_FILE = "changelog.pending"
+# Cada cuántos registros se añade una entrada al índice
+INDEX_STRIDE = 1000
+# Entrada del índice: (seq, posición en bytes), enteros de 64 bits
+_ENTRY = struct.Struct("<QQ")
+
+def _json_key(key):
+    # Los registros sin 'id' se alinean por su huella ('SnapshotDiff._key'):
+    # en el registro se guardan como "sin-id:<hex>".
+    if isinstance(key, tuple):
+        return f"{key[0]}:{key[1].hex()}"
+    return key
+
+# Define la clase Changelog: añade y lee los cambios de una carpeta de datos.
+class Changelog:
+
+    # Constructor de la clase
+    def __init__(self, db_path=DB_PATH):
+        self._path = os.path.join(db_path, CHANGELOG_FILE)
+        self._index_path = os.path.join(db_path, INDEX_FILE)
+        self._pending_path = os.path.join(db_path, PENDING_FILE)
+        # Evita que dos hilos añadan cambios a la vez
+        self._lock = threading.Lock()
+
+    def _load_index(self):
+        # Devuelve las listas (seqs, posiciones) del índice.
+        try:
+            with open(self._index_path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            return [], []
+        # Ignora una entrada a medio escribir (ej. tras un corte de luz)
+        raw = raw[:len(raw) - len(raw) % _ENTRY.size]
+        seqs, offsets = [], []
+        for seq, offset in _ENTRY.iter_unpack(raw):
+            seqs.append(seq)
+            offsets.append(offset)
+        return seqs, offsets
+
+    def _load_pending(self):
+        # Devuelve el lote pendiente de confirmar ({"sync", "committed",
+        # "datasets": [[dataset, posición final], ...]}) o None si no hay.
+        try:
+            with open(self._pending_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _save_pending(self, pending):
+        # Se escribe en un temporal y se renombra: nunca queda a medias.
+        if pending is None:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._pending_path)
+            return
+        tmp_path = f"{self._pending_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(pending, f)
+        os.replace(tmp_path, self._pending_path)
+
+    def _visible_size(self):
+        # Bytes del archivo que ya están confirmados (lo que ven los lectores).
+        # El tamaño se mira ANTES que el lote pendiente: si entretanto se
+        # añade y confirma otro lote, sus datos quedan más allá de ese tamaño.
+        try:
+            size = os.path.getsize(self._path)
+        except OSError:
+            return 0
+        pending = self._load_pending()
+        return min(size, pending["committed"]) if pending else size
+
+    def _tail(self, recover=False):
+        """
+        Devuelve (última seq, posición del final de la última línea completa)
+        de los cambios confirmados. Solo lee desde la última entrada del índice.
+        Con 'recover' (al empezar un 'append') además repara los archivos:
+        descarta el lote que quedó sin confirmar, una línea a medio escribir
+        y las entradas del índice que apunten más allá de los datos.
+        """
+        seqs, offsets = self._load_index()
+        if recover:
+            try:
+                size = os.path.getsize(self._path)
+            except OSError:
+                size = 0
+            pending = self._load_pending()
+            if pending is not None:
+                # Una sincronización anterior no terminó: sus cambios sin
+                # confirmar se descartan (se volverán a calcular).
+                if pending["committed"] < size:
+                    with open(self._path, "r+b") as f:
+                        f.truncate(pending["committed"])
+                    size = pending["committed"]
+                self._save_pending(None)
+        else:
+            size = self._visible_size()
+        valid = bisect.bisect_left(offsets, size)
+        if valid < len(offsets):
+            if recover:
+                # El índice va por delante de los datos: se rehace sin esas entradas
+                with open(self._index_path, "wb") as f:
+                    f.write(b"".join(_ENTRY.pack(s, o) for s, o in zip(seqs[:valid], offsets[:valid])))
+            del seqs[valid:], offsets[valid:]
+        last_seq, end = (seqs[-1] - 1, offsets[-1]) if seqs else (0, 0)
+        if size == 0:
+            return last_seq, 0
+        with open(self._path, "rb") as f:
+            f.seek(end)
+            for line in f:
+                if end >= size or not line.endswith(b"\n"):
+                    break
+                last_seq = json.loads(line)["seq"]
+                end += len(line)
+        if recover and end < size:
+            with open(self._path, "r+b") as f:
+                f.truncate(end)
+        return last_seq, end
+
+    def last_seq(self):
+        """Secuencia del último cambio registrado (0 si no hay ninguno)."""
+        with self._lock:
+            return self._tail()[0]
+
+    def append(self, sync_id, changes):
+        """
+        Añade los cambios de una sincronización, PENDIENTES hasta que se
+        confirme cada dataset con 'confirm'. 'changes' es un iterable de
+        tuplas (dataset, operación, id, datos) como las de
+        'SnapshotDiff.iter_diff_records', agrupadas por dataset en el mismo
+        orden en que se confirmarán. Devuelve (primera seq, última seq)
+        o None si no había cambios.
+        """
+        # Importa el formato de un cambio (el mismo de 'diff --json')
+        from SnapshotDiff import change_to_dict
+        with self._lock:
+            last_seq, offset = self._tail(recover=True)
+            start = offset
+            # Se marca el lote ANTES de escribir: si se corta, se descarta entero
+            self._save_pending({"sync": sync_id, "committed": start, "datasets": []})
+            seq, first, entries, ends = last_seq, None, [], {}
+            with open(self._path, "ab") as f:
+                for dataset, op, key, data in changes:
+                    seq += 1
+                    if first is None:
+                        first = seq
+                    # Entrada de índice al empezar la sincronización y cada INDEX_STRIDE registros
+                    if seq == first or seq % INDEX_STRIDE == 0:
+                        entries.append(_ENTRY.pack(seq, offset))
+                    change = change_to_dict(op, _json_key(key), data)
+                    line = json.dumps({"seq": seq, "sync": sync_id, "dataset": dataset, **change},
+                                      ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+                    f.write(line)
+                    offset += len(line)
+                    # Posición final de los cambios de cada dataset
+                    ends[dataset] = offset
+            # El índice se escribe DESPUÉS que los datos: nunca apunta a
+            # líneas que no existan (si se corta antes, solo va por detrás).
+            if entries:
+                with open(self._index_path, "ab") as f:
+                    f.write(b"".join(entries))
+            if first is None:
+                self._save_pending(None)
+                return None
+            self._save_pending({"sync": sync_id, "committed": start,
+                                "datasets": [[dataset, end] for dataset, end in ends.items()]})
+            return first, seq
+
+    def confirm(self, dataset):
+        """
+        Confirma los cambios pendientes de 'dataset' (y los de los datasets
+        anteriores del lote): se llama justo después de sustituir su archivo
+        principal. Al confirmar el último, el lote deja de estar pendiente.
+        """
+        with self._lock:
+            pending = self._load_pending()
+            if pending is None:
+                return
+            datasets = pending["datasets"]
+            for i, (name, end) in enumerate(datasets):
+                if name == dataset:
+                    pending["committed"] = end
+                    del datasets[:i + 1]
+                    self._save_pending(pending if datasets else None)
+                    return
+
+    def read_since(self, seq=0, limit=None, dataset=None):
+        """
+        Genera los cambios con secuencia MAYOR que 'seq' (como diccionarios),
+        en orden. 'limit' corta tras ese número de cambios y 'dataset' filtra
+        por archivo ("contacts", "clients" o "featured_clients").
+        Salta directamente a la posición del índice más cercana.
+        """
+        if limit is not None and limit <= 0:
+            return
+        # Solo se leen los cambios confirmados
+        size = self._visible_size()
+        seqs, offsets = self._load_index()
+        # Última entrada cuya seq sea <= seq + 1 (la primera que interesa)
+        i = bisect.bisect_right(seqs, seq + 1) - 1
+        offset = offsets[i] if i >= 0 else 0
+        count = 0
+        try:
+            f = open(self._path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(offset)
+            for line in f:
+                # Fin de lo confirmado, o una línea a medio escribir
+                if offset >= size or not line.endswith(b"\n"):
+                    return
+                offset += len(line)
+                change = json.loads(line)
+                if change["seq"] <= seq or (dataset and change["dataset"] != dataset):
+                    continue
+                yield change
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+
+# --- Instancia Global ---
+# Registro de cambios de la carpeta 'db' (el perfil principal)
+changelog = Changelog()
@@ -0,0 +1,354 @@
+# Cli.py
+# Punto de entrada SIN menú interactivo (para cron, systemd o scripts).
+# Uso: python Cli.py [--profile] <comando> [opciones]
+#   sync     - Sincroniza una vez con la API
+#   list     - Lista los contactos (texto o JSON)
+#   search   - Busca contactos por id, nombre o email
+#   export   - Exporta los contactos a JSON o CSV
+#   daemon   - Ejecuta las tareas en segundo plano indefinidamente
+#   diff     - Compara dos archivos de 'db' (ver SnapshotDiff.py)
+#   serve    - API HTTP local de solo lectura (ver QueryApiServer.py)
+#   stats    - Estadísticas de los contactos (actuales y por snapshot)
+#   duplicates - Busca contactos duplicados (ver Services/DuplicateService.py)
+#   changes  - Cambios registrados desde una secuencia (ver Changelog.py)
+#
+# --- Nota sobre el Arranque ---
+# Este módulo solo importa 'argparse' al cargarse. Cada comando importa
+# lo que necesita DENTRO de su función, así que 'list' o 'search' no
+# cargan httpx ni multiprocessing, y 'daemon' no carga ninguna vista.
+import argparse
+import os
+import sys
+
+def _print_contacts(contacts, as_json):
+    # Imprime una lista de 'ContactModel' como texto o como JSON.
+    if as_json:
+        import json
+        json.dump([contact.to_dict() for contact in contacts], sys.stdout, ensure_ascii=False)
+        sys.stdout.write("\n")
+        return
+    for contact in contacts:
+        client_status = "Sí" if contact.get_is_client else "No"
+        featured_status = "Sí" if contact.get_is_featured else "No"
+        print(f"{contact.get_id}\t{contact.get_name}\t{contact.get_email}\tCliente: {client_status}"
+              f"\tDestacado: {featured_status}")
+
+# --- Comandos ---
+
+def cmd_sync(args):
+    """Sincroniza una vez y termina."""
+    os.makedirs("logs", exist_ok=True)
+    if args.all_profiles:
+        return _sync_all_profiles()
+    from Controllers.SynchronyController import SynchronyController
+    result = SynchronyController().synchronize()
+    # El controlador imprime el error y devuelve None si algo falló.
+    if result is None:
+        return 1
+    print(result)
+    return 0
+
+def _sync_all_profiles():
+    # Sincroniza todos los perfiles de 'config.json' a la vez (un proceso,
+    # un pool de conexiones). Código 1 si falló alguno.
+    import asyncio
+    from Services.ProfileSyncService import ProfileSyncService
+
+    async def run():
+        service = ProfileSyncService()
+        try:
+            return await service.sync_all()
+        finally:
+            await service.aclose()
+
+    done, errors = asyncio.run(run())
+    for name, message in done.items():
+        print(f"[{name}] {message}")
+    for name, error in errors.items():
+        print(f"[{name}] {error}", file=sys.stderr)
+    return 1 if errors else 0
+
+def cmd_list(args):
+    """Lista los contactos (todos, o filtrados por sus marcas)."""
+    from Controllers.ContactsController import ContactsController
+    if args.clients is None and args.featured is None:
+        contacts = ContactsController().get_all_contacts(args.as_of)
+    else:
+        contacts = ContactsController().filter_contacts(args.clients, args.featured, args.as_of)
+    if contacts is None:
+        return 1
+    _print_contacts(contacts, args.json)
+    return 0
+
+def cmd_search(args):
+    """Busca contactos por id, nombre o email."""
+    from Controllers.ContactsController import ContactsController
+    contacts = ContactsController().search_contacts(args.query, args.as_of)
+    if contacts is None:
+        return 1
+    _print_contacts(contacts, args.json)
+    # Código 2 si no hubo resultados (útil en scripts).
+    return 0 if contacts else 2
+
+def cmd_export(args):
+    """Exporta los contactos (con sus marcas de cliente y destacado) en streaming."""
+    from Services.ExportService import ExportService
+    output = args.output or "-"
+    try:
+        count = ExportService().export(output, args.format, args.compress, args.source, args.chunk_rows,
+                                       args.as_of)
+    except (RuntimeError, ValueError) as e:
+        print(f"Error de flujo: {e}", file=sys.stderr)
+        return 1
+    if output != "-":
+        print(f"{count} contactos exportados a '{output}'.")
+    return 0
+
+def cmd_stats(args):
+    """Muestra las estadísticas de los contactos (texto o JSON)."""
+    from Controllers.AnalyticsController import AnalyticsController
+    summary = AnalyticsController().get_summary(history=not args.no_history)
+    if summary is None:
+        return 1
+    if args.json:
+        import json
+        json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    else:
+        from Views.AnalyticsView import analytics_view
+        analytics_view(summary)
+    return 0
+
+def cmd_duplicates(args):
+    """Busca contactos duplicados y escribe el informe de grupos."""
+    from Services.DuplicateService import DuplicateService, REPORT_PATH
+    service = DuplicateService(threshold=args.threshold, max_block=args.max_block)
+    output = args.output or REPORT_PATH
+    try:
+        groups, stats = service.run(args.source, output)
+    except RuntimeError as e:
+        print(f"Error de flujo: {e}", file=sys.stderr)
+        return 1
+    if args.json:
+        import json
+        json.dump(stats, sys.stdout, ensure_ascii=False)
+        sys.stdout.write("\n")
+        return 0
+    print(f"{stats['contacts']} contactos revisados ({stats['comparisons']} comparaciones, "
+          f"{stats['skipped_blocks']} bloques demasiado grandes descartados).")
+    print(f"{stats['groups']} grupos de duplicados con {stats['duplicated_contacts']} contactos.")
+    for group in groups[:args.top]:
+        print(f"- {group['size']} contactos (puntuación máx. {group['max_score']}):")
+        for contact in group["contacts"]:
+            print(f"    {contact['id']}\t{contact['name']}\t{contact['email']}")
+    print(f"Informe completo en '{output}'.")
+    return 0
+
+def cmd_changes(args):
+    """Escribe en NDJSON los cambios registrados desde la secuencia '--since'."""
+    import json
+    from Changelog import changelog
+    if args.last:
+        print(changelog.last_seq())
+        return 0
+    try:
+        for change in changelog.read_since(args.since, args.limit, args.dataset):
+            sys.stdout.write(json.dumps(change, ensure_ascii=False) + "\n")
+    except (OSError, ValueError) as e:
+        print(f"Error al leer el registro de cambios: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+def cmd_daemon(args):
+    """Ejecuta el descargador, el vigilante de archivos y el monitor de latencia."""
+    import asyncio
+    import signal
+    import BackgroundTasks
+    from ConfigManager import ConfigManager
+    from ApiPinger import latency_monitor
+    from LoopMonitor import loop_monitor
+    from WorkerPool import worker_pool
+
+    async def run():
+        os.makedirs("db", exist_ok=True)
+        os.makedirs("logs", exist_ok=True)
+        config = ConfigManager()
+        loop_monitor.install()
+        # Pool de procesos de la sincronización, creado una vez (ver WorkerPool.py)
+        worker_pool.start(config)
+        # Carga inicial del estado (lista de archivos y catálogo)
+        await BackgroundTasks.refresh_file_list_once()
+        tasks = [
+            asyncio.create_task(BackgroundTasks.run_downloader(config)),
+            asyncio.create_task(BackgroundTasks.run_file_watcher()),
+            asyncio.create_task(loop_monitor.run()),
+        ]
+        if not args.no_latency:
+            tasks.append(asyncio.create_task(latency_monitor.run(config)))
+
+        # SIGTERM/SIGINT detienen las tareas de forma ordenada
+        # ('add_signal_handler' no existe en Windows: allí basta con Ctrl+C).
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        print("Daemon iniciado. Detener con SIGTERM o Ctrl+C.", flush=True)
+        try:
+            await stop.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            print("Daemon detenido.", flush=True)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def cmd_diff(args):
+    """Compara dos archivos de 'db' (delegado a SnapshotDiff)."""
+    import SnapshotDiff
+    argv = [args.old, args.new]
+    if args.json:
+        argv.append("--json")
+    if args.limit is not None:
+        argv += ["--limit", str(args.limit)]
+    return SnapshotDiff.main(argv)
+
+def cmd_serve(args):
+    """Arranca la API HTTP local de consulta."""
+    import asyncio
+    import QueryApiServer
+    try:
+        asyncio.run(QueryApiServer.serve(args.host, args.port, args.sync))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"No se pudo arrancar el servidor: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+# --- Analizador de Argumentos ---
+
+# Ayuda común de la opción '--as-of' (ver SnapshotIndex.parse_as_of)
+AS_OF_HELP = ("Usar los datos tal y como estaban en esa fecha (ej. 2025-11-05 o "
+              "2025-11-05T12:38:19), según los snapshots de 'db'")
+
+def build_parser():
+    """Construye el analizador de argumentos con todos los subcomandos."""
+    parser = argparse.ArgumentParser(prog="NovaAppConsola", description="Modo de línea de comandos (sin menú).")
+    parser.add_argument("--profile", action="store_true",
+                        help="Perfilar el comando con cProfile y tracemalloc (informe en 'logs/profiles')")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("sync", help="Sincronizar una vez con la API")
+    p.add_argument("--all-profiles", action="store_true",
+                   help="Sincronizar a la vez todos los perfiles de API de 'config.json'")
+    p.set_defaults(func=cmd_sync)
+
+    p = sub.add_parser("list", help="Listar contactos")
+    p.add_argument("--json", action="store_true", help="Salida en JSON")
+    p.add_argument("--clients", action=argparse.BooleanOptionalAction, default=None,
+                   help="Solo clientes (--no-clients: solo los que no lo son)")
+    p.add_argument("--featured", action=argparse.BooleanOptionalAction, default=None,
+                   help="Solo clientes destacados (--no-featured: solo los que no lo son)")
+    p.add_argument("--as-of", default=None, help=AS_OF_HELP)
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("search", help="Buscar contactos por id, nombre o email")
+    p.add_argument("query", help="Texto a buscar (o id exacto)")
+    p.add_argument("--json", action="store_true", help="Salida en JSON")
+    p.add_argument("--as-of", default=None, help=AS_OF_HELP)
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("export", help="Exportar contactos (con marcas de cliente y destacado)")
+    p.add_argument("--format", choices=["csv", "ndjson", "json", "parquet"], default="json", help="Formato de salida")
+    p.add_argument("-o", "--output", help="Archivo de salida (por defecto, la salida estándar)")
+    p.add_argument("--compress", choices=["gz", "bz2", "xz"], default=None, help="Comprimir el archivo de salida (en parquet solo 'gz')")
+    source = p.add_mutually_exclusive_group()
+    source.add_argument("--source", default=None, help="Archivo de contactos a exportar (ej. un snapshot de 'db')")
+    source.add_argument("--as-of", default=None, help=AS_OF_HELP)
+    p.add_argument("--chunk-rows", type=int, default=10000, help="Filas por bloque de escritura")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("stats", help="Estadísticas de los contactos (clientes, dominios, evolución)")
+    p.add_argument("--json", action="store_true", help="Salida en JSON")
+    p.add_argument("--no-history", action="store_true", help="Solo los datos actuales, sin los snapshots")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("duplicates", help="Buscar contactos duplicados (informe en 'logs/duplicates_report.json')")
+    p.add_argument("--source", default=None, help="Archivo de contactos a revisar (ej. un snapshot de 'db')")
+    p.add_argument("--threshold", type=float, default=0.8, help="Puntuación mínima (0-1) para considerar duplicados")
+    p.add_argument("--max-block", type=int, default=50, help="Tamaño máximo de un bloque de comparación")
+    p.add_argument("--top", type=int, default=10, help="Grupos que se muestran en pantalla")
+    p.add_argument("-o", "--output", default=None, help="Ruta del informe")
+    p.add_argument("--json", action="store_true", help="Mostrar solo las estadísticas en JSON")
+    p.set_defaults(func=cmd_duplicates)
+
+    p = sub.add_parser("changes", help="Cambios por registro desde una secuencia (NDJSON, ver 'db/changelog.ndjson')")
+    p.add_argument("--since", type=int, default=0, help="Última secuencia ya procesada (0 = desde el principio)")
+    p.add_argument("--limit", type=int, default=None, help="Número máximo de cambios")
+    p.add_argument("--dataset", choices=["contacts", "clients", "featured_clients"], default=None,
+                   help="Solo los cambios de este archivo")
+    p.add_argument("--last", action="store_true", help="Mostrar solo la última secuencia registrada")
+    p.set_defaults(func=cmd_changes)
+
+    p = sub.add_parser("daemon", help="Ejecutar las tareas en segundo plano sin menú")
+    p.add_argument("--no-latency", action="store_true", help="No ejecutar el monitor de latencia")
+    p.set_defaults(func=cmd_daemon)
+
+    p = sub.add_parser("diff", help="Comparar dos archivos de 'db' por 'id'")
+    p.add_argument("old", help="Archivo antiguo (ruta o nombre dentro de 'db')")
+    p.add_argument("new", help="Archivo nuevo (ruta o nombre dentro de 'db')")
+    p.add_argument("--json", action="store_true", help="Salida NDJSON (un cambio por línea)")
+    p.add_argument("--limit", type=int, default=None, help="Número máximo de cambios a mostrar")
+    p.set_defaults(func=cmd_diff)
+
+    p = sub.add_parser("serve", help="API HTTP local de solo lectura sobre los datos sincronizados")
+    p.add_argument("--host", default="127.0.0.1", help="Dirección en la que escuchar")
+    p.add_argument("--port", type=int, default=8765, help="Puerto en el que escuchar")
+    p.add_argument("--sync", action="store_true", help="Ejecutar también el descargador automático")
+    p.set_defaults(func=cmd_serve)
+
+    return parser
+
+def main(argv=None):
+    """Analiza los argumentos y ejecuta el comando. Devuelve el código de salida."""
+    args = build_parser().parse_args(argv)
+    # Perfilado: con '--profile' o "profiling": true en 'config.json'.
+    # 'daemon' y 'serve' no se perfilan como un todo (nunca terminan);
+    # en 'daemon' se perfila cada ciclo del descargador.
+    from ConfigManager import ConfigManager
+    from Profiler import profiler
+    profiler.configure(ConfigManager(), force=args.profile)
+    try:
+        if args.command in ("daemon", "serve"):
+            return args.func(args)
+        with profiler.session(f"cli_{args.command}") as session:
+            code = args.func(args)
+        if session is not None:
+            print(f"Perfil guardado en '{session.report_path}'", file=sys.stderr)
+        return code
+    except BrokenPipeError:
+        # La salida se cerró antes de tiempo (ej. 'python Cli.py list | head').
+        # Se redirige stdout a devnull para que Python no falle al cerrarlo.
+        sys.stdout = open(os.devnull, "w")
+        return 0
+    finally:
+        # Detiene el pool de procesos si el comando llegó a usarlo
+        if "WorkerPool" in sys.modules:
+            sys.modules["WorkerPool"].worker_pool.shutdown()
+
+# --- Bloque de Ejecución ---
+if __name__ == "__main__":
+    # Necesario para 'multiprocessing' (comando 'sync') en ejecutables de Windows.
+    # Solo se importa si la app está compilada, para no retrasar el arranque.
+    if getattr(sys, "frozen", False):
+        from multiprocessing import freeze_support
+        freeze_support()
+    sys.exit(main())
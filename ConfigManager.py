@@ -1,136 +1,435 @@
+import copy
 import json
 import os
+import re
+import threading
+import time
+import weakref
 
 # Define la clase ConfigManager, responsable de leer y escribir
 # el archivo de configuración 'config.json'.
+#
+# Todas las instancias comparten UNA sola configuración en memoria
+# (atributos de clase). El archivo solo se vuelve a leer si su
+# 'mtime' o su tamaño cambian, y solo se escribe cuando un valor
+# cambia de verdad. Los cambios se notifican a los suscriptores.
 class ConfigManager:
     # Constante: Nombre del archivo de configuración.
     CONFIG_FILE = "config.json"
-    
+
     # Constante: Un diccionario con los valores por defecto.
     # Se usa si 'config.json' no existe o está dañado.
     DEFAULT_CONFIG = {
         "api_url": "https://apitechsolutions.duckdns.org/api",
         "ping": "apitechsolutions.duckdns.org",
-        "download_interval_minutes": 5
+        "download_interval_minutes": 5,
+        # Segundos entre dos sondas del monitor de latencia
+        "latency_probe_seconds": 30,
+        # Lanza una segunda petición GET si la primera supera su p95
+        "hedge_requests": False,
+        # Perfila (cProfile + tracemalloc) cada acción; ver Profiler.py
+        "profiling": False,
+        # Procesos del pool de trabajo (fracción de los núcleos); ver WorkerPool.py
+        "worker_pool_ratio": 0.5,
+        # Peticiones por segundo del perfil principal (0 = sin límite)
+        "rate_limit_per_second": 0,
+        # Perfiles de API adicionales (uno por cliente/tenant), sincronizados
+        # a la vez por el mismo descargador. Formato:
+        # {"nombre": {"api_url", "ping", "username", "password",
+        #             "data_dir" (subcarpeta de 'db', única por perfil; por defecto el nombre),
+        #             "endpoints" {"clients", "contacts", "featured_clients"},
+        #             "rate_limit_per_second"}}
+        "profiles": {},
+        # Política de retención de los snapshots con timestamp de 'db'
+        "retention": {
+            "enabled": False,         # Aplicarla tras cada sincronización con cambios (opcional)
+            "keep_last": 10,          # Últimos N snapshots de cada dataset
+            "keep_daily": 7,          # Uno por día durante N días
+            "keep_weekly": 4,         # Uno por semana durante N semanas
+            "max_total_mb": 500,      # Tamaño máximo total (0 = sin límite)
+            "compression": "gz"       # Compresión de los paquetes: gz, bz2 o xz
+        }
         # Nota: 'username' y 'password' no están aquí;
         # si no existen, sus 'get' devolverán None.
     }
 
+    # Constante: Nombre del perfil de API principal (claves de primer nivel).
+    DEFAULT_PROFILE = "default"
+    # Constante: Nombres válidos para la carpeta de un perfil ('db/<data_dir>'):
+    # letras, números, '_', '-' y '.', sin empezar por '.' (ni '.', ni '..')
+    # ni terminar en '.json' (se confundiría con los archivos de datos de 'db').
+    DATA_DIR_PATTERN = re.compile(r"^\w[\w.-]*$")
+    # Constante: Carpetas de 'db' que ya usa la aplicación (no valen para un perfil).
+    RESERVED_DATA_DIRS = ("archive",)
+    # Constante: Rutas de los endpoints (un perfil puede cambiarlas).
+    DEFAULT_ENDPOINTS = {
+        "clients": "/clientes",
+        "contacts": "/contactos",
+        "featured_clients": "/clientes/destacados",
+    }
+
+    # Constante: Tiempo mínimo (segundos) entre dos comprobaciones
+    # del 'mtime' del archivo. Evita un 'os.stat' en cada getter.
+    STAT_INTERVAL = 1.0
+
+    # --- Estado compartido por todas las instancias ---
+    # Diccionario de configuración en memoria (None = aún no cargado).
+    _cache = None
+    # Firma (mtime_ns, tamaño) del archivo cuando se cargó la caché.
+    _cache_stamp = None
+    # Momento (time.monotonic) de la última comprobación del 'mtime'.
+    _last_check = 0.0
+    # Candado reentrante: los getters se llaman desde varios hilos
+    # (bucle de asyncio y ejecutores).
+    _lock = threading.RLock()
+    # Lista de suscriptores (referencias débiles o funciones).
+    _subscribers = []
+
     # Constructor de la clase
     def __init__(self):
-        # Llama al método privado '_load_config' al crear una instancia
-        # y almacena el resultado (un diccionario) en 'self._config'.
-        self._config = self._load_config()
+        # Carga (o reutiliza) la configuración compartida.
+        self._load_config()
+
+    # Propiedad de compatibilidad: 'self._config' siempre apunta
+    # a la configuración compartida y actualizada.
+    @property
+    def _config(self):
+        return self._load_config()
+
+    # --- Suscripciones ---
+
+    @classmethod
+    def subscribe(cls, callback):
+        """
+        Registra 'callback(changes)', que se llamará cada vez que cambie
+        algún valor. 'changes' es un diccionario {clave: (antes, después)}.
+        Los métodos de instancia se guardan con referencia débil para
+        que suscribirse no impida liberar el objeto.
+        """
+        if hasattr(callback, "__self__") and hasattr(callback, "__func__"):
+            ref = weakref.WeakMethod(callback)
+        else:
+            # Para funciones normales se usa una "referencia" fija.
+            ref = lambda: callback
+        with cls._lock:
+            cls._subscribers.append(ref)
+        return callback
+
+    @classmethod
+    def unsubscribe(cls, callback):
+        """Elimina un suscriptor registrado con 'subscribe'."""
+        with cls._lock:
+            cls._subscribers = [r for r in cls._subscribers if r() not in (None, callback)]
+
+    @classmethod
+    def _notify(cls, changes):
+        # No hay nada que notificar si no cambió ninguna clave.
+        if not changes:
+            return
+        with cls._lock:
+            # Limpia las referencias débiles cuyo objeto ya no existe.
+            cls._subscribers = [r for r in cls._subscribers if r() is not None]
+            callbacks = [r() for r in cls._subscribers]
+        # Las llamadas se hacen FUERA del candado para que un suscriptor
+        # pueda volver a leer la configuración sin bloquearse.
+        for callback in callbacks:
+            if callback is None:
+                continue
+            try:
+                callback(dict(changes))
+            except Exception:
+                # Un suscriptor defectuoso no debe romper al resto.
+                pass
+
+    @staticmethod
+    def _diff(old, new):
+        # Calcula {clave: (antes, después)} entre dos diccionarios.
+        old = old or {}
+        keys = set(old) | set(new)
+        return {k: (old.get(k), new.get(k)) for k in keys if old.get(k) != new.get(k)}
+
+    # --- Lectura / Escritura ---
 
-    # Método privado: Carga la configuración desde el archivo.
+    @classmethod
+    def invalidate(cls):
+        """
+        Fuerza a releer 'config.json' en el próximo acceso (ej. tras
+        cambiar de directorio de trabajo o escribir el archivo a mano).
+        """
+        with cls._lock:
+            cls._last_check = 0.0
+            cls._cache_stamp = None
+
+    @classmethod
+    def _file_stamp(cls):
+        # Devuelve (mtime_ns, tamaño) o None si el archivo no existe.
+        try:
+            st = os.stat(cls.CONFIG_FILE)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    # Método privado: Carga la configuración desde el archivo
+    # (solo si cambió desde la última lectura).
     def _load_config(self):
+        cls = type(self)
+        changes = None
+        with cls._lock:
+            now = time.monotonic()
+            # 0. Si hay caché y se comprobó hace poco, se devuelve tal cual.
+            if cls._cache is not None and now - cls._last_check < cls.STAT_INTERVAL:
+                return cls._cache
+            cls._last_check = now
+
+            stamp = cls._file_stamp()
+            # 1. Si el archivo no cambió, la caché sigue siendo válida.
+            if cls._cache is not None and stamp is not None and stamp == cls._cache_stamp:
+                return cls._cache
+
+            new_config = self._read_config(stamp)
+            changes = cls._diff(cls._cache, new_config) if cls._cache is not None else None
+            cls._cache = new_config
+            config = new_config
+        # Avisa a los suscriptores si el archivo se editó desde fuera.
+        self._notify(changes)
+        return config
+
+    def _read_config(self, stamp):
         # 1. Comprobar si el archivo existe.
-        if not os.path.exists(self.CONFIG_FILE):
+        if stamp is None:
             # Si no existe, guarda el diccionario por defecto y lo devuelve.
-            self._save_config(self.DEFAULT_CONFIG)
-            return self.DEFAULT_CONFIG
-        
+            config_data = copy.deepcopy(self.DEFAULT_CONFIG)
+            self._save_config(config_data)
+            return config_data
+
         # 2. Si el archivo existe, intentar leerlo.
         try:
             with open(self.CONFIG_FILE, 'r') as f:
                 # Carga el JSON del archivo en un diccionario Python.
                 config_data = json.load(f)
-                
+            type(self)._cache_stamp = stamp
+
             # 3. Asegurarse de que todas las claves por defecto existen.
             #    Esto es útil si la aplicación se actualiza y añade nuevas claves.
+            missing = False
             for key, value in self.DEFAULT_CONFIG.items():
                 if key not in config_data:
                     # Si falta una clave, la añade con su valor por defecto.
-                    config_data[key] = value
-            
-            # Vuelve a guardar el archivo (por si faltaba alguna clave).
-            self._save_config(config_data)
+                    config_data[key] = copy.deepcopy(value)
+                    missing = True
+
+            # Solo se reescribe el archivo si realmente faltaba alguna clave.
+            if missing:
+                self._save_config(config_data)
             return config_data
-            
+
         # 4. Si el archivo está corrupto (no es un JSON válido).
         except json.JSONDecodeError:
             print(f"Advertencia: {self.CONFIG_FILE} corrupto. Restaurando valores.")
             # Sobrescribe el archivo corrupto con los valores por defecto.
-            self._save_config(self.DEFAULT_CONFIG)
-            return self.DEFAULT_CONFIG
+            config_data = copy.deepcopy(self.DEFAULT_CONFIG)
+            self._save_config(config_data)
+            return config_data
 
-    # Método privado: Guarda un diccionario en el archivo 'config.json'.
+    # Método privado: Guarda un diccionario en el archivo 'config.json'
+    # de forma ATÓMICA (archivo temporal + 'os.replace').
     def _save_config(self, config_data):
-        # Abre el archivo en modo escritura ('w').
-        with open(self.CONFIG_FILE, 'w') as f:
-            # Escribe el 'config_data' en el archivo 'f'.
-            # 'indent=2' formatea el JSON para que sea legible.
-            json.dump(config_data, f, indent=2)
+        cls = type(self)
+        tmp_path = f"{self.CONFIG_FILE}.tmp"
+        with cls._lock:
+            # Escribe primero en un archivo temporal del mismo directorio.
+            with open(tmp_path, 'w') as f:
+                # 'indent=2' formatea el JSON para que sea legible.
+                json.dump(config_data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            # 'os.replace' sustituye el archivo en un solo paso: otro proceso
+            # nunca verá un 'config.json' a medio escribir.
+            os.replace(tmp_path, self.CONFIG_FILE)
+            # Recuerda la firma del archivo recién escrito para no releerlo.
+            cls._cache_stamp = cls._file_stamp()
+            cls._last_check = time.monotonic()
+
+    # Método privado: Cambia una clave solo si el valor es distinto.
+    # Devuelve True si hubo cambio (y por tanto escritura).
+    def _set_value(self, key, value):
+        cls = type(self)
+        with cls._lock:
+            current = self._load_config()
+            if key in current and current[key] == value:
+                return False
+            new_config = dict(current)
+            new_config[key] = value
+            self._save_config(new_config)
+            changes = cls._diff(current, new_config)
+            cls._cache = new_config
+        self._notify(changes)
+        return True
 
     # --- Métodos Públicos (Getters) ---
-    # Los getters recargan la configuración ('_load_config') cada vez que
-    # se llaman. Esto asegura que si el archivo se edita manualmente,
-    # la aplicación leerá los valores más recientes.
+    # Los getters usan la configuración en memoria. El archivo solo se
+    # vuelve a leer si se editó (cambia su 'mtime'), así que las ediciones
+    # manuales se siguen detectando sin leer ni escribir en cada llamada.
 
     def get_api_url(self):
-        self._config = self._load_config()
         # Devuelve el valor. Si la clave no existe por alguna razón,
         # usa el valor por defecto como respaldo.
         return self._config.get("api_url", self.DEFAULT_CONFIG["api_url"])
 
     def get_ping(self):
-        self._config = self._load_config()
-        # Nota: 'ping' no está en DEFAULT_CONFIG, así que usa 'ping'.
-        # Esto podría ser un error o una lógica intencional.
         return self._config.get("ping", self.DEFAULT_CONFIG["ping"])
 
     def get_download_interval(self):
-        self._config = self._load_config()
         return self._config.get("download_interval_minutes", self.DEFAULT_CONFIG["download_interval_minutes"])
 
+    def get_latency_probe_interval(self):
+        return self._config.get("latency_probe_seconds", self.DEFAULT_CONFIG["latency_probe_seconds"])
+
+    def get_hedge_requests(self):
+        return bool(self._config.get("hedge_requests", self.DEFAULT_CONFIG["hedge_requests"]))
+
+    def get_profiling(self):
+        return bool(self._config.get("profiling", self.DEFAULT_CONFIG["profiling"]))
+
+    def get_worker_pool_ratio(self):
+        return self._config.get("worker_pool_ratio", self.DEFAULT_CONFIG["worker_pool_ratio"])
+
+    def get_retention(self):
+        # Combina los valores por defecto con los del archivo, por si
+        # 'config.json' solo define algunas de las claves.
+        policy = dict(self.DEFAULT_CONFIG["retention"])
+        configured = self._config.get("retention")
+        if isinstance(configured, dict):
+            policy.update(configured)
+        if policy["compression"] not in ("gz", "bz2", "xz"):
+            policy["compression"] = "gz"
+        return policy
+
+    def get_profiles(self):
+        """
+        Devuelve la lista de perfiles de API (diccionarios). El primero es
+        el principal ("default"): usa las claves de primer nivel y guarda
+        los datos en 'db'. Cada perfil de "profiles" tiene sus credenciales,
+        su URL (si no la indica, la principal), sus endpoints y su
+        subcarpeta 'db/<data_dir>'. Los perfiles no válidos se omiten
+        (ver 'get_invalid_profiles').
+        """
+        return self._load_profiles()[0]
+
+    def get_invalid_profiles(self):
+        """Devuelve {nombre: motivo} de los perfiles de "profiles" que se omiten."""
+        return self._load_profiles()[1]
+
+    def _load_profiles(self):
+        # Devuelve (perfiles válidos, {nombre: motivo} de los omitidos).
+        config = self._config
+        invalid = {}
+        profiles = [{
+            "name": self.DEFAULT_PROFILE,
+            "api_url": self.get_api_url(),
+            "ping": self.get_ping(),
+            "username": self.get_email(),
+            "password": self.get_password(),
+            "endpoints": dict(self.DEFAULT_ENDPOINTS),
+            "db_path": "db",
+            "data_dir": None,
+            "rate_limit": self._rate(config.get("rate_limit_per_second")),
+        }]
+        configured = config.get("profiles")
+        if not isinstance(configured, dict):
+            return profiles, invalid
+        # Carpetas ya usadas (en minúsculas: en Windows 'A' y 'a' son la misma)
+        used = set()
+        for name, profile in configured.items():
+            # Se ignoran las entradas mal formadas y las que usarían el nombre del principal
+            if not isinstance(profile, dict):
+                invalid[name] = "La entrada debe ser un objeto JSON."
+                continue
+            if name == self.DEFAULT_PROFILE:
+                invalid[name] = f"'{self.DEFAULT_PROFILE}' es el nombre del perfil principal."
+                continue
+            # 'data_dir' es UNA carpeta dentro de 'db': nada de rutas, '.' ni '..'
+            data_dir = str(profile.get("data_dir") or name).strip()
+            if not self.DATA_DIR_PATTERN.match(data_dir) or data_dir.lower().endswith(".json"):
+                invalid[name] = (f"Carpeta de datos no válida: '{data_dir}' (solo letras, números, "
+                                 f"'_', '-' y '.', sin rutas ni terminar en '.json').")
+                continue
+            if data_dir.lower() in self.RESERVED_DATA_DIRS:
+                invalid[name] = f"La carpeta de datos 'db/{data_dir}' está reservada."
+                continue
+            if data_dir.lower() in used:
+                invalid[name] = f"La carpeta de datos 'db/{data_dir}' ya la usa otro perfil."
+                continue
+            used.add(data_dir.lower())
+            endpoints = dict(self.DEFAULT_ENDPOINTS)
+            if isinstance(profile.get("endpoints"), dict):
+                endpoints.update((k, v) for k, v in profile["endpoints"].items() if k in endpoints)
+            profiles.append({
+                "name": name,
+                "api_url": profile.get("api_url") or self.get_api_url(),
+                "ping": profile.get("ping") or self.get_ping(),
+                "username": profile.get("username"),
+                "password": profile.get("password"),
+                "endpoints": endpoints,
+                "db_path": os.path.join("db", data_dir),
+                # Nombre seguro para archivos del perfil (ej. 'logs/latency')
+                "data_dir": data_dir,
+                "rate_limit": self._rate(profile.get("rate_limit_per_second")),
+            })
+        return profiles, invalid
+
+    def get_profile(self, name):
+        """Devuelve el perfil 'name' o None si no existe."""
+        return next((p for p in self.get_profiles() if p["name"] == name), None)
+
+    @staticmethod
+    def _rate(value):
+        # Peticiones por segundo como número positivo (0 = sin límite).
+        try:
+            return max(float(value or 0), 0.0)
+        except (TypeError, ValueError):
+            return 0.0
+
     def get_email(self):
-        # No recarga, usa la configuración en memoria.
         # Devolverá 'None' si "username" no existe en el config.
         return self._config.get("username")
 
     def get_password(self):
-        # No recarga, usa la configuración en memoria.
         # Devolverá 'None' si "password" no existe en el config.
         return self._config.get("password")
 
     # --- Métos Públicos (Setters) ---
-    # Los setters actualizan el valor en 'self._config' y
-    # luego llaman a '_save_config' para persistir el cambio en el disco.
+    # Los setters solo escriben en el disco si el valor cambia,
+    # y avisan a los suscriptores del cambio.
 
     def set_api_url(self, new_url):
-        self._config["api_url"] = new_url
-        self._save_config(self._config)
+        self._set_value("api_url", new_url)
         print(f"URL de API actualizada a: {new_url}")
-    
+
     def set_ping(self, new_ping):
-        self._config["ping"] = new_ping
-        self._save_config(self._config)
+        self._set_value("ping", new_ping)
         print(f"HOST de API actualizado a: {new_ping}")
-          
+
     def set_download_interval(self, minutes):
         try:
             # Intenta convertir la entrada (que puede ser un string) a un entero.
             minutes_int = int(minutes)
-            
+
             # Valida que el número sea positivo.
             if minutes_int <= 0:
                 print("El intervalo debe ser un número positivo.")
                 return # No guarda el cambio
-                
-            # Actualiza el diccionario y guarda el archivo.
-            self._config["download_interval_minutes"] = minutes_int
-            self._save_config(self._config)
+
+            # Actualiza el valor (y el archivo, si cambió).
+            self._set_value("download_interval_minutes", minutes_int)
             print(f"Intervalo de descarga actualizado a: {minutes_int} minutos.")
-            
+
         # Se activa si 'int(minutes)' falla (ej. si la entrada es "abc").
         except ValueError:
             print("Entrada no válida. Debe ser un número entero.")
 
     # --- Método de Visualización ---
-    
+
     def get_config_display(self):
-        # Recarga la configuración para asegurar que muestra los datos más frescos.
-        self._config = self._load_config()
         # Devuelve una cadena de texto (string) del JSON formateado.
-        return json.dumps(self._config, indent=2)
\ No newline at end of file
+        return json.dumps(self._config, indent=2)
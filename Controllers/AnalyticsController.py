@@ -0,0 +1,23 @@
+# Controllers/AnalyticsController.py
+
+# Importa el servicio que calcula las estadísticas de los contactos
+from Services.AnalyticsService import AnalyticsService
+
+# Define la clase AnalyticsController.
+# Recibe la petición de estadísticas y la pasa al servicio.
+class AnalyticsController:
+
+    # Constructor de la clase
+    def __init__(self):
+        self.analyticsService = AnalyticsService()
+
+    # Método para obtener las estadísticas (actuales y por snapshot)
+    def get_summary(self, history=True):
+        # Mismo manejo de errores que el resto de controladores:
+        # se imprime el error y se devuelve None.
+        try:
+            return self.analyticsService.summary(history)
+        except RuntimeError as e:
+            print(f"Error de flujo: {e}")
+        except Exception as e:
+            print(f"Error inesperado: {e}")
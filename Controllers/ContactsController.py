@@ -12,11 +12,12 @@ class ContactsController:
         self.contactService = ContactsService()
     
     # Método para obtener todos los contactos
-    def get_all_contacts(self):
+    # ('as_of': ver los contactos tal y como estaban en esa fecha)
+    def get_all_contacts(self, as_of=None):
         # Inicia un bloque 'try' para manejar los errores que puedan ocurrir.
         try:
             # Llama al método get_all_contacts() del servicio para obtener los datos.
-            contacts = self.contactService.get_all_contacts()
+            contacts = self.contactService.get_all_contacts(as_of)
             # Si la llamada es exitosa, devuelve la lista de contactos.
             return contacts
         
@@ -29,4 +30,24 @@ class ContactsController:
         # Captura cualquier otro tipo de error genérico (Exception) que no sea RuntimeError.
         except Exception as e:
             # Imprime un mensaje indicando que fue un error no esperado.
-            print(f"Error inesperado: {e}")
\ No newline at end of file
+            print(f"Error inesperado: {e}")
+    
+    # Método para buscar contactos (por id, nombre o email)
+    def search_contacts(self, query, as_of=None):
+        # Mismo manejo de errores que 'get_all_contacts'.
+        try:
+            return self.contactService.search_contacts(query, as_of)
+        except RuntimeError as e:
+            print(f"Error de flujo: {e}")
+        except Exception as e:
+            print(f"Error inesperado: {e}")
+    
+    # Método para filtrar contactos por sus marcas (cliente / destacado)
+    def filter_contacts(self, is_client=None, is_featured=None, as_of=None):
+        # Mismo manejo de errores que 'get_all_contacts'.
+        try:
+            return self.contactService.filter_contacts(is_client, is_featured, as_of)
+        except RuntimeError as e:
+            print(f"Error de flujo: {e}")
+        except Exception as e:
+            print(f"Error inesperado: {e}")
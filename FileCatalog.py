@@ -0,0 +1,223 @@
+# FileCatalog.py
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime
+# Lector JSON incremental (para contar registros sin cargar el archivo)
+import JsonStream
+
+# Define la ruta del directorio base para todos los archivos
+DB_PATH = "db"
+# Archivo donde se guarda el catálogo entre ejecuciones.
+# No termina en '.json', así que el vigilante de archivos lo ignora.
+CATALOG_FILE = ".catalog"
+
+# Tipos de dataset conocidos (nombre del archivo sin el timestamp).
+DATASET_TYPES = ("clients", "contacts", "featured_clients")
+# Nombre de los archivos históricos: <dataset>_<YYYYmmddHHMMSS>.json
+_SNAPSHOT_RE = re.compile(r"^(?P<dataset>.+)_(?P<ts>\d{14})\.json$")
+
+def classify(filename):
+    """
+    Devuelve (dataset, timestamp) a partir del nombre del archivo.
+    - "contacts.json"                -> ("contacts", None)
+    - "contacts_20251105123819.json" -> ("contacts", "20251105123819")
+    - Cualquier otro archivo         -> ("otro", None)
+    """
+    match = _SNAPSHOT_RE.match(filename)
+    if match:
+        base, timestamp = match.group("dataset"), match.group("ts")
+    else:
+        base, timestamp = filename[:-len(".json")] if filename.endswith(".json") else filename, None
+    if base not in DATASET_TYPES:
+        return "otro", None
+    return base, timestamp
+
+# Define una clase con los metadatos de un archivo de 'db'.
+class CatalogEntry:
+    __slots__ = ("name", "size", "mtime_ns", "records", "sha256", "dataset", "timestamp", "error")
+
+    # Constructor de la clase
+    def __init__(self, name, size, mtime_ns, records=None, sha256=None, error=None):
+        self.name = name
+        self.size = size
+        self.mtime_ns = mtime_ns
+        # Número de registros (elementos de los arrays de primer nivel)
+        self.records = records
+        # Hash del contenido (sirve para saber si dos archivos son iguales)
+        self.sha256 = sha256
+        # Mensaje de error si el archivo no es un JSON válido
+        self.error = error
+        self.dataset, self.timestamp = classify(name)
+
+    @property
+    def modified(self):
+        """Fecha de modificación como 'datetime'."""
+        return datetime.fromtimestamp(self.mtime_ns / 1e9)
+
+    def to_dict(self):
+        return {
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "records": self.records,
+            "sha256": self.sha256,
+            "error": self.error,
+        }
+
+    @classmethod
+    def from_dict(cls, name, data):
+        return cls(name, data["size"], data["mtime_ns"], data.get("records"),
+                   data.get("sha256"), data.get("error"))
+
+# Define la clase FileCatalog: mantiene los metadatos de los archivos de 'db'.
+# Solo vuelve a leer un archivo si cambió su tamaño o su 'mtime'.
+class FileCatalog:
+
+    # Constructor de la clase
+    def __init__(self, db_path=DB_PATH):
+        self._db_path = db_path
+        self._cache_path = os.path.join(db_path, CATALOG_FILE)
+        # Diccionario {nombre de archivo: CatalogEntry}
+        self._entries = {}
+        self._loaded = False
+        # Candado: el catálogo se actualiza desde el vigilante y desde
+        # la sincronización, que corren en hilos distintos. Solo protege el
+        # diccionario: leer y calcular el hash de los archivos se hace fuera,
+        # para que 'get' (ej. desde el bucle de eventos) nunca espere a la E/S.
+        self._lock = threading.Lock()
+        # Candado de la escritura del catálogo en disco (un solo temporal)
+        self._save_lock = threading.Lock()
+
+    # --- Persistencia ---
+
+    def _load_cache(self):
+        # Carga el catálogo guardado (solo la primera vez).
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self._cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._entries = {name: CatalogEntry.from_dict(name, e) for name, e in data.items()}
+        except (OSError, ValueError, KeyError):
+            # Sin catálogo previo (o dañado): se reconstruye al refrescar.
+            self._entries = {}
+
+    def _save_cache(self, data):
+        # Guarda el catálogo ('data', ya serializable) de forma atómica.
+        tmp_path = f"{self._cache_path}.tmp"
+        with self._save_lock:
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self._cache_path)
+            except OSError:
+                # El catálogo es solo una caché: si no se puede guardar,
+                # se reconstruirá en la próxima ejecución.
+                pass
+
+    # --- Escaneo ---
+
+    def _scan(self, name, st):
+        """Lee un archivo y calcula su hash y su número de registros."""
+        filepath = os.path.join(self._db_path, name)
+        digest = hashlib.sha256()
+        try:
+            # 1. Hash del contenido, leyendo por bloques.
+            with open(filepath, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(block)
+            # 2. Número de registros, en streaming.
+            records = sum(1 for _ in JsonStream.iter_records(filepath))
+            return CatalogEntry(name, st.st_size, st.st_mtime_ns, records, digest.hexdigest())
+        except (ValueError, UnicodeDecodeError) as e:
+            # El archivo no es un JSON válido: se registra igualmente.
+            return CatalogEntry(name, st.st_size, st.st_mtime_ns, None, digest.hexdigest(), str(e))
+
+    def _scan_changed(self, names, known):
+        """
+        SIN el candado: lee los archivos de 'names' cuyo tamaño o 'mtime'
+        no coincide con 'known' ({nombre: (tamaño, mtime)}).
+        Devuelve (entradas nuevas, nombres que ya no existen).
+        """
+        scanned, missing = [], set()
+        for name in names:
+            try:
+                st = os.stat(os.path.join(self._db_path, name))
+            except OSError:
+                missing.add(name)
+                continue
+            # Si ni el tamaño ni el 'mtime' cambiaron, NO se vuelve a leer.
+            if known.get(name) == (st.st_size, st.st_mtime_ns):
+                continue
+            scanned.append(self._scan(name, st))
+        return scanned, missing
+
+    def _apply(self, scanned, missing):
+        # CON el candado: coloca las entradas leídas. Devuelve los nombres que cambiaron.
+        changed = set()
+        for name in missing:
+            if self._entries.pop(name, None) is not None:
+                changed.add(name)
+        for entry in scanned:
+            current = self._entries.get(entry.name)
+            # Otro hilo pudo colocar entretanto una lectura más reciente
+            if current is not None and current.mtime_ns > entry.mtime_ns:
+                continue
+            self._entries[entry.name] = entry
+            changed.add(entry.name)
+        return changed
+
+    def _known(self):
+        # CON el candado: {nombre: (tamaño, mtime)} de lo que ya está leído.
+        self._load_cache()
+        return {name: (e.size, e.mtime_ns) for name, e in self._entries.items()}
+
+    def refresh(self, filenames):
+        """
+        Sincroniza el catálogo con la lista de archivos actual.
+        Devuelve el conjunto de nombres añadidos, modificados o eliminados.
+        ¡Esta función es BLOQUEANTE (E/S)! Usar con 'run_in_executor'.
+        """
+        with self._lock:
+            known = self._known()
+        scanned, missing = self._scan_changed(filenames, known)
+        with self._lock:
+            wanted = set(filenames)
+            changed = {name for name in self._entries if name not in wanted}
+            for name in changed:
+                del self._entries[name]
+            changed |= self._apply(scanned, missing)
+            data = {name: e.to_dict() for name, e in self._entries.items()} if changed else None
+        if data is not None:
+            self._save_cache(data)
+        return changed
+
+    def refresh_file(self, name):
+        """Actualiza un único archivo (ej. recién escrito por la sincronización)."""
+        with self._lock:
+            known = self._known()
+        scanned, missing = self._scan_changed([name], known)
+        with self._lock:
+            changed = self._apply(scanned, missing)
+            data = {n: e.to_dict() for n, e in self._entries.items()} if changed else None
+        if data is not None:
+            self._save_cache(data)
+
+    # --- Consulta ---
+
+    def get(self, name):
+        """Devuelve la entrada de un archivo o None."""
+        with self._lock:
+            return self._entries.get(name)
+
+    def entries(self):
+        """Devuelve una lista con todas las entradas del catálogo."""
+        with self._lock:
+            return list(self._entries.values())
+
+# --- Instancia Global ---
+# Igual que 'global_state', se comparte una única instancia del catálogo.
+file_catalog = FileCatalog()
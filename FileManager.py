@@ -5,6 +5,10 @@ import subprocess
 # Platform nos deja saber el sistema operativo (Windows, Linux, etc.)
 import platform
 import sys
+# Lector JSON incremental usado por el visor paginado
+import JsonStream
+# Motor de retención (archivado de snapshots antiguos)
+import SnapshotRetention
 
 # Define la ruta del directorio base para todos los archivos
 DB_PATH = "db"
@@ -27,55 +31,183 @@ def _get_editor():
     # Si no se encuentra ninguno, usa 'vi' como último recurso.
     return "vi"
 
-def view_db_file(filename):
+# Número de entradas (registros) que se muestran por página en el visor
+PAGE_SIZE = 10
+
+def _format_entry(key, index, value):
+    """
+    Función auxiliar privada: formatea una entrada de 'JsonStream.iter_entries'.
+    Los registros se formatean de uno en uno (nunca el archivo entero).
+    """
+    if index is None:
+        # Miembro simple del objeto raíz (ej. "Num Contactos": 20)
+        prefix = f'"{key}": ' if key is not None else ""
+        return prefix + json.dumps(value, indent=2, ensure_ascii=False)
+    # Registro de un array: se indica su posición (ej. [contactos #3])
+    header = f"[{key} #{index}]" if key is not None else f"[#{index}]"
+    return header + "\n" + json.dumps(value, indent=2, ensure_ascii=False)
+
+def _entries_from(filepath, position):
+    """
+    Función auxiliar privada: abre el archivo en streaming y salta
+    las primeras 'position' entradas. Devuelve el generador ya posicionado.
+    """
+    entries = JsonStream.iter_entries(filepath)
+    for _ in range(position):
+        if next(entries, None) is None:
+            break
+    return entries
+
+def _find_position(filepath, match):
     """
-    Función para ver (imprimir) el contenido de un archivo JSON.
-    Esta función es síncrona pero rápida (solo lee).
+    Función auxiliar privada: recorre el archivo en streaming y devuelve
+    la posición de la primera entrada que cumple 'match', o None.
+    """
+    for position, entry in enumerate(JsonStream.iter_entries(filepath)):
+        if match(*entry):
+            return position
+    return None
+
+def view_db_file(filename, page_size=PAGE_SIZE):
+    """
+    Visor paginado de un archivo JSON.
+    El archivo se recorre en streaming ('JsonStream'): solo se decodifica
+    la página actual, así que se abre al instante sea cual sea su tamaño.
+    ¡IMPORTANTE: Esta función es BLOQUEANTE!
+    Contiene un 'input()' por página; debe llamarse con 'run_in_executor'.
+    Comandos: Enter (siguiente), 'p' (anterior), 'i N' (ir al registro N),
+    'id X' (ir al registro con id X), 'q' (salir).
     """
     # Construye la ruta completa al archivo (ej: "db/clients.json").
     filepath = os.path.join(DB_PATH, filename)
+    if not os.path.exists(filepath):
+        print(f"Error: El archivo '{filename}' no se encontró.")
+        return
+
+    # 'position' es el número de entrada con el que empieza la página actual.
+    position = 0
+    entries = _entries_from(filepath, position)
     try:
-        # Abre y lee el archivo.
-        with open(filepath, 'r', encoding='utf-8') as f:
-            # 'json.load' convierte el texto del archivo en un objeto Python.
-            data = json.load(f)
-        
-        # Imprime el encabezado y el contenido.
-        print(f"--- Contenido de {filename} ---")
-        # 'json.dumps' convierte el objeto Python de nuevo a un string JSON,
-        # pero formateado (indent=2) y con caracteres UTF-8 (ensure_ascii=False).
-        print(json.dumps(data, indent=2, ensure_ascii=False))
-        print("---------------------------------")
+        while True:
+            # Lee (y formatea) solo las entradas de esta página.
+            page = []
+            for entry in entries:
+                page.append(_format_entry(*entry))
+                if len(page) >= page_size:
+                    break
+
+            print(f"--- Contenido de {filename} (entradas {position + 1}-{position + len(page)}) ---")
+            for text in page:
+                print(text)
+            at_end = len(page) < page_size
+            print("--- Fin del archivo ---" if at_end else "---------------------------------")
+
+            command = input("[Enter] siguiente, [p] anterior, [i N] índice, [id X] id, [q] salir: ").strip()
+            lowered = command.lower()
+            if lowered == "q":
+                return
+            elif lowered == "p":
+                # Retrocede una página (se vuelve a abrir el archivo en streaming).
+                position = max(0, position - page_size)
+                entries = _entries_from(filepath, position)
+            elif lowered.startswith("id "):
+                # Busca un registro por su campo 'id' (se compara como texto).
+                wanted = command[3:].strip()
+                found = _find_position(
+                    filepath,
+                    lambda key, index, value: index is not None and isinstance(value, dict)
+                    and str(value.get("id")) == wanted)
+                if found is None:
+                    print(f"No se encontró ningún registro con id {wanted}.")
+                    entries = _entries_from(filepath, position)
+                else:
+                    position = found
+                    entries = _entries_from(filepath, position)
+            elif lowered.startswith("i "):
+                # Salta a la posición N de los registros (empezando en 0).
+                try:
+                    wanted = int(command[2:].strip())
+                except ValueError:
+                    print("Índice no válido.")
+                    entries = _entries_from(filepath, position)
+                    continue
+                found = _find_position(filepath, lambda key, index, value: index == wanted)
+                if found is None:
+                    print(f"No existe el registro {wanted}.")
+                    entries = _entries_from(filepath, position)
+                else:
+                    position = found
+                    entries = _entries_from(filepath, position)
+            elif at_end:
+                # Al final del archivo, Enter vuelve a mostrar la última página.
+                entries = _entries_from(filepath, position)
+            else:
+                # Siguiente página: el generador continúa donde se quedó.
+                position += len(page)
     except Exception as e:
         print(f"Error al leer el archivo: {e}")
+    finally:
+        # Cierra el archivo si el generador quedó a medias.
+        entries.close()
 
-def delete_db_file(filename):
+def delete_db_files(filenames):
     """
-    Función para eliminar un archivo de la base de datos.
+    Elimina varios archivos de la base de datos con UNA sola confirmación.
     ¡IMPORTANTE: Esta función es BLOQUEANTE!
-    Contiene un 'input()' que detiene el hilo de ejecución.
-    Debe ser llamada con 'run_in_executor' en un entorno asyncio.
+    Contiene un 'input()'; debe ser llamada con 'run_in_executor'.
+    Devuelve el número de archivos eliminados.
+    """
+    existing = [f for f in filenames if os.path.exists(os.path.join(DB_PATH, f))]
+    if not existing:
+        print("Error: Ninguno de los archivos se encontró.")
+        return 0
+
+    print("Se eliminarán los siguientes archivos:")
+    for filename in existing:
+        print(f"  - {filename}")
+    confirm = input(f"¿Seguro que quieres eliminar {len(existing)} archivo(s)? (s/n): ").strip().lower()
+    if confirm != 's':
+        print("Eliminación cancelada.")
+        return 0
+
+    deleted = 0
+    for filename in existing:
+        try:
+            os.remove(os.path.join(DB_PATH, filename))
+            deleted += 1
+        except OSError as e:
+            print(f"Error al eliminar '{filename}': {e}")
+    print(f"{deleted} archivo(s) eliminado(s) con éxito.")
+    return deleted
+
+def apply_retention_policy():
+    """
+    Muestra el plan de la política de retención y, tras confirmar,
+    archiva los snapshots caducados en un paquete comprimido.
+    ¡IMPORTANTE: Esta función es BLOQUEANTE (contiene 'input()')!
+    Devuelve True si se archivó algo.
     """
-    filepath = os.path.join(DB_PATH, filename)
     try:
-        if not os.path.exists(filepath):
-            print(f"Error: El archivo '{filename}' no se encontró.")
+        plan, _ = SnapshotRetention.run_retention(dry_run=True)
+        print(plan.describe())
+        if not plan.expire:
+            print("No hay snapshots que archivar.")
             return False
-        
-        # Esta llamada 'input()' es síncrona y bloqueante.
-        # Detiene la ejecución aquí hasta que el usuario presione Enter.
-        confirm = input(f"¿Seguro que quieres eliminar '{filename}'? (s/n): ").strip().lower()
-        
-        if confirm == 's':
-            # Elimina el archivo del disco.
-            os.remove(filepath)
-            print(f"Archivo '{filename}' eliminado con éxito.")
-            return True # Indicar éxito
-        else:
-            print("Eliminación cancelada.")
-            return False # Indicar cancelación
+        for entry in plan.expire:
+            print(f"  - {entry.name}")
+        confirm = input("¿Archivar estos snapshots? (s/n): ").strip().lower()
+        if confirm != 's':
+            print("Operación cancelada.")
+            return False
+        # Se archiva exactamente el plan confirmado
+        _, bundle = SnapshotRetention.run_retention(plan=plan)
+        if not bundle:
+            print("Los snapshots del plan ya no están en 'db'. No se archivó nada.")
+            return False
+        print(f"Snapshots archivados en '{bundle}'.")
+        return True
     except Exception as e:
-        print(f"Error al eliminar el archivo: {e}")
+        print(f"Error al aplicar la retención: {e}")
         return False
 
 # --- NUEVAS FUNCIONES (BLOQUEANTES) ---
@@ -0,0 +1,122 @@
+# JsonStream.py
+import json
+import re
+
+# Tamaño (en caracteres) de cada bloque leído del archivo
+CHUNK_SIZE = 64 * 1024
+
+# Decodificador reutilizable: 'raw_decode' decodifica UN valor JSON
+# a partir de una posición y devuelve dónde termina.
+_decoder = json.JSONDecoder()
+# Expresión regular para saltar espacios en blanco (implementada en C)
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# Define un lector incremental: mantiene en memoria solo el bloque
+# actual del archivo (más el valor que se esté decodificando).
+class _Reader:
+
+    # Constructor de la clase
+    def __init__(self, f, chunk_size):
+        self._f = f
+        self._chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        # Descarta lo ya consumido y añade el siguiente bloque.
+        # Devuelve False si se llegó al final del archivo.
+        data = self._f.read(self._chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Devuelve el siguiente carácter no blanco (sin consumirlo) o "" al final."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars):
+        """Consume el siguiente carácter, que debe ser uno de 'chars'."""
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError(f"JSON inválido: se esperaba {chars!r} y se encontró {c!r}")
+        self.pos += 1
+        return c
+
+    def value(self):
+        """Decodifica el siguiente valor JSON completo."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # Un valor que termina justo al final del búfer podría estar
+                # cortado (ej. el número 12 de 123): se lee más antes de aceptarlo.
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+def _iter_array(reader, key):
+    # Genera los elementos de un array uno a uno (el '[' ya se consumió).
+    if reader.peek() == "]":
+        reader.pos += 1
+        return
+    index = 0
+    while True:
+        yield key, index, reader.value()
+        index += 1
+        if reader.expect(",]") == "]":
+            return
+
+def iter_entries(filepath, chunk_size=CHUNK_SIZE):
+    """
+    Recorre un archivo JSON SIN cargarlo entero en memoria.
+    Genera tuplas (clave, índice, valor):
+    - Cada elemento de un array de primer nivel -> (clave del array, índice, elemento).
+      Si la raíz es un array, la clave es None.
+    - Cualquier otro miembro del objeto raíz -> (clave, None, valor).
+    Los archivos de 'db' son de la forma {"Num Contactos": 20, "contactos": [...]},
+    así que cada registro se obtiene por separado.
+    """
+    with open(filepath, "r", encoding="utf-8") as f:
+        reader = _Reader(f, chunk_size)
+        c = reader.peek()
+        # Raíz de tipo array: se recorren sus elementos
+        if c == "[":
+            reader.pos += 1
+            yield from _iter_array(reader, None)
+        # Raíz de tipo objeto: se recorren sus miembros
+        elif c == "{":
+            reader.pos += 1
+            if reader.peek() == "}":
+                return
+            while True:
+                key = reader.value()
+                reader.expect(":")
+                if reader.peek() == "[":
+                    reader.pos += 1
+                    yield from _iter_array(reader, key)
+                else:
+                    yield key, None, reader.value()
+                if reader.expect(",}") == "}":
+                    return
+        # Raíz escalar (ej. un número): un único valor
+        elif c:
+            yield None, None, reader.value()
+
+def iter_records(filepath, chunk_size=CHUNK_SIZE):
+    """Genera solo los registros (elementos de los arrays de primer nivel)."""
+    for _, index, value in iter_entries(filepath, chunk_size):
+        if index is not None:
+            yield value
@@ -0,0 +1,161 @@
+# LatencyHistogram.py
+import time
+
+# Define un histograma de latencias al estilo HDR (High Dynamic Range).
+#
+# Los valores se guardan en microsegundos en cubetas "log-lineales":
+# cada potencia de 2 se divide en 2^(SUB_BUCKET_BITS - 1) cubetas iguales,
+# así que el error relativo de cualquier percentil es < 1% y la memoria
+# no depende del número de muestras.
+class LatencyHistogram:
+    # Bits de precisión: 7 -> 64 cubetas por potencia de 2 (error < 1% con el punto medio)
+    SUB_BUCKET_BITS = 7
+
+    # Constructor de la clase
+    def __init__(self):
+        # Diccionario disperso {índice de cubeta: número de muestras}
+        self._counts = {}
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = None
+
+    # --- Cálculo de cubetas ---
+
+    @classmethod
+    def _index(cls, value_us):
+        # Los valores pequeños tienen su propia cubeta (precisión exacta).
+        if value_us < (1 << cls.SUB_BUCKET_BITS):
+            return value_us
+        # 'shift' = cuántos bits de precisión se descartan.
+        shift = value_us.bit_length() - cls.SUB_BUCKET_BITS
+        # 'mantissa' queda en [2^(BITS-1), 2^BITS).
+        mantissa = value_us >> shift
+        return (shift << (cls.SUB_BUCKET_BITS - 1)) + mantissa
+
+    @classmethod
+    def _value(cls, index):
+        # Operación inversa de '_index': devuelve el punto medio de la cubeta.
+        if index < (1 << cls.SUB_BUCKET_BITS):
+            return float(index)
+        shift = (index >> (cls.SUB_BUCKET_BITS - 1)) - 1
+        mantissa = index - (shift << (cls.SUB_BUCKET_BITS - 1))
+        return (mantissa + 0.5) * (1 << shift)
+
+    # --- Registro y consulta ---
+
+    def record(self, seconds):
+        """Añade una muestra (en segundos)."""
+        value_us = max(0, int(seconds * 1_000_000))
+        index = self._index(value_us)
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self.count += 1
+        self.total_us += value_us
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+        self.max_us = value_us if self.max_us is None else max(self.max_us, value_us)
+
+    def merge(self, other):
+        """Suma las muestras de otro histograma a este."""
+        for index, n in other._counts.items():
+            self._counts[index] = self._counts.get(index, 0) + n
+        self.count += other.count
+        self.total_us += other.total_us
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+        if other.max_us is not None:
+            self.max_us = other.max_us if self.max_us is None else max(self.max_us, other.max_us)
+
+    def halve(self):
+        """
+        Divide todos los contadores entre 2. Sirve para "envejecer" las
+        muestras antiguas y que el histograma se adapte a cambios.
+        """
+        self._counts = {i: n // 2 for i, n in self._counts.items() if n // 2}
+        self.count = sum(self._counts.values())
+        self.total_us //= 2
+
+    def to_dict(self):
+        """Convierte el histograma en un diccionario serializable a JSON."""
+        return {
+            "counts": {str(i): n for i, n in self._counts.items()},
+            "total_us": self.total_us,
+            "min_us": self.min_us,
+            "max_us": self.max_us,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstruye un histograma a partir de 'to_dict'."""
+        histogram = cls()
+        histogram._counts = {int(i): int(n) for i, n in data.get("counts", {}).items()}
+        histogram.count = sum(histogram._counts.values())
+        histogram.total_us = int(data.get("total_us", 0))
+        histogram.min_us = data.get("min_us")
+        histogram.max_us = data.get("max_us")
+        return histogram
+
+    def percentile(self, p):
+        """Devuelve el percentil 'p' (0-100) en segundos, o None si está vacío."""
+        if not self.count:
+            return None
+        # Número de muestras que deben quedar por debajo del percentil.
+        target = max(1, int(round(self.count * p / 100.0)))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= target:
+                # Nunca se devuelve un valor fuera del rango observado.
+                value = min(max(self._value(index), self.min_us), self.max_us)
+                return value / 1_000_000
+        return self.max_us / 1_000_000
+
+    def summary(self):
+        """Resumen en milisegundos: count, p50, p95, p99, max y media."""
+        def ms(seconds):
+            return None if seconds is None else round(seconds * 1000, 2)
+        return {
+            "count": self.count,
+            "p50_ms": ms(self.percentile(50)),
+            "p95_ms": ms(self.percentile(95)),
+            "p99_ms": ms(self.percentile(99)),
+            "max_ms": ms(None if self.max_us is None else self.max_us / 1_000_000),
+            "mean_ms": ms(self.total_us / self.count / 1_000_000) if self.count else None,
+        }
+
+# Define un histograma "deslizante": una ventana de tiempo dividida en
+# ranuras. Las ranuras caducadas se descartan, así los percentiles
+# reflejan solo los últimos 'window_seconds'.
+class RollingHistogram:
+
+    # Constructor de la clase
+    def __init__(self, window_seconds=900, slots=15, clock=time.monotonic):
+        # Duración de cada ranura en segundos
+        self._slot_seconds = window_seconds / slots
+        self._slots = slots
+        self._clock = clock
+        # Lista de tuplas (número de ranura, histograma)
+        self._buckets = []
+
+    def _current(self):
+        # Número de ranura para el instante actual
+        slot = int(self._clock() // self._slot_seconds)
+        # Descarta las ranuras que ya salieron de la ventana
+        self._buckets = [(s, h) for s, h in self._buckets if s > slot - self._slots]
+        if not self._buckets or self._buckets[-1][0] != slot:
+            self._buckets.append((slot, LatencyHistogram()))
+        return self._buckets[-1][1]
+
+    def record(self, seconds):
+        """Añade una muestra (en segundos) a la ranura actual."""
+        self._current().record(seconds)
+
+    def merged(self):
+        """Devuelve un 'LatencyHistogram' con todas las ranuras vigentes."""
+        self._current()
+        result = LatencyHistogram()
+        for _, histogram in self._buckets:
+            result.merge(histogram)
+        return result
+
+    def summary(self):
+        return self.merged().summary()
@@ -0,0 +1,223 @@
+# LoopMonitor.py
+# Vigila la salud del bucle de asyncio. Mide:
+# - El retraso de planificación ("lag"): cuánto tarda en despertar una
+#   tarea que pidió dormir 'interval' segundos. Si algo bloquea el bucle
+#   (ej. un 'input()' o una lectura de disco llamados sin 'run_in_executor'),
+#   el retraso crece.
+# - Las llamadas lentas: si el bucle no responde en 'slow_threshold'
+#   segundos, un hilo vigilante captura la pila del hilo del bucle
+#   (con 'sys._current_frames') para saber QUÉ lo estaba bloqueando.
+# - La saturación del ejecutor por defecto ('run_in_executor(None, ...)'):
+#   tareas en cola, en ejecución y tiempo de espera hasta empezar.
+# Todo se publica en la sección "event_loop" de 'logs/metrics.json' y las
+# llamadas lentas se anotan también en 'logs/loop_monitor.log'.
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+# Importa los histogramas deslizantes y el registro de métricas
+from LatencyHistogram import RollingHistogram
+from Metrics import metrics
+
+# Ruta del log de llamadas lentas
+LOG_PATH = os.path.join("logs", "loop_monitor.log")
+# Segundos entre dos medidas del retraso
+INTERVAL = 0.25
+# Un bloqueo del bucle mayor que esto (segundos) se considera "llamada lenta"
+SLOW_THRESHOLD = 0.1
+# Segundos entre dos publicaciones en 'logs/metrics.json'
+PUBLISH_SECONDS = 10
+# Llamadas lentas que se conservan (las más recientes)
+MAX_SLOW_EVENTS = 20
+# Líneas de la pila que se guardan por llamada lenta
+STACK_LIMIT = 12
+
+# Define un ejecutor de hilos que cuenta sus tareas.
+# Se instala como ejecutor por defecto del bucle, así que cualquier
+# 'run_in_executor(None, ...)' de la aplicación queda medido.
+class MonitoredExecutor(ThreadPoolExecutor):
+
+    # Constructor de la clase
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        # Tareas enviadas que aún no han empezado / que se están ejecutando
+        self.queued = 0
+        self.running = 0
+        self.max_queued = 0
+        self.submitted = 0
+        self.completed = 0
+        # Tiempo desde que se envía una tarea hasta que empieza
+        self.wait = RollingHistogram()
+
+    def submit(self, fn, /, *args, **kwargs):
+        submitted_at = time.perf_counter()
+
+        def run():
+            with self._stats_lock:
+                self.queued -= 1
+                self.running += 1
+                self.wait.record(time.perf_counter() - submitted_at)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._stats_lock:
+                    self.running -= 1
+                    self.completed += 1
+
+        with self._stats_lock:
+            self.queued += 1
+            self.submitted += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        try:
+            return super().submit(run)
+        except RuntimeError:
+            # Ejecutor cerrado: la tarea nunca llegará a la cola
+            with self._stats_lock:
+                self.queued -= 1
+                self.submitted -= 1
+            raise
+
+    def summary(self):
+        """Contadores y tiempos de espera del ejecutor."""
+        with self._stats_lock:
+            return {
+                "max_workers": self._max_workers,
+                # Nota: cada 'input()' del menú ocupa un hilo mientras espera
+                "queued": self.queued,
+                "running": self.running,
+                "max_queued": self.max_queued,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "wait": self.wait.summary(),
+            }
+
+# Define la clase LoopMonitor.
+class LoopMonitor:
+
+    # Constructor de la clase
+    def __init__(self, interval=INTERVAL, slow_threshold=SLOW_THRESHOLD):
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        # Retraso de planificación (p50/p95/p99 de los últimos 15 minutos)
+        self.lag = RollingHistogram()
+        self.max_lag = 0.0
+        # Llamadas lentas: [{at, blocked_ms, stack}], las más recientes
+        self.slow_events = deque(maxlen=MAX_SLOW_EVENTS)
+        self.slow_count = 0
+        self.executor = None
+        self._loop = None
+        self._loop_thread_id = None
+        # Último "latido" del bucle (time.monotonic) y pila capturada en
+        # el bloqueo en curso (la escribe el hilo vigilante)
+        self._last_beat = time.monotonic()
+        self._pending_stack = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watchdog = None
+
+    def install(self, loop=None):
+        """
+        Instala el ejecutor medido como ejecutor por defecto del bucle.
+        Debe llamarse ANTES del primer 'run_in_executor(None, ...)'
+        (al principio de 'main()').
+        """
+        self._loop = loop or asyncio.get_running_loop()
+        self.executor = MonitoredExecutor(thread_name_prefix="asyncio")
+        self._loop.set_default_executor(self.executor)
+
+    # --- Hilo Vigilante ---
+
+    def _watch(self):
+        # Comprueba cada poco si el bucle dejó de latir. Si lleva más de
+        # 'slow_threshold' sin hacerlo, captura la pila del hilo del bucle
+        # (una vez por bloqueo).
+        while not self._stop.wait(self.slow_threshold / 2):
+            with self._lock:
+                stalled = time.monotonic() - self._last_beat - self.interval
+                if stalled < self.slow_threshold or self._pending_stack is not None:
+                    continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = [line.rstrip() for line in traceback.format_stack(frame)[-STACK_LIMIT:]]
+            with self._lock:
+                self._pending_stack = stack
+
+    # --- Registro ---
+
+    def _record_slow(self, blocked, stack):
+        event = {
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "blocked_ms": round(blocked * 1000, 1),
+            "stack": stack or [],
+        }
+        self.slow_events.append(event)
+        self.slow_count += 1
+        try:
+            with open(LOG_PATH, "a", encoding="utf-8") as log:
+                log.write(f"[{event['at']}] Bucle bloqueado {event['blocked_ms']} ms\n")
+                log.write("".join(f"    {line}\n" for line in event["stack"]) or "    (sin pila)\n")
+        except OSError:
+            pass
+
+    def summary(self):
+        """Devuelve las métricas del bucle y del ejecutor."""
+        return {
+            "interval_ms": self.interval * 1000,
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "lag": self.lag.summary(),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "slow_callbacks": self.slow_count,
+            "recent_slow_callbacks": list(self.slow_events),
+            "executor": self.executor.summary() if self.executor else None,
+        }
+
+    def publish(self):
+        """Vuelca el resumen a la salida de métricas ('logs/metrics.json')."""
+        metrics.update("event_loop", self.summary())
+        metrics.write()
+
+    # --- Tarea en Segundo Plano ---
+
+    async def run(self):
+        """
+        Tarea en segundo plano: duerme 'interval' segundos, mide cuánto
+        tardó de más en despertar y publica las métricas periódicamente.
+        """
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        with self._lock:
+            self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="LoopWatchdog", daemon=True)
+        self._watchdog.start()
+        next_publish = loop.time() + PUBLISH_SECONDS
+        try:
+            while True:
+                start = loop.time()
+                await asyncio.sleep(self.interval)
+                lag = max(0.0, loop.time() - start - self.interval)
+                with self._lock:
+                    self._last_beat = time.monotonic()
+                    stack, self._pending_stack = self._pending_stack, None
+                self.lag.record(lag)
+                self.max_lag = max(self.max_lag, lag)
+                if lag >= self.slow_threshold:
+                    self._record_slow(lag, stack)
+                if loop.time() >= next_publish:
+                    self.publish()
+                    next_publish = loop.time() + PUBLISH_SECONDS
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._stop.set()
+            self.publish()
+
+# --- Instancia Global ---
+loop_monitor = LoopMonitor()
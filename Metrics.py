@@ -0,0 +1,62 @@
+# Metrics.py
+import json
+import os
+import threading
+from datetime import datetime
+
+# Define la ruta del archivo de métricas
+METRICS_PATH = "logs/metrics.json"
+
+# Define una clase que agrupa las métricas de la aplicación por secciones
+# (ej. "latency") y las vuelca a un archivo JSON.
+class MetricsRegistry:
+
+    # Constructor de la clase
+    def __init__(self, path=METRICS_PATH):
+        # Ruta del archivo de salida
+        self._path = path
+        # Diccionario {sección: datos}
+        self._sections = {}
+        # Candado: las secciones se actualizan desde el bucle de asyncio
+        # y desde hilos del ejecutor.
+        self._lock = threading.Lock()
+        # Candado de la escritura: los monitores (latencia, bucle) escriben
+        # desde hilos distintos con el mismo temporal. Es aparte para que
+        # 'update' no espere a la E/S del disco.
+        self._write_lock = threading.Lock()
+
+    def update(self, section, data):
+        """Reemplaza los datos de una sección."""
+        with self._lock:
+            self._sections[section] = data
+
+    def snapshot(self):
+        """Devuelve una copia de todas las secciones."""
+        with self._lock:
+            return dict(self._sections)
+
+    def write(self):
+        """
+        Escribe todas las secciones en el archivo de métricas.
+        La escritura es atómica (archivo temporal + 'os.replace'),
+        así que un lector nunca verá un archivo a medio escribir.
+        """
+        tmp_path = f"{self._path}.tmp"
+        with self._write_lock:
+            # La copia se toma dentro del candado: la última escritura lleva
+            # siempre los datos más recientes.
+            data = {
+                "updated_at": datetime.now().isoformat(timespec="seconds"),
+                **self.snapshot(),
+            }
+            try:
+                os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self._path)
+            except OSError as e:
+                print(f"Error al escribir las métricas: {e}")
+
+# --- Instancia Global ---
+# Igual que 'global_state', se comparte una única instancia.
+metrics = MetricsRegistry()
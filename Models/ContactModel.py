@@ -1,10 +1,11 @@
 class ContactModel :
     #Constructor del Modelo
-    def __init__(self,id=None,name="UNKNOW",email="UNKNOW",is_client=False):
+    def __init__(self,id=None,name="UNKNOW",email="UNKNOW",is_client=False,is_featured=False):
         self._id = id
         self._name = name
         self._email = email
         self._is_client = is_client
+        self._is_featured = is_featured
         
     #Getter del id
     @property
@@ -34,4 +35,20 @@ class ContactModel :
     @get_is_client.setter
     def set_is_client(self,is_client):
         self._is_client = is_client
-        
\ No newline at end of file
+    #Getter de cliente destacado
+    @property
+    def get_is_featured(self):
+        return self._is_featured
+    #Setter de cliente destacado
+    @get_is_featured.setter
+    def set_is_featured(self,is_featured):
+        self._is_featured = is_featured
+    #Diccionario con los datos del contacto (para exportar o serializar a JSON)
+    def to_dict(self):
+        return {
+            "id": self._id,
+            "name": self._name,
+            "email": self._email,
+            "is_client": self._is_client,
+            "is_featured": self._is_featured,
+        }
@@ -0,0 +1,241 @@
+# Profiler.py
+# Perfilado bajo demanda de las acciones de la aplicación (CPU y memoria).
+# Se activa con 'python App.py --profile' o con "profiling": true en
+# 'config.json'. Cada sesión perfilada (una opción del menú, un ciclo del
+# descargador, una sincronización) escribe en 'logs/profiles/':
+# - '<fecha>_<etiqueta>.txt'  -> funciones ordenadas por tiempo acumulado y
+#   propio (cProfile) y las líneas que más memoria reservaron (tracemalloc).
+# - '<fecha>_<etiqueta>.prof' -> los datos de cProfile, para abrirlos con
+#   'python -m pstats' o herramientas como snakeviz.
+#
+# Desactivado no cuesta nada: 'session' devuelve un contexto vacío y
+# 'wrap' devuelve la misma función; cProfile, pstats y tracemalloc ni
+# siquiera se importan.
+#
+# --- Nota sobre los Hilos ---
+# cProfile solo mide el hilo en el que se activa, y el trabajo pesado se
+# hace en hilos del ejecutor ('run_in_executor'). Por eso las funciones que
+# se envían a otro hilo se pasan por 'profiler.wrap': su perfil se suma al
+# de la sesión que las lanzó. En el hilo del bucle de asyncio solo puede
+# haber un perfil activo a la vez; si dos sesiones coinciden (ej. el menú y
+# el descargador), la segunda mide solo sus hilos del ejecutor y la memoria.
+import contextlib
+import contextvars
+import functools
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+# Directorio de los informes
+PROFILES_PATH = os.path.join("logs", "profiles")
+# Funciones que se muestran en cada ranking del informe
+TOP_FUNCTIONS = 30
+# Líneas de código que se muestran en el ranking de memoria
+TOP_ALLOCATIONS = 20
+# Contexto vacío (reutilizable) para cuando el perfilado está desactivado
+_NO_PROFILE = contextlib.nullcontext()
+
+# Define una clase con los datos de una sesión de perfilado.
+class ProfileSession:
+
+    # Constructor de la clase
+    def __init__(self, label):
+        self.label = label
+        self.started = time.perf_counter()
+        # Perfiles de cProfile (uno por hilo que participó)
+        self.profiles = []
+        self._lock = threading.Lock()
+        # Snapshot de tracemalloc al empezar
+        self.snapshot = None
+        # Ruta del informe (se rellena al terminar)
+        self.report_path = None
+
+    def add(self, profile):
+        with self._lock:
+            self.profiles.append(profile)
+
+# Define la clase Profiler.
+class Profiler:
+
+    # Constructor de la clase
+    def __init__(self, path=PROFILES_PATH):
+        self.path = path
+        # Consultado en cada punto perfilado: debe ser un simple atributo.
+        self.enabled = False
+        # True si se activó con '--profile' (la configuración no lo apaga)
+        self._forced = False
+        # Sesión en curso del contexto actual (tarea de asyncio o hilo)
+        self._current = contextvars.ContextVar("profile_session", default=None)
+        # Perfil de cProfile activo en cada hilo (solo puede haber uno)
+        self._local = threading.local()
+        # Sesiones abiertas: tracemalloc se detiene cuando llega a 0
+        self._open = 0
+        self._lock = threading.Lock()
+
+    # --- Activación ---
+
+    def configure(self, config_manager, force=False):
+        """
+        Activa el perfilado si 'force' (ej. '--profile') o si la
+        configuración tiene "profiling": true, y se suscribe a los cambios
+        de 'config.json' para activarlo o desactivarlo sin reiniciar.
+        """
+        self._forced = force
+        self.enabled = force or config_manager.get_profiling()
+        config_manager.subscribe(self._on_config_change)
+
+    def _on_config_change(self, changes):
+        if "profiling" in changes:
+            self.enabled = self._forced or bool(changes["profiling"][1])
+
+    # --- Sesiones ---
+
+    def session(self, label):
+        """
+        Contexto que perfila el bloque (ej. 'with profiler.session("menu_1"):').
+        Si ya hay una sesión en curso en este contexto, el bloque se suma a ella.
+        """
+        if not self.enabled or self._current.get() is not None:
+            return _NO_PROFILE
+        return self._session(label)
+
+    @contextlib.contextmanager
+    def _session(self, label):
+        import tracemalloc
+        session = ProfileSession(label)
+        with self._lock:
+            if self._open == 0:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                tracemalloc.reset_peak()
+            self._open += 1
+        session.snapshot = tracemalloc.take_snapshot()
+        token = self._current.set(session)
+        try:
+            with self._thread_profile(session):
+                yield session
+        finally:
+            self._current.reset(token)
+            self._finish(session)
+
+    @contextlib.contextmanager
+    def _thread_profile(self, session):
+        # Activa cProfile en el hilo actual, salvo que ya tenga uno activo.
+        if getattr(self._local, "profile", None) is not None:
+            yield
+            return
+        import cProfile
+        profile = cProfile.Profile()
+        self._local.profile = profile
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._local.profile = None
+            session.add(profile)
+
+    def wrap(self, fn):
+        """
+        Prepara una función para ejecutarla en otro hilo (ej. con
+        'run_in_executor'): su perfil se suma al de la sesión en curso,
+        o abre una sesión propia si no hay ninguna.
+        Con el perfilado desactivado devuelve 'fn' sin cambios.
+        """
+        if not self.enabled:
+            return fn
+        session = self._current.get()
+        if session is None:
+            label = getattr(fn, "__qualname__", "tarea")
+            return functools.wraps(fn)(lambda *args, **kwargs: self._call_in_session(label, fn, args, kwargs))
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            token = self._current.set(session)
+            try:
+                with self._thread_profile(session):
+                    return fn(*args, **kwargs)
+            finally:
+                self._current.reset(token)
+        return wrapper
+
+    def _call_in_session(self, label, fn, args, kwargs):
+        with self.session(label):
+            return fn(*args, **kwargs)
+
+    def profiled(self, label):
+        """
+        Decorador: perfila cada llamada a la función como una sesión.
+        Desactivado, solo añade la comprobación de 'self.enabled'.
+        """
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with self.session(label):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # --- Informe ---
+
+    def _finish(self, session):
+        # Toma los datos de memoria, cierra tracemalloc si es la última
+        # sesión y escribe el informe. Un fallo aquí no debe romper la acción.
+        import tracemalloc
+        elapsed = time.perf_counter() - session.started
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        with self._lock:
+            self._open -= 1
+            if self._open == 0:
+                tracemalloc.stop()
+        try:
+            session.report_path = self._write_report(session, elapsed, current, peak, after)
+        except OSError as e:
+            print(f"Error al guardar el perfil '{session.label}': {e}")
+
+    def _write_report(self, session, elapsed, current, peak, after):
+        import io
+        import pstats
+        import tracemalloc
+        os.makedirs(self.path, exist_ok=True)
+        name = re.sub(r"[^\w.-]+", "_", session.label)
+        base = os.path.join(self.path, f"{datetime.now():%Y%m%d%H%M%S_%f}_{name}")
+
+        # Las trazas internas de tracemalloc y de los imports no interesan.
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__),
+                  tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                  tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"))
+        allocations = after.filter_traces(ignore).compare_to(session.snapshot.filter_traces(ignore), "lineno")
+
+        out = io.StringIO()
+        out.write(f"Perfil: {session.label}\n")
+        out.write(f"Fecha: {datetime.now():%Y-%m-%d %H:%M:%S}\n")
+        out.write(f"Duración: {elapsed * 1000:.1f} ms | Hilos medidos: {len(session.profiles)}\n")
+        out.write(f"Memoria: {current / 1024 / 1024:.2f} MB en uso, pico {peak / 1024 / 1024:.2f} MB "
+                  "(de todo el proceso mientras se perfilaba)\n")
+
+        if session.profiles:
+            stats = pstats.Stats(session.profiles[0], stream=out)
+            for profile in session.profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(f"{base}.prof")
+            out.write(f"\n--- Funciones por tiempo acumulado (top {TOP_FUNCTIONS}) ---\n")
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+            out.write(f"\n--- Funciones por tiempo propio (top {TOP_FUNCTIONS}) ---\n")
+            stats.sort_stats(pstats.SortKey.TIME).print_stats(TOP_FUNCTIONS)
+
+        out.write(f"\n--- Memoria reservada por línea (top {TOP_ALLOCATIONS}, diferencia con el inicio) ---\n")
+        for diff in allocations[:TOP_ALLOCATIONS]:
+            out.write(f"{diff}\n")
+
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+        return f"{base}.txt"
+
+# --- Instancia Global ---
+profiler = Profiler()
@@ -0,0 +1,239 @@
+# QueryApiServer.py
+# API HTTP local de SOLO LECTURA sobre los datos sincronizados.
+# Arranque: python Cli.py serve [--host 127.0.0.1] [--port 8765] [--sync]
+#
+# Rutas (todas GET/HEAD, respuestas JSON):
+#   /contacts            - Contactos (paginados: ?page=1&per_page=50)
+#   /contacts/{id}       - Un contacto por id
+#   /clients             - Clientes (paginados)
+#   /featured            - Clientes destacados (paginados)
+#   /search?q=texto      - Contactos cuyo id, nombre o email coinciden (paginados)
+#   /changes?since=N     - Cambios por registro con secuencia > N (ver Changelog.py;
+#                          ?limit=500&dataset=contacts). 'next' es el 'since' siguiente.
+#   /health              - Estado del servidor y versión de los datos
+#
+# Las respuestas salen de los índices en memoria ('global_state.get_datasets()'),
+# llevan ETag (se responde 304 si no cambió) y se comprimen con gzip si el
+# cliente lo acepta. Cuando la sincronización publica datos nuevos o el
+# vigilante detecta archivos modificados, los índices se reemplazan en caliente.
+import asyncio
+import gzip
+import hashlib
+import json
+from collections import OrderedDict
+from AsyncHttpServer import HttpServer, Response, error_response
+from SharedState import global_state
+
+# Paginación por defecto y máxima
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 500
+# Solo se comprimen las respuestas más grandes que esto (bytes)
+GZIP_MIN_BYTES = 1024
+# Cambios máximos por respuesta de '/changes'
+MAX_CHANGES = 1000
+# Número de respuestas ya serializadas que se guardan por versión de datos
+RESPONSE_CACHE_SIZE = 2048
+
+# Define una clase con los índices de consulta de UNA versión de los datos.
+# Es inmutable: cuando llegan datos nuevos se construye otra y se reemplaza.
+class QueryIndex:
+
+    # Constructor de la clase
+    def __init__(self, datasets):
+        self.datasets = datasets
+        # Contactos como diccionarios, en el orden del archivo
+        self.contacts = [contact.to_dict() for contact in datasets.contacts]
+        self.by_id = {str(contact["id"]): contact for contact in self.contacts}
+        self.clients = datasets.raw.get("clients.json", {}).get("Clientes", [])
+        self.featured = datasets.raw.get("featured_clients.json", {}).get("Clientes destacados", [])
+        # Texto de búsqueda ya en minúsculas: (id, nombre, email, contacto)
+        self._search = [(str(c["id"]), str(c["name"]).lower(), str(c["email"]).lower(), c)
+                        for c in self.contacts]
+        # ETag de esta versión: se deriva de los hashes de los archivos
+        digest = hashlib.sha256(json.dumps(datasets.hashes, sort_keys=True).encode("utf-8"))
+        self.etag = f'"{digest.hexdigest()[:32]}"'
+        # Caché LRU de respuestas serializadas: {url: (cuerpo, cuerpo gzip o None)}
+        self._responses = OrderedDict()
+
+    def search(self, query):
+        """Contactos cuyo id es 'query' o cuyo nombre/email lo contienen."""
+        query = query.strip().lower()
+        return [contact for cid, name, email, contact in self._search
+                if query == cid or query in name or query in email]
+
+    def cached(self, key, build):
+        """Devuelve (cuerpo, cuerpo gzip) de 'key', calculándolo con 'build()' la primera vez."""
+        entry = self._responses.get(key)
+        if entry is None:
+            body = json.dumps(build(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            compressed = gzip.compress(body, compresslevel=5) if len(body) >= GZIP_MIN_BYTES else None
+            entry = self._responses[key] = (body, compressed)
+            if len(self._responses) > RESPONSE_CACHE_SIZE:
+                self._responses.popitem(last=False)
+        else:
+            self._responses.move_to_end(key)
+        return entry
+
+def _paginate(items, query):
+    # Devuelve la página pedida con los metadatos de paginación.
+    try:
+        page = max(1, int(query.get("page", 1)))
+        per_page = min(MAX_PER_PAGE, max(1, int(query.get("per_page", DEFAULT_PER_PAGE))))
+    except ValueError:
+        raise ValueError("'page' y 'per_page' deben ser números enteros")
+    start = (page - 1) * per_page
+    return {
+        "items": items[start:start + per_page],
+        "page": page,
+        "per_page": per_page,
+        "total": len(items),
+        "pages": (len(items) + per_page - 1) // per_page,
+    }
+
+# Define la clase QueryApi: mantiene el índice actual y responde a las peticiones.
+class QueryApi:
+
+    # Constructor de la clase
+    def __init__(self):
+        self._index = None
+        # Evita que varias peticiones carguen los datos a la vez
+        self._lock = asyncio.Lock()
+
+    async def current_index(self):
+        """
+        Devuelve el índice de la versión actual de los datos. Si la caché de
+        'global_state' está fría (o cambió), la carga/reconstruye en un hilo.
+        """
+        datasets = global_state.get_datasets()
+        index = self._index
+        if index is not None and index.datasets is datasets:
+            return index
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            datasets = global_state.get_datasets()
+            if datasets is None:
+                # Arranque en frío: carga desde disco (bloqueante, en un hilo).
+                from Services.ContactsService import ContactsService
+                datasets = await loop.run_in_executor(None, ContactsService().get_datasets)
+            if self._index is None or self._index.datasets is not datasets:
+                self._index = await loop.run_in_executor(None, QueryIndex, datasets)
+            return self._index
+
+    async def watch(self):
+        """
+        Tarea en segundo plano: cada vez que cambia el estado (nuevos
+        archivos, caché invalidada) reconstruye el índice por adelantado,
+        para que la primera petición tras una sincronización ya sea rápida.
+        """
+        version = global_state.version
+        while True:
+            version = await global_state.wait_for_change(version)
+            try:
+                await self.current_index()
+            except Exception as e:
+                print(f"[QueryApi] Error al recargar los datos: {e}")
+
+    async def handle(self, request):
+        """Manejador de peticiones para 'HttpServer'."""
+        if request.method not in ("GET", "HEAD"):
+            return Response(405, b"", {"Allow": "GET, HEAD"})
+        path = request.path.rstrip("/") or "/"
+        # El registro de cambios se lee del disco, sin los índices en memoria
+        if path == "/changes":
+            return await self._changes(request.query)
+        try:
+            index = await self.current_index()
+        except RuntimeError as e:
+            return error_response(503, f"Datos no disponibles: {e}")
+
+        if path == "/health":
+            return self._respond(request, index, None, lambda: {
+                "status": "ok", "etag": index.etag, "contacts": len(index.contacts)})
+
+        # Clave de la caché de respuestas: ruta + parámetros relevantes
+        query = request.query
+        key = (path, query.get("q"), query.get("page"), query.get("per_page"))
+        try:
+            if path == "/contacts":
+                return self._respond(request, index, key, lambda: _paginate(index.contacts, query))
+            if path == "/clients":
+                return self._respond(request, index, key, lambda: _paginate(index.clients, query))
+            if path == "/featured":
+                return self._respond(request, index, key, lambda: _paginate(index.featured, query))
+            if path == "/search":
+                if not query.get("q"):
+                    return error_response(400, "Falta el parámetro 'q'")
+                return self._respond(request, index, key, lambda: _paginate(index.search(query["q"]), query))
+            if path.startswith("/contacts/"):
+                contact = index.by_id.get(path[len("/contacts/"):])
+                if contact is None:
+                    return error_response(404, "Contacto no encontrado")
+                return self._respond(request, index, key, lambda: contact)
+        except ValueError as e:
+            return error_response(400, str(e))
+        return error_response(404, "Ruta no encontrada")
+
+    @staticmethod
+    async def _changes(query):
+        # Lee el registro de cambios (I/O bloqueante, en un hilo). No lleva
+        # ETag: el consumidor avanza con 'since' y la respuesta es pequeña.
+        from Changelog import changelog
+        try:
+            since = max(0, int(query.get("since", 0)))
+            limit = min(MAX_CHANGES, max(1, int(query.get("limit", MAX_CHANGES))))
+        except ValueError:
+            return error_response(400, "'since' y 'limit' deben ser números enteros")
+        loop = asyncio.get_running_loop()
+        changes = await loop.run_in_executor(
+            None, lambda: list(changelog.read_since(since, limit, query.get("dataset"))))
+        body = {"changes": changes, "next": changes[-1]["seq"] if changes else since}
+        return Response(200, json.dumps(body, ensure_ascii=False).encode("utf-8"),
+                        {"Cache-Control": "no-cache", "Content-Type": "application/json; charset=utf-8"})
+
+    @staticmethod
+    def _respond(request, index, key, build):
+        # Respuesta con ETag (304 si el cliente ya la tiene) y gzip opcional.
+        headers = {"ETag": index.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding",
+                   "Content-Type": "application/json; charset=utf-8"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if index.etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+            return Response(304, b"", headers)
+        if key is None:
+            body = json.dumps(build(), ensure_ascii=False).encode("utf-8")
+            compressed = None
+        else:
+            body, compressed = index.cached(key, build)
+        if compressed is not None and "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            body = compressed
+        return Response(200, body, headers)
+
+async def serve(host="127.0.0.1", port=8765, sync=False):
+    """
+    Arranca la API y las tareas que mantienen los datos al día:
+    - el vigilante de archivos (detecta archivos escritos por otro proceso),
+    - opcionalmente el descargador ('sync=True'), que publica en memoria.
+    Atiende peticiones hasta que se cancele.
+    """
+    import BackgroundTasks
+    api = QueryApi()
+    await BackgroundTasks.refresh_file_list_once()
+    server = await HttpServer(api.handle, host, port).start()
+    tasks = [asyncio.create_task(BackgroundTasks.run_file_watcher()),
+             asyncio.create_task(api.watch())]
+    if sync:
+        from ConfigManager import ConfigManager
+        tasks.append(asyncio.create_task(BackgroundTasks.run_downloader(ConfigManager())))
+    # Carga los datos antes de la primera petición.
+    try:
+        await api.current_index()
+    except RuntimeError as e:
+        print(f"[QueryApi] Aún no hay datos: {e}")
+    print(f"API de consulta escuchando en http://{server.host}:{server.port}/", flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await server.close()
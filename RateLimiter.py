@@ -0,0 +1,61 @@
+# RateLimiter.py
+# Limitador de peticiones por "cubeta de fichas" (token bucket) para
+# asyncio. La cubeta se rellena a 'rate' fichas por segundo hasta un
+# máximo de 'burst'; cada petición gasta una ficha y, si no queda
+# ninguna, espera (sin bloquear el bucle) hasta que se rellene.
+# Cada perfil de API tiene el suyo: un perfil con muchas peticiones no
+# consume el límite de los demás aunque compartan el pool de conexiones.
+import asyncio
+import time
+
+# Define la clase RateLimiter.
+class RateLimiter:
+
+    # Constructor de la clase
+    # 'rate' son peticiones por segundo (0 o None = sin límite);
+    # 'burst' las que se pueden hacer seguidas (por defecto, 'rate' y al menos 1).
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate or 0)
+        self.burst = float(burst or max(self.rate, 1.0))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = None
+        # Peticiones que tuvieron que esperar y tiempo total esperado
+        self.waits = 0
+        self.waited = 0.0
+
+    @property
+    def unlimited(self):
+        return self.rate <= 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Espera hasta que haya una ficha disponible y la gasta."""
+        if self.unlimited:
+            return
+        # El candado se crea dentro del bucle que lo usa
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # Con el candado, las peticiones salen en orden de llegada
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                delay = (1 - self._tokens) / self.rate
+                self.waits += 1
+                self.waited += delay
+                await asyncio.sleep(delay)
+                self._refill()
+            self._tokens -= 1
+
+    def summary(self):
+        """Configuración y esperas acumuladas."""
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "waits": self.waits,
+            "waited_seconds": round(self.waited, 3),
+        }
@@ -1,3 +1,5 @@
+import os
+
 # Define la clase ContactRepository, que agrupa métodos para acceder a datos de contacto.
 class ContactRepository:
     
@@ -7,13 +9,15 @@ class ContactRepository:
         self.PATH_DB = "db"
         
     # Método para obtener todos los clientes
-    def get_all_clients(self):
+    # ('filename' permite leer un snapshot, ej. "clients_20251105123819.json")
+    def get_all_clients(self, filename="clients.json"):
         # 'try' inicia un bloque para manejar posibles errores que ocurran al leer el archivo.
         try:
             # 'with open' abre el archivo y asegura que se cierre automáticamente.
-            # f"{self.PATH_DB}\\clients.json" construye la ruta al archivo.
+            # os.path.join(self.PATH_DB, filename) construye la ruta al archivo
+            # (con el separador correcto en Windows y en Linux).
             # 'r' indica modo lectura, 'encoding='utf-8'' asegura compatibilidad de caracteres.
-            with open(f"{self.PATH_DB}\\clients.json", 'r', encoding='utf-8') as f:
+            with open(os.path.join(self.PATH_DB, filename), 'r', encoding='utf-8') as f:
                 # Lee todo el contenido del archivo (f.read()) y lo devuelve como una cadena (str).
                 return str(f.read())
         
@@ -31,11 +35,12 @@ class ContactRepository:
             raise RuntimeError(f"Error al leer el fichero {e}") from e
             
     # Método para obtener los clientes destacados
-    def get_featured_clients(self):
+    # ('filename' permite leer un snapshot, ej. "featured_clients_20251105123819.json")
+    def get_featured_clients(self, filename="featured_clients.json"):
         # Inicia el bloque de manejo de errores para este método.
         try:
             # Abre el archivo específico de clientes destacados.
-            with open(f"{self.PATH_DB}\\featured_clients.json", 'r', encoding='utf-8') as f:
+            with open(os.path.join(self.PATH_DB, filename), 'r', encoding='utf-8') as f:
                 # Lee y devuelve el contenido como cadena.
                 return str(f.read())
         
@@ -48,11 +53,12 @@ class ContactRepository:
             raise RuntimeError(f"Error al leer el fichero {e}") from e
 
     # Método para obtener todos los contactos
-    def get_all_contacts(self):
+    # ('filename' permite leer un snapshot, ej. "contacts_20251105123819.json")
+    def get_all_contacts(self, filename="contacts.json"):
         # Inicia el bloque de manejo de errores.
         try:
-            # Abre el archivo 'contacts.json'.
-            with open(f"{self.PATH_DB}\\contacts.json", 'r', encoding='utf-8') as f:
+            # Abre el archivo de contactos ('contacts.json' o un snapshot).
+            with open(os.path.join(self.PATH_DB, filename), 'r', encoding='utf-8') as f:
                 # Lee y devuelve el contenido como cadena.
                 return str(f.read())
         
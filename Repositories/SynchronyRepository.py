@@ -1,38 +1,187 @@
+import contextlib
 import json
+import os
+import time
+import asyncio
 # Importa la biblioteca httpx, necesaria para realizar peticiones HTTP asíncronas (async/await)
 import httpx
 # Importa el gestor de configuración para obtener URLs y credenciales
 from ConfigManager import ConfigManager
+# Importa el histograma usado para calcular los percentiles por endpoint
+from LatencyHistogram import LatencyHistogram
+
+# Define la clase EndpointLatency.
+# Guarda en disco un histograma de tiempos de respuesta por endpoint.
+# Las descargas corren con asyncio en el hilo que sincroniza (al pool de
+# trabajo solo van decodificar, comparar y codificar); se persiste para que
+# cada sincronización (CLI, servicio o perfil) aprenda de las anteriores.
+class EndpointLatency:
+    # Directorio donde se guardan los histogramas
+    DIR = "logs/latency"
+    # Muestras mínimas antes de confiar en los percentiles
+    MIN_SAMPLES = 5
+    # Al superar este número de muestras se "envejecen" (se dividen entre 2)
+    MAX_SAMPLES = 200
+    # Valores por defecto (los de siempre) mientras no hay datos suficientes
+    DEFAULT_CONNECT = 10.0
+    DEFAULT_READ = 30.0
+    # Límites para el timeout de lectura adaptativo (segundos)
+    READ_FLOOR = 5.0
+    READ_CEILING = 120.0
+    # Margen sobre el p99 observado
+    READ_FACTOR = 3.0
+
+    # Constructor de la clase
+    # 'profile' es la carpeta de datos del perfil de API (None = el principal;
+    # ya validada en 'ConfigManager.get_profiles', así que es un nombre de
+    # archivo seguro): cada perfil puede apuntar a un servidor distinto y
+    # tiene su historial.
+    def __init__(self, endpoint, profile=None):
+        self.endpoint = endpoint
+        # Ej: "/clientes/destacados" -> "logs/latency/clientes_destacados.json"
+        # (con perfil: "logs/latency/<perfil>_clientes_destacados.json")
+        name = endpoint.strip("/").replace("/", "_")
+        self.path = os.path.join(self.DIR, f"{profile}_{name}.json" if profile else f"{name}.json")
+        self.histogram = LatencyHistogram()
+        # Contadores de peticiones duplicadas (hedging)
+        self.hedged = 0
+        self.hedge_wins = 0
+        # Timeouts de lectura seguidos (se pone a 0 con la primera respuesta)
+        self.timeouts = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.histogram = LatencyHistogram.from_dict(data.get("histogram", {}))
+            self.hedged = data.get("hedged", 0)
+            self.hedge_wins = data.get("hedge_wins", 0)
+            self.timeouts = data.get("timeouts", 0)
+        except (OSError, ValueError):
+            # Sin historial (o corrupto): se empieza de cero
+            pass
+
+    def save(self):
+        """Guarda el histograma de forma atómica."""
+        os.makedirs(self.DIR, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        data = {
+            "endpoint": self.endpoint,
+            "summary": self.histogram.summary(),
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "timeouts": self.timeouts,
+            "histogram": self.histogram.to_dict(),
+        }
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def record(self, seconds):
+        """Añade un tiempo de respuesta observado."""
+        self.histogram.record(seconds)
+        if self.histogram.count > self.MAX_SAMPLES:
+            self.histogram.halve()
+        self.timeouts = 0
+
+    def record_timeout(self, seconds):
+        """
+        Anota un timeout de lectura tras 'seconds': la respuesta tardaba AL
+        MENOS eso, así que se añade como muestra (censurada) y el siguiente
+        timeout se duplica (ver 'timeout').
+        """
+        self.histogram.record(seconds)
+        if self.histogram.count > self.MAX_SAMPLES:
+            self.histogram.halve()
+        self.timeouts += 1
+
+    def percentile(self, p):
+        """Percentil en segundos, o None si aún no hay muestras suficientes."""
+        if self.histogram.count < self.MIN_SAMPLES:
+            return None
+        return self.histogram.percentile(p)
+
+    def timeout(self):
+        """
+        Devuelve el 'httpx.Timeout' para este endpoint: el timeout de lectura
+        es READ_FACTOR veces el p99 observado, limitado a [READ_FLOOR, READ_CEILING].
+        Tras cada timeout seguido se duplica (hasta READ_CEILING): si el
+        servidor se vuelve lento, el historial rápido no lo bloquea para siempre.
+        """
+        p99 = self.percentile(99)
+        if p99 is None:
+            read = self.DEFAULT_READ
+        else:
+            read = min(max(p99 * self.READ_FACTOR, self.READ_FLOOR), self.READ_CEILING)
+        read = min(read * 2 ** self.timeouts, max(read, self.READ_CEILING))
+        return httpx.Timeout(self.DEFAULT_CONNECT, read=read)
 
 # Define la clase SynchronyRepository.
 # Su responsabilidad es manejar toda la comunicación (peticiones) con una API externa.
 class SynchronyRepository:
     
     # Constructor de la clase
-    def __init__(self):
+    # - 'profile': perfil de API (ver 'ConfigManager.get_profiles'); sin él
+    #   se usan la URL y las credenciales de primer nivel de 'config.json'.
+    # - 'client': cliente httpx COMPARTIDO (su pool de conexiones lo usan
+    #   todos los perfiles); sin él se crea y se cierra uno por petición.
+    # - 'limiter': 'RateLimiter' del perfil; se espera una ficha por petición.
+    def __init__(self, profile=None, client=None, limiter=None):
         # Carga una instancia del gestor de configuración
         self.config = ConfigManager()
+        self.profile = profile
+        self._shared_client = client
+        self.limiter = limiter
+        # Rutas de los endpoints (un perfil puede cambiarlas)
+        self.ENDPOINTS = profile["endpoints"] if profile else dict(ConfigManager.DEFAULT_ENDPOINTS)
         # Obtiene la URL base de la API desde la configuración
-        self.URL_API = self.config.get_api_url()
+        self.URL_API = profile["api_url"] if profile else self.config.get_api_url()
         # Inicializa el cliente HTTP; se creará cuando se necesite
         self.CLIENT = None
         # Inicializa el token de autenticación; se obtendrá al autenticarse
         self.TOKEN = None
+        # Candado de autenticación (se crea dentro del bucle que lo usa):
+        # si varias descargas empiezan a la vez sin token, solo una hace login.
+        self._auth_lock = None
+        self._auth_loop = None
+        # Se suscribe a los cambios de configuración para reaccionar
+        # (sin sondear) cuando se modifiquen la URL o las credenciales.
+        # Con un perfil no hace falta: quien lo usa crea un repositorio
+        # nuevo si el perfil cambia.
+        if profile is None:
+            self.config.subscribe(self._on_config_change)
+
+    # Suscriptor: se llama cuando cambia algún valor de 'config.json'
+    def _on_config_change(self, changes):
+        # Si cambia la URL, se usa la nueva en la próxima petición
+        if "api_url" in changes:
+            self.URL_API = changes["api_url"][1]
+        # Un token obtenido con otra URL o con otras credenciales ya no
+        # es válido: se descarta para forzar una nueva autenticación.
+        if changes.keys() & {"api_url", "username", "password"}:
+            self.TOKEN = None
 
     # Método asíncrono para autenticarse contra la API
     async def authenticate(self):
         """Autenticación automática con email y password."""
         
-        # Obtiene el email y la contraseña desde el gestor de configuración
-        email = self.config.get_email()
-        password = self.config.get_password()
+        # Obtiene el email y la contraseña del perfil o del gestor de configuración
+        if self.profile:
+            email, password = self.profile["username"], self.profile["password"]
+        else:
+            email = self.config.get_email()
+            password = self.config.get_password()
         
         # Comprueba si las credenciales están presentes
         if not email or not password:
             raise RuntimeError("Email o contraseña no configurados.")
 
-        # Crea un cliente httpx temporal solo para la autenticación
-        async with httpx.AsyncClient() as client:
+        # Usa el cliente compartido o crea uno temporal solo para la autenticación
+        async with contextlib.AsyncExitStack() as stack:
+            client = self._shared_client or await stack.enter_async_context(httpx.AsyncClient())
+            if self.limiter:
+                await self.limiter.acquire()
             # Realiza la petición POST (asíncrona) al endpoint /login
             response = await client.post(
                 f"{self.URL_API}/login",
@@ -52,22 +201,38 @@ class SynchronyRepository:
 
     # Método privado asíncrono para preparar el cliente HTTP
     async def _get_client_and_url(self):
-        # Vuelve a cargar la URL de la API para asegurar que esté actualizada
-        self.URL_API = self.config.get_api_url()
+        # Obtiene la URL de la API (en memoria; los cambios llegan
+        # a través de '_on_config_change'). La de un perfil es fija.
+        if not self.profile:
+            self.URL_API = self.config.get_api_url()
         if not self.URL_API:
             raise ConnectionError("Error: La URL de la API no está configurada.")
 
         # Comprueba si ya tenemos un token. Si no, llama al método authenticate().
         if not self.TOKEN:
-            await self.authenticate()
+            # El candado pertenece al bucle en que se creó ('run_process'
+            # usa un bucle nuevo en cada ciclo)
+            loop = asyncio.get_running_loop()
+            if self._auth_lock is None or self._auth_loop is not loop:
+                self._auth_lock, self._auth_loop = asyncio.Lock(), loop
+            async with self._auth_lock:
+                # Otra descarga pudo autenticarse mientras se esperaba
+                if not self.TOKEN:
+                    await self.authenticate()
+
+        # Con un cliente compartido, el token viaja en cada petición
+        # (ver '_timed_get'), así el mismo pool sirve a todos los perfiles.
+        if self._shared_client is not None:
+            self.CLIENT = self._shared_client
+            return self.CLIENT, self.URL_API
 
         # Prepara las cabeceras (headers) que se usarán en todas las peticiones
         # Incluye el token de autorización (Bearer Token)
         headers = {"Authorization": f"Bearer {self.TOKEN}"}
         
-        # Configura tiempos de espera (timeouts)
-        # 10 segundos para conectar, 30 segundos para leer la respuesta completa
-        timeout = httpx.Timeout(10.0, read=30.0)
+        # Configura tiempos de espera (timeouts) por defecto.
+        # Cada petición usa después el timeout adaptativo de su endpoint.
+        timeout = httpx.Timeout(EndpointLatency.DEFAULT_CONNECT, read=EndpointLatency.DEFAULT_READ)
         
         # Crea la instancia del cliente asíncrono (self.CLIENT) con los timeouts y cabeceras
         self.CLIENT = httpx.AsyncClient(timeout=timeout, headers=headers)
@@ -75,57 +240,113 @@ class SynchronyRepository:
         # Devuelve el cliente listo para usar y la URL de la API
         return self.CLIENT, self.URL_API
 
-    # Método asíncrono para obtener todos los clientes
-    async def get_all_clients(self):
-        try:
-            # Prepara el cliente (se autentica si es necesario)
-            self.CLIENT, url = await self._get_client_and_url()
-            # Realiza la petición GET al endpoint /clientes
-            response = await self.CLIENT.get(f"{url}/clientes")
-            # Asegura que la respuesta se interprete como UTF-8 (para tildes, etc.)
-            response.encoding = 'utf-8'
-            # Cierra la conexión del cliente
-            await self.CLIENT.aclose()
-            # Devuelve los datos de la respuesta decodificados desde JSON
-            return response.json()
-        
-        # Captura errores específicos de httpx (problemas de red, DNS, timeout)
-        except httpx.RequestError as e:
-            raise RuntimeError(f"Error en la solicitud de clientes: {type(e).__name__} en {e.request.url}") from e
-        # Captura errores si la respuesta de la API no es un JSON válido
-        except json.JSONDecodeError as e:
-            raise RuntimeError(f"Error al recibir la respuesta, No es un JSON: {type(e).__name__}") from e
+    # Método privado asíncrono: un GET cronometrado
+    async def _timed_get(self, client, url, timeout, token):
+        if self.limiter:
+            await self.limiter.acquire()
+        start = time.perf_counter()
+        response = await client.get(url, timeout=timeout, headers={"Authorization": f"Bearer {token}"})
+        return response, time.perf_counter() - start
+
+    # Método privado asíncrono: GET con re-autenticación y control de errores HTTP
+    async def _fetch(self, path):
+        """
+        Descarga 'path' y devuelve la respuesta.
+        - Si el token ha caducado (401) se descarta, se vuelve a autenticar
+          y se repite la petición UNA vez.
+        - Cualquier otro código de error lanza 'httpx.HTTPStatusError', así
+          nunca se guarda un cuerpo de error como si fueran datos.
+        """
+        response = await self._fetch_once(path)
+        if response.status_code == 401:
+            # Solo se descarta el token si es el rechazado: otra descarga
+            # simultánea pudo haberlo renovado ya.
+            if response.request.headers.get("Authorization") == f"Bearer {self.TOKEN}":
+                self.TOKEN = None
+            response = await self._fetch_once(path)
+        response.raise_for_status()
+        return response
+
+    # Método privado asíncrono: GET con timeout adaptativo y hedging opcional
+    async def _fetch_once(self, path):
+        """
+        Descarga 'path' (un intento) y devuelve la respuesta.
+        - El timeout de lectura se calcula con los percentiles del endpoint.
+        - Si 'hedge_requests' está activo y la primera petición supera el p95,
+          se lanza un segundo GET idéntico (es idempotente) y se usa la
+          primera respuesta que llegue.
+        """
+        # Prepara el cliente (se autentica si es necesario)
+        # El cliente es local: varias descargas pueden ir a la vez en el
+        # mismo repositorio y cada una cierra solo el suyo.
+        client, url = await self._get_client_and_url()
+        # El token se fija ahora: otra descarga podría cambiarlo mientras tanto
+        token = self.TOKEN
+        # Los perfiles adicionales tienen su propio historial de latencias,
+        # con su carpeta de datos (ya validada) como prefijo del archivo
+        stats = EndpointLatency(path, self.profile.get("data_dir") if self.profile else None)
+        timeout = stats.timeout()
+        hedge_after = stats.percentile(95) if self.config.get_hedge_requests() else None
 
-    # Método asíncrono para obtener los clientes destacados
-    async def get_featured_clients(self):
+        tasks = set()
         try:
-            # Prepara el cliente
-            self.CLIENT, url = await self._get_client_and_url()
-            # Realiza la petición GET al endpoint /clientes/destacados
-            response = await self.CLIENT.get(f"{url}/clientes/destacados")
-            response.encoding = 'utf-8'
-            await self.CLIENT.aclose()
-            return response.json()
-        
-        # Manejo de errores (idéntico al método anterior)
-        except httpx.RequestError as e:
-            raise RuntimeError(f"Error en la solicitud de clientes destacados: {type(e).__name__} en {e.request.url}") from e
-        except json.JSONDecodeError as e:
-            raise RuntimeError(f"Error al recibir la respuesta, No es un JSON: {type(e).__name__}") from e
+            first = asyncio.ensure_future(self._timed_get(client, f"{url}{path}", timeout, token))
+            tasks.add(first)
+            # Espera al primer intento como máximo hasta su p95
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                # El primer intento va lento: se lanza el duplicado
+                stats.hedged += 1
+                tasks.add(asyncio.ensure_future(self._timed_get(client, f"{url}{path}", timeout, token)))
+
+            # Devuelve la primera respuesta correcta; si un intento falla
+            # se sigue esperando al otro.
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                        continue
+                    response, elapsed = task.result()
+                    if task is not first:
+                        stats.hedge_wins += 1
+                    # Cancela el intento que sigue pendiente
+                    for pending in tasks:
+                        pending.cancel()
+                    stats.record(elapsed)
+                    stats.save()
+                    # Asegura que la respuesta se interprete como UTF-8 (para tildes, etc.)
+                    response.encoding = 'utf-8'
+                    return response
+            if isinstance(error, httpx.ReadTimeout):
+                stats.record_timeout(timeout.read)
+                stats.save()
+            raise error
+        finally:
+            # Cancela cualquier intento que siga en curso (ej. si esta
+            # corutina fue cancelada) y cierra la conexión del cliente
+            # (el compartido se queda abierto para reutilizar sus conexiones)
+            for pending in tasks:
+                pending.cancel()
+            if client is not self._shared_client:
+                await client.aclose()
 
-    # Método asíncrono para obtener todos los contactos
-    async def get_all_contacts(self):
+    # Nombre de cada dataset en los mensajes de error
+    LABELS = {"clients": "clientes", "contacts": "contactos", "featured_clients": "clientes destacados"}
+
+    # Método asíncrono para obtener un dataset SIN decodificar
+    async def get_raw(self, dataset):
+        """
+        Descarga 'dataset' ("clients", "contacts" o "featured_clients") y
+        devuelve el cuerpo en bytes. La decodificación se hace aparte, en
+        el pool de procesos (ver 'SynchronyService.prepare_dataset').
+        """
+        label = self.LABELS[dataset]
         try:
-            # Prepara el cliente
-            self.CLIENT, url = await self._get_client_and_url()
-            # Realiza la petición GET al endpoint /contactos
-            response = await self.CLIENT.get(f"{url}/contactos")
-            response.encoding = 'utf-8'
-            await self.CLIENT.aclose()
-            return response.json()
-        
-        # Manejo de errores (idéntico al método anterior)
+            response = await self._fetch(self.ENDPOINTS[dataset])
+            return response.content
         except httpx.RequestError as e:
-            raise RuntimeError(f"Error en la solicitud de contactos: {type(e).__name__} en {e.request.url}") from e
-        except json.JSONDecodeError as e:
-            raise RuntimeError(f"Error al recibir la respuesta, No es un JSON: {type(e).__name__}") from e
\ No newline at end of file
+            raise RuntimeError(f"Error en la solicitud de {label}: {type(e).__name__} en {e.request.url}") from e
+        except httpx.HTTPStatusError as e:
+            raise RuntimeError(f"Error en la solicitud de {label}: HTTP {e.response.status_code} en {e.request.url}") from e
@@ -0,0 +1,226 @@
+# Services/AnalyticsService.py
+# Estadísticas de los contactos: cuántos son clientes y destacados, cuántos
+# no tienen email o nombre (los que la app muestra como "Desconocido"),
+# dominios de email más frecuentes y evolución entre snapshots.
+#
+# Cada archivo de contactos se carga UNA vez en columnas (ids, código de
+# dominio, tiene email, tiene nombre) y los totales se calculan sobre las
+# columnas de golpe: con NumPy si está instalado (opcional) y, si no, con
+# 'array'/'bytes' y 'collections.Counter', que también cuentan en C.
+# Los resultados se guardan por hash del contenido en
+# 'logs/analytics_cache.json': un snapshot ya analizado no se vuelve a leer.
+import json
+import os
+import threading
+from array import array
+from collections import Counter
+# NumPy es opcional: acelera los recuentos con muchos contactos
+try:
+    import numpy as np
+except ImportError:
+    np = None
+from FileCatalog import file_catalog, classify
+
+# Ruta de la caché de resultados
+CACHE_PATH = os.path.join("logs", "analytics_cache.json")
+# Dominios que se muestran en el ranking
+TOP_DOMAINS = 10
+# Versión del formato de los resultados (si cambia, la caché se ignora)
+CACHE_VERSION = 1
+
+# Define una clase con un archivo de contactos en columnas.
+class ContactColumns:
+    __slots__ = ("ids", "domain_codes", "domains", "has_email", "has_name")
+
+    # Constructor de la clase
+    def __init__(self, records):
+        emails = [record.get("email") for record in records]
+        # Ids como enteros de 64 bits
+        self.ids = array("q", [record["id"] for record in records])
+        # Dominio de cada email como un código (0 = sin email); 'domains[código]' es el texto
+        index = {"": 0}
+        self.domain_codes = array("i", [
+            index.setdefault(email.rpartition("@")[2].strip().lower(), len(index))
+            if isinstance(email, str) and "@" in email else 0
+            for email in emails])
+        self.domains = list(index)
+        # 1 si tiene email / nombre; 0 si viene 'False' o vacío ("Desconocido")
+        self.has_email = bytes(isinstance(email, str) and bool(email.strip()) for email in emails)
+        self.has_name = bytes(isinstance(record.get("name"), str) and bool(record["name"].strip())
+                              for record in records)
+
+    def __len__(self):
+        return len(self.ids)
+
+# Define la clase AnalyticsService.
+class AnalyticsService:
+
+    # Constructor de la clase
+    def __init__(self, db_path="db", cache_path=CACHE_PATH):
+        self.DB_PATH = db_path
+        self._cache_path = cache_path
+        # Caché {clave: resultado}; se carga del disco la primera vez
+        self._cache = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        """Motor usado para los cálculos: "numpy" o "array"."""
+        return "numpy" if np is not None else "array"
+
+    # --- Caché ---
+
+    def _load_cache(self):
+        if self._cache is None:
+            try:
+                with open(self._cache_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self._cache = data.get("results", {}) if data.get("version") == CACHE_VERSION else {}
+            except (OSError, ValueError):
+                self._cache = {}
+        return self._cache
+
+    def _save_cache(self, keep):
+        # Guarda solo los resultados de archivos que siguen existiendo.
+        cache = {key: value for key, value in self._cache.items() if key in keep}
+        self._cache = cache
+        tmp_path = f"{self._cache_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self._cache_path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "results": cache}, f, ensure_ascii=False)
+            os.replace(tmp_path, self._cache_path)
+        except OSError as e:
+            print(f"Error al guardar la caché de estadísticas: {e}")
+
+    # --- Archivos ---
+
+    def _hash(self, name):
+        # sha256 del archivo según el catálogo (solo se recalcula si cambió).
+        file_catalog.refresh_file(name)
+        entry = file_catalog.get(name)
+        return entry.sha256 if entry else None
+
+    def _snapshots(self):
+        # {dataset: [(timestamp, archivo), ...]} ordenados por timestamp.
+        snapshots = {"contacts": [], "clients": [], "featured_clients": []}
+        for name in os.listdir(self.DB_PATH):
+            dataset, timestamp = classify(name)
+            if timestamp and dataset in snapshots:
+                snapshots[dataset].append((timestamp, name))
+        for items in snapshots.values():
+            items.sort()
+        return snapshots
+
+    @staticmethod
+    def _matching(items, timestamp, current):
+        # El snapshot de clientes vigente en 'timestamp': el último con
+        # fecha igual o anterior. Si no hay ninguno, el archivo actual.
+        match = current
+        for ts, name in items:
+            if ts > timestamp:
+                break
+            match = name
+        return match
+
+    def _read_json(self, name):
+        with open(os.path.join(self.DB_PATH, name), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _read_ids(self, name, key):
+        # Conjunto de ids de un archivo de clientes (vacío si no existe).
+        if not os.path.exists(os.path.join(self.DB_PATH, name)):
+            return frozenset()
+        return frozenset(record["id"] for record in self._read_json(name).get(key, []))
+
+    # --- Cálculo ---
+
+    @staticmethod
+    def aggregate(columns, client_ids, featured_ids, top=TOP_DOMAINS):
+        """Calcula los totales de un archivo ya cargado en columnas."""
+        total = len(columns)
+        if np is not None and total:
+            ids = np.frombuffer(columns.ids, dtype=np.int64)
+            codes = np.frombuffer(columns.domain_codes, dtype=np.intc)
+            has_email = np.frombuffer(columns.has_email, dtype=np.uint8)
+            has_name = np.frombuffer(columns.has_name, dtype=np.uint8)
+            missing_email = int(total - np.count_nonzero(has_email))
+            missing_name = int(total - np.count_nonzero(has_name))
+            counts = np.bincount(codes, minlength=len(columns.domains))
+            counts[0] = 0
+            order = np.argsort(counts, kind="stable")[::-1][:top]
+            top_domains = [[columns.domains[i], int(counts[i])] for i in order if counts[i]]
+            unique_domains = int(np.count_nonzero(counts))
+
+            def members(id_set):
+                if not id_set:
+                    return 0
+                wanted = np.fromiter(id_set, dtype=np.int64, count=len(id_set))
+                return int(np.count_nonzero(np.isin(ids, wanted)))
+        else:
+            missing_email = columns.has_email.count(0)
+            missing_name = columns.has_name.count(0)
+            counts = Counter(columns.domain_codes)
+            counts.pop(0, None)
+            top_domains = [[columns.domains[code], count] for code, count in counts.most_common(top)]
+            unique_domains = len(counts)
+
+            def members(id_set):
+                return sum(map(id_set.__contains__, columns.ids))
+
+        clients = members(client_ids)
+        return {
+            "total": total,
+            "clients": clients,
+            "non_clients": total - clients,
+            "featured": members(featured_ids),
+            "missing_email": missing_email,
+            "missing_name": missing_name,
+            "unique_domains": unique_domains,
+            "top_domains": top_domains,
+        }
+
+    def _analyze(self, contacts_file, clients_file, featured_file, keep):
+        # Resultado de un archivo de contactos (de la caché si ya se calculó).
+        hashes = [self._hash(contacts_file), self._hash(clients_file), self._hash(featured_file)]
+        key = ":".join(h or "-" for h in hashes)
+        keep.add(key)
+        cache = self._load_cache()
+        if key in cache:
+            return cache[key]
+        try:
+            columns = ContactColumns(self._read_json(contacts_file)["contactos"])
+            result = self.aggregate(columns,
+                                    self._read_ids(clients_file, "Clientes"),
+                                    self._read_ids(featured_file, "Clientes destacados"))
+        except (OSError, ValueError, KeyError, TypeError, OverflowError) as e:
+            raise RuntimeError(f"Error al analizar '{contacts_file}': {e}") from e
+        cache[key] = result
+        return result
+
+    def summary(self, history=True):
+        """
+        Devuelve {"backend", "current": totales de 'contacts.json',
+        "history": [{timestamp, file, totales..., delta_total}, ...]}.
+        ¡Esta función es BLOQUEANTE (E/S)!
+        """
+        with self._lock:
+            keep = set()
+            current = None
+            if os.path.exists(os.path.join(self.DB_PATH, "contacts.json")):
+                current = self._analyze("contacts.json", "clients.json", "featured_clients.json", keep)
+            rows = []
+            if history:
+                snapshots = self._snapshots()
+                previous_total = None
+                for timestamp, name in snapshots["contacts"]:
+                    result = self._analyze(
+                        name,
+                        self._matching(snapshots["clients"], timestamp, "clients.json"),
+                        self._matching(snapshots["featured_clients"], timestamp, "featured_clients.json"),
+                        keep)
+                    delta = None if previous_total is None else result["total"] - previous_total
+                    previous_total = result["total"]
+                    rows.append({"timestamp": timestamp, "file": name, **result, "delta_total": delta})
+            self._save_cache(keep if history else keep | set(self._load_cache()))
+            return {"backend": self.backend, "current": current, "history": rows}
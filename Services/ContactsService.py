@@ -2,6 +2,16 @@
 from Repositories.ContactRepository import ContactRepository
 import json
 from Models.ContactModel import ContactModel
+# Importa el estado global (caché de datasets) y el catálogo de archivos
+from SharedState import global_state, Datasets
+from FileCatalog import file_catalog
+# Índice de snapshots por fecha (consultas "as of")
+from SnapshotIndex import snapshot_index, parse_as_of
+# Marcas de cliente / destacado por posición de contacto
+from Bitset import Bitset
+
+# Archivos principales de cada dataset
+DATASET_FILES = ("contacts.json", "clients.json", "featured_clients.json")
 
 # Define la clase ContactsService, que maneja la lógica de negocio para los contactos.
 class ContactsService:
@@ -14,56 +24,218 @@ class ContactsService:
         self._contactModel = None
     
     # Método público para obtener todos los contactos
-    def get_all_contacts(self):
-        # Inicia un bloque de manejo de errores.
+    # ('as_of': fecha para ver los contactos tal y como estaban, ver 'get_datasets')
+    def get_all_contacts(self, as_of=None):
+        # Devuelve la lista de modelos de contacto.
+        return list(self.get_datasets(as_of).contacts)
+    
+    # Método público para obtener los datasets cruzados e indexados
+    def get_datasets(self, as_of=None):
+        # 0. Con 'as_of' (ej. "2025-11-05 12:00") se usan los snapshots
+        #    vigentes en esa fecha en lugar de los archivos actuales.
+        if as_of is not None:
+            return self._get_datasets_as_of(as_of)
+        # 1. Si la sincronización ya publicó los datos, se usan directamente
+        #    (sin leer ni decodificar nada del disco).
+        datasets = global_state.get_datasets()
+        if datasets is None:
+            # 2. Arranque en frío: se cargan desde disco una sola vez
+            #    y se publican para las siguientes lecturas.
+            datasets = self._load_datasets()
+            global_state.set_datasets(datasets)
+        return datasets
+    
+    # Método público para filtrar contactos por sus marcas
+    def filter_contacts(self, is_client=None, is_featured=None, as_of=None):
+        """
+        Devuelve los contactos que son (True) o no son (False) clientes y/o
+        clientes destacados. None = no filtrar por esa marca. Usa las marcas
+        precalculadas: no se cruza ningún archivo en la consulta.
+        """
+        return self.get_datasets(as_of).select(is_client, is_featured)
+    
+    # Método público para buscar contactos por id, nombre o email
+    def search_contacts(self, query, as_of=None):
+        """
+        Devuelve los contactos cuyo nombre o email contienen 'query'
+        (sin distinguir mayúsculas) o cuyo id es exactamente 'query'.
+        """
+        query = str(query).strip().lower()
+        return [contact for contact in self.get_all_contacts(as_of)
+                if query == str(contact.get_id)
+                or query in str(contact.get_name).lower()
+                or query in str(contact.get_email).lower()]
+    
+    # Método estático: qué archivos cambiaron respecto a unos datasets anteriores
+    @staticmethod
+    def changed_files(hashes, previous):
+        """
+        Devuelve el conjunto de archivos de DATASET_FILES cuyo hash no
+        coincide con el de 'previous' (todos si no hay 'previous'). Un hash
+        desconocido (None) cuenta siempre como cambio.
+        """
+        if previous is None:
+            return set(DATASET_FILES)
+        return {name for name in DATASET_FILES
+                if hashes.get(name) is None or hashes.get(name) != previous.hashes.get(name)}
+    
+    # Método público para construir los datasets cruzados e indexados
+    def build_datasets(self, contacts_data, clients_data, featured_data, hashes, previous=None):
+        """
+        Cruza contactos, clientes y clientes destacados una sola vez y
+        devuelve un objeto 'Datasets' listo para publicar en 'global_state'.
+        'hashes' es {archivo: sha256} del contenido en disco.
+        Si se pasan los datasets anteriores ('previous'), solo se rehace la
+        parte de los archivos cuyo hash cambió (y los datos de un archivo
+        sin cambios pueden ser None: se reutilizan los anteriores).
+        """
+        changed = self.changed_files(hashes, previous)
+        if not changed:
+            return previous
+        raw = {"contacts.json": contacts_data, "clients.json": clients_data,
+               "featured_clients.json": featured_data}
+        for name in DATASET_FILES:
+            if name not in changed or raw[name] is None:
+                raw[name] = previous.raw[name]
+        contacts_changed = "contacts.json" in changed
+
+        # 1. Filas (id, email, nombre) y su posición: solo si cambiaron los contactos.
+        if contacts_changed:
+            rows = self._parse_contact_rows(raw["contacts.json"])
+            positions = {row[0]: index for index, row in enumerate(rows)}
+        else:
+            rows = [(c.get_id, c.get_email, c.get_name) for c in previous.contacts]
+            positions = previous.positions
+
+        # 2. Marcas de cliente y de destacado por posición: cada una solo si
+        #    cambió su archivo (o cambiaron las posiciones de los contactos).
+        try:
+            if contacts_changed or "clients.json" in changed:
+                client_ids = frozenset(c["id"] for c in raw["clients.json"]["Clientes"])
+                client_bits = Bitset.from_positions(len(rows), (positions[cid] for cid in client_ids if cid in positions))
+            else:
+                client_ids, client_bits = previous.client_ids, previous.client_bits
+            if contacts_changed or "featured_clients.json" in changed:
+                featured_ids = frozenset(c["id"] for c in raw["featured_clients.json"].get("Clientes destacados", []))
+                featured_bits = Bitset.from_positions(len(rows), (positions[cid] for cid in featured_ids if cid in positions))
+            else:
+                featured_ids, featured_bits = previous.featured_ids, previous.featured_bits
+        except (KeyError, TypeError, AttributeError) as e:
+            raise RuntimeError(f"Error al consultar clientes: {e}") from e
+
+        # 3. Vista cruzada: un 'ContactModel' por contacto con sus marcas ya puestas.
+        contacts = [self.create_contact_model(cid, email, name, client_bits[index], featured_bits[index])
+                    for index, (cid, email, name) in enumerate(rows)]
+        return Datasets(contacts, positions, client_ids, featured_ids, client_bits, featured_bits, raw, hashes)
+    
+    # Método público: qué snapshots estaban vigentes en una fecha
+    def resolve_as_of(self, as_of):
+        """
+        Resuelve 'as_of' al snapshot de cada dataset por bisección (ver
+        SnapshotIndex.py). Devuelve (archivos, hashes, datasets): 'archivos'
+        es {"contacts.json": "contacts_<ts>.json", ...}, 'hashes' el sha256
+        de cada uno (del catálogo) y 'datasets' los ya cruzados si están en
+        memoria (los actuales, si el contenido es el mismo) o None.
+        """
+        try:
+            timestamp = parse_as_of(as_of)
+        except ValueError as e:
+            raise RuntimeError(str(e)) from e
+        files = snapshot_index.resolve_files(timestamp)
+        hashes = self._file_hashes(files)
+        datasets = global_state.get_history_datasets(tuple(hashes[name] for name in DATASET_FILES))
+        current = global_state.get_datasets()
+        if datasets is None and current is not None and not self.changed_files(hashes, current):
+            datasets = current
+        return files, hashes, datasets
+
+    # Método privado: datasets vigentes en una fecha pasada
+    def _get_datasets_as_of(self, as_of):
+        """
+        Carga SOLO los snapshots vigentes en 'as_of', con las mismas cachés
+        que los datos actuales: el hash de cada snapshot sale del catálogo,
+        si coinciden con los datos en memoria se reutilizan tal cual, y los
+        datasets históricos ya cruzados se guardan en 'global_state'.
+        """
+        files, hashes, datasets = self.resolve_as_of(as_of)
+        if datasets is None:
+            # Se parte de los datasets (actuales o históricos) que compartan
+            # más archivos: solo se leen y se cruzan los que difieren.
+            candidates = [d for d in (global_state.get_latest_history_datasets(),
+                                      global_state.get_previous_datasets()) if d is not None]
+            previous = max(candidates, default=None,
+                           key=lambda d: sum(d.hashes.get(name) == hashes[name] for name in DATASET_FILES))
+            datasets = self._load_datasets(files, hashes, previous)
+            global_state.set_history_datasets(tuple(hashes[name] for name in DATASET_FILES), datasets)
+        return datasets
+
+    # Método privado: hash (sha256) de cada archivo según el catálogo
+    @staticmethod
+    def _file_hashes(files):
+        # {nombre lógico: sha256}; el catálogo solo vuelve a leer un
+        # archivo si cambió su tamaño o su 'mtime'.
+        hashes = {}
+        for name in DATASET_FILES:
+            entry = None
+            if files[name] is not None:
+                file_catalog.refresh_file(files[name])
+                entry = file_catalog.get(files[name])
+            hashes[name] = entry.sha256 if entry else None
+        return hashes
+
+    # Método privado para cargar los datasets desde disco (arranque en frío)
+    # 'files' es {nombre lógico: archivo a leer} (por defecto, los actuales).
+    def _load_datasets(self, files=None, hashes=None, previous=None):
+        files = files or {name: name for name in DATASET_FILES}
+        if hashes is None:
+            # 1. Registra el hash actual de cada archivo (para invalidar la caché
+            #    si alguien los modifica después).
+            hashes = self._file_hashes(files)
+            # Si la caché se invalidó porque cambió algún archivo, solo se leen
+            # y se vuelven a cruzar los archivos que cambiaron.
+            previous = global_state.get_previous_datasets()
+        changed = self.changed_files(hashes, previous)
+        if not changed:
+            return previous
+
+        contacts_data = clients_data = featured_data = None
         try:
-            # 1. Obtiene los datos en formato string JSON desde el repositorio.
-            response = self._contactsRepository.get_all_contacts()
-            # 2. Convierte (decodifica) el string JSON en un objeto Python (diccionario o lista).
-            response = json.loads(response)
-            # 3. Transforma los datos crudos de Python en una lista de objetos 'ContactModel'.
-            contacts = self._parse_json_in_list_model(response)
+            # 2. Obtiene los datos en formato string JSON desde el repositorio
+            #    y los convierte (decodifica) en objetos Python.
+            if "contacts.json" in changed:
+                contacts_data = json.loads(self._contactsRepository.get_all_contacts(files["contacts.json"]))
+            if "clients.json" in changed:
+                try:
+                    clients_data = json.loads(self._contactsRepository.get_all_clients(files["clients.json"]))
+                except RuntimeError as e:
+                    raise RuntimeError(f"Error al verificar cliente: {e}") from e
+            # Los clientes destacados son opcionales para listar contactos.
+            if "featured_clients.json" in changed:
+                try:
+                    if files["featured_clients.json"] is None:
+                        raise RuntimeError("No hay clientes destacados de esa fecha")
+                    featured_data = json.loads(self._contactsRepository.get_featured_clients(files["featured_clients.json"]))
+                except RuntimeError:
+                    featured_data = {}
         
         # Captura errores si el JSON recibido está mal formado.
         except json.JSONDecodeError as e:
             raise RuntimeError(f"Error al decodificar el JSON: {e}") from e
-        # Captura errores que puedan venir del repositorio (ej. archivo no encontrado).
-        except RuntimeError as e:
-            raise RuntimeError(e) from e
         
-        # Devuelve la lista de modelos de contacto.
-        return contacts
+        return self.build_datasets(contacts_data, clients_data, featured_data, hashes, previous)
     
     # Método para crear un objeto modelo de contacto
-    def create_contact_model(self, id, email, name, is_client):
+    def create_contact_model(self, id, email, name, is_client, is_featured=False):
         # Crea una instancia del modelo 'ContactModel' con los datos proporcionados.
         # También almacena esta instancia en la variable interna '_contactModel'.
-        self._contactModel = ContactModel(id, name, email, is_client)
+        self._contactModel = ContactModel(id, name, email, is_client, is_featured)
         # Devuelve el objeto modelo recién creado.
         return self._contactModel
     
-    # Método privado para verificar si un ID de contacto pertenece a un cliente
-    def _contact_is_client(self, id):
-        # Inicia el manejo de errores para la consulta de clientes.
-        try:
-            # 1. Obtiene el string JSON de todos los clientes desde el repositorio.
-            clients = self._contactsRepository.get_all_clients()
-            # 2. Decodifica el JSON.
-            clients = json.loads(clients)
-            # 3. Comprueba si 'alguno' (any) de los elementos 'c' en la lista 'clients["Clientes"]'
-            #    tiene un 'id' que coincida con el 'id' del contacto.
-            return any(c["id"] == id for c in clients["Clientes"])
-        
-        # Manejo de errores de decodificación JSON.
-        except json.JSONDecodeError as e:
-            raise RuntimeError(f"Error al decodificar el JSON: {e}") from e
-        # Manejo de cualquier otro error durante la consulta.
-        except Exception as e:
-            raise RuntimeError(f"Error al consultar clientes: {e}") from e
-            
-    # Método privado para transformar el JSON crudo en una lista de modelos
-    def _parse_json_in_list_model(self, data):
-        # Inicializa una lista vacía para almacenar los objetos modelo.
+    # Método privado para transformar el JSON crudo en una lista de filas
+    # (id, email, nombre), ya limpias, en el orden del archivo.
+    def _parse_contact_rows(self, data):
+        # Inicializa una lista vacía para almacenar las filas.
         contacts = list()
         
         try:
@@ -77,26 +249,11 @@ class ContactsService:
                 # Limpieza de datos: si el nombre es 'False', usa "Desconocido".
                 name = contacto["name"] if contacto["name"] != False else "Desconocido"
                 
-                try:
-                    # Llama al método interno para verificar si este ID es también un cliente.
-                    is_client = self._contact_is_client(id)
-                except RuntimeError as e:
-                    # Si falla la verificación, lanza un error.
-                    raise RuntimeError(f"Error al verificar cliente: {e}") from e
-                
-                try:
-                    # Crea el objeto 'ContactModel' usando el método de esta clase.
-                    # Añade el nuevo objeto modelo a la lista 'contacts'.
-                    contacts.append(self.create_contact_model(id, email, name, is_client))
-                
-                # Captura errores si falta una clave (ej. "id") en el diccionario 'contacto'.
-                except KeyError as e:
-                    raise ValueError(f"Error en la clave del objeto JSON : {e}") from e
-                # Captura otros errores durante la creación del modelo.
-                except ValueError as e:
-                    raise ValueError(f"Error al crear el modelo de contacto : {e}")
+                # Añade la fila; las marcas de cliente y destacado se
+                # calculan aparte (ver 'build_datasets').
+                contacts.append((id, email, name))
             
-            # Devuelve la lista completa de objetos modelo.
+            # Devuelve la lista completa de filas.
             return contacts
         
         # Captura un error general si falla la iteración (ej. si 'data["contactos"]' no existe).
@@ -0,0 +1,291 @@
+# Services/DuplicateService.py
+# Detección de contactos duplicados (la misma persona o empresa con
+# varios ids). Comparar todos con todos es O(n²); en su lugar:
+# 1. "Bloqueo": cada contacto genera unas pocas claves (email normalizado,
+#    dominio del email, nombre normalizado con las palabras ordenadas y su
+#    clave fonética). Solo se comparan contactos que comparten alguna clave.
+#    Los bloques demasiado grandes (ej. "gmail.com" o un apellido muy común)
+#    se descartan: no aportan información y romperían el tiempo casi lineal.
+# 2. "Puntuación": cada par candidato recibe una puntuación (0-1) según
+#    email, dominio y parecido de los nombres (trigramas y palabras comunes).
+# 3. "Agrupación": los pares por encima del umbral se unen en grupos
+#    (union-find) y se escribe un informe en 'logs/duplicates_report.json'.
+import json
+import os
+import re
+import unicodedata
+from datetime import datetime
+from functools import lru_cache
+import JsonStream
+from SharedState import global_state
+
+# Ruta del informe
+REPORT_PATH = os.path.join("logs", "duplicates_report.json")
+# Puntuación mínima para considerar dos contactos duplicados
+THRESHOLD = 0.8
+# Tamaño máximo de un bloque (los mayores se descartan)
+MAX_BLOCK = 50
+# Dominios de correo gratuitos: compartirlos no dice nada
+FREE_DOMAINS = frozenset(("gmail.com", "googlemail.com", "hotmail.com", "hotmail.es", "outlook.com",
+                          "outlook.es", "yahoo.com", "yahoo.es", "icloud.com", "live.com", "msn.com",
+                          "protonmail.com", "gmx.com", "aol.com"))
+# Palabras que no distinguen a nadie: formas jurídicas, artículos y
+# palabras genéricas de nombres de empresa
+STOPWORDS = frozenset(("sl", "slu", "sa", "sau", "ltda", "ltd", "coop", "sc", "scp", "cb", "sll", "inc", "llc",
+                       "de", "del", "la", "las", "el", "los", "y", "e", "the", "and", "of",
+                       "grupo", "group", "soluciones", "solutions", "servicios", "services"))
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+# Tamaño de las cachés de normalización: nombres y palabras se repiten
+# mucho (nombres propios, apellidos), así que cada uno se normaliza una vez
+CACHE_SIZE = 1 << 17
+
+# --- Normalización ---
+
+def _ascii(text):
+    # Minúsculas y sin tildes: "Íñigo Núñez" -> "inigo nunez"
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+@lru_cache(maxsize=CACHE_SIZE)
+def name_tokens(name):
+    """Palabras significativas del nombre, normalizadas (sin formas jurídicas)."""
+    if not isinstance(name, str) or name == "Desconocido":
+        return ()
+    # "S.L." -> "sl": se quitan los puntos antes de separar palabras
+    words = _NON_ALNUM.split(_ascii(name).replace(".", ""))
+    return tuple(w for w in words if w and w not in STOPWORDS)
+
+def normalize_email(email):
+    """Email en minúsculas; en Gmail se ignoran los puntos y el '+etiqueta'."""
+    if not isinstance(email, str) or "@" not in email:
+        return None
+    user, _, domain = email.strip().lower().rpartition("@")
+    user = user.split("+", 1)[0]
+    if domain in ("gmail.com", "googlemail.com"):
+        user, domain = user.replace(".", ""), "gmail.com"
+    return f"{user}@{domain}" if user and domain else None
+
+# Reglas de la clave fonética (español simplificado), en orden
+_PHONETIC_RULES = (
+    (re.compile(r"ch"), "x"), (re.compile(r"ll"), "y"), (re.compile(r"qu"), "k"),
+    (re.compile(r"c([ei])"), r"s\1"), (re.compile(r"g([ei])"), r"j\1"), (re.compile(r"gu([ei])"), r"g\1"),
+    (re.compile(r"[cq]"), "k"), (re.compile(r"z"), "s"), (re.compile(r"v"), "b"), (re.compile(r"w"), "u"),
+    (re.compile(r"h"), ""),
+)
+_REPEATED = re.compile(r"(.)\1+")
+
+@lru_cache(maxsize=CACHE_SIZE)
+def phonetic(word):
+    """
+    Clave fonética de una palabra: aplica las equivalencias del español
+    (v/b, z/c, ll/y, h muda...), quita las vocales salvo la primera letra
+    y junta las letras repetidas: "Etxeberria" y "echeberria" -> "exbr".
+    """
+    word = word.replace("tx", "ch")
+    for pattern, replacement in _PHONETIC_RULES:
+        word = pattern.sub(replacement, word)
+    return _REPEATED.sub(r"\1", word[:1] + re.sub(r"[aeiouy]", "", word[1:]))
+
+@lru_cache(maxsize=CACHE_SIZE)
+def trigrams(tokens):
+    """Conjunto de trigramas del nombre (con espacios de relleno)."""
+    text = f"  {' '.join(tokens)} "
+    return frozenset(text[i:i + 3] for i in range(len(text) - 2))
+
+@lru_cache(maxsize=CACHE_SIZE)
+def name_keys(tokens):
+    """Claves de bloqueo de un nombre: palabras ordenadas y su versión fonética."""
+    return "n:" + " ".join(sorted(tokens)), "p:" + " ".join(sorted(phonetic(t) for t in tokens))
+
+# Define una clase con los datos normalizados de un contacto.
+class _Candidate:
+    __slots__ = ("id", "name", "email", "norm_email", "domain", "tokens")
+
+    # Constructor de la clase
+    def __init__(self, cid, name, email):
+        self.id = cid
+        self.name = name
+        self.email = email
+        self.norm_email = normalize_email(email)
+        self.domain = self.norm_email.rpartition("@")[2] if self.norm_email else None
+        self.tokens = name_tokens(name) if isinstance(name, str) else ()
+
+    @property
+    def grams(self):
+        # Solo se calculan para los contactos que llegan a compararse
+        return trigrams(self.tokens) if self.tokens else frozenset()
+
+    def blocking_keys(self):
+        """Claves de bloqueo del contacto."""
+        keys = []
+        if self.norm_email:
+            keys.append("e:" + self.norm_email)
+            if self.domain not in FREE_DOMAINS:
+                keys.append("d:" + self.domain)
+        if self.tokens:
+            keys.extend(name_keys(self.tokens))
+        return keys
+
+# Define una clase union-find (conjuntos disjuntos) para agrupar los pares.
+class _UnionFind:
+
+    # Constructor de la clase
+    def __init__(self):
+        self._parent = {}
+
+    def find(self, x):
+        parent = self._parent
+        root = parent.setdefault(x, x)
+        while root != parent[root]:
+            root = parent[root]
+        # Compresión de caminos
+        while x != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self._parent[max(ra, rb)] = min(ra, rb)
+
+    def groups(self):
+        groups = {}
+        for x in self._parent:
+            groups.setdefault(self.find(x), []).append(x)
+        return [members for members in groups.values() if len(members) > 1]
+
+# Define la clase DuplicateService.
+class DuplicateService:
+
+    # Constructor de la clase
+    def __init__(self, db_path="db", threshold=THRESHOLD, max_block=MAX_BLOCK):
+        self.DB_PATH = db_path
+        self.threshold = threshold
+        self.max_block = max_block
+
+    def iter_contacts(self, source=None):
+        """
+        Genera (id, nombre, email) de los contactos a revisar: de la caché
+        de 'global_state' si está caliente y, si no, de 'contacts.json' (o
+        del archivo 'source', ej. un snapshot) en streaming.
+        """
+        datasets = global_state.get_datasets() if source is None else None
+        if datasets is not None:
+            for contact in datasets.contacts:
+                yield contact.get_id, contact.get_name, contact.get_email
+            return
+        filepath = source if source and os.path.exists(source) else os.path.join(self.DB_PATH, source or "contacts.json")
+        try:
+            for record in JsonStream.iter_records(filepath):
+                yield record["id"], record.get("name"), record.get("email")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise RuntimeError(f"Error al leer '{filepath}': {e}") from e
+
+    @staticmethod
+    def score(a, b):
+        """
+        Puntuación (0-1) de que 'a' y 'b' sean el mismo contacto, y el motivo.
+        - Mismo email (normalizado)                      -> 1.0
+        - Mismo dominio de empresa: 0.5 + 0.5 x parecido del nombre
+        - Si no: el parecido del nombre (trigramas)
+        El parecido del nombre es el mayor entre la similitud de trigramas
+        (Jaccard) y la proporción de palabras comunes del nombre más corto
+        ("Grupo Arken" / "ARKEN SOLUTIONS LTDA" comparten "arken").
+        """
+        if a.norm_email and a.norm_email == b.norm_email:
+            return 1.0, "email"
+        a_grams, b_grams = a.grams, b.grams
+        grams = len(a_grams & b_grams) / len(a_grams | b_grams) if a_grams and b_grams else 0.0
+        if a.domain and a.domain == b.domain and a.domain not in FREE_DOMAINS:
+            shared = set(a.tokens) & set(b.tokens)
+            containment = len(shared) / min(len(a.tokens), len(b.tokens)) if shared else 0.0
+            return 0.5 + 0.5 * max(grams, containment), "dominio"
+        return grams, "nombre"
+
+    def find(self, contacts):
+        """
+        Busca duplicados en 'contacts' (iterable de (id, nombre, email)).
+        Devuelve (grupos, estadísticas). Cada grupo es un diccionario con
+        los contactos y los pares que lo unieron.
+        """
+        candidates = [_Candidate(cid, name, email) for cid, name, email in contacts]
+
+        # 1. Bloques: {clave: [posición, ...]}
+        blocks = {}
+        for position, candidate in enumerate(candidates):
+            for key in candidate.blocking_keys():
+                blocks.setdefault(key, []).append(position)
+
+        # 2. Pares candidatos (sin repetir) dentro de cada bloque
+        union = _UnionFind()
+        compared = set()
+        matches = {}
+        skipped = 0
+        for members in blocks.values():
+            if len(members) < 2:
+                continue
+            if len(members) > self.max_block:
+                skipped += 1
+                continue
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    pair = (a, b) if a < b else (b, a)
+                    if pair in compared:
+                        continue
+                    compared.add(pair)
+                    score, reason = self.score(candidates[a], candidates[b])
+                    if score >= self.threshold:
+                        union.union(a, b)
+                        matches[pair] = (score, reason)
+
+        # 3. Grupos. Los pares se reparten por la raíz de su grupo en UNA
+        #    pasada (recorrer todos los pares por cada grupo sería cuadrático).
+        pairs_by_root = {}
+        for (a, b), (score, reason) in matches.items():
+            pairs_by_root.setdefault(union.find(a), []).append(
+                {"ids": [candidates[a].id, candidates[b].id], "score": round(score, 3), "reason": reason})
+        groups = []
+        for members in union.groups():
+            members.sort()
+            pairs = pairs_by_root[union.find(members[0])]
+            groups.append({
+                "size": len(members),
+                "max_score": max(p["score"] for p in pairs),
+                "contacts": [{"id": candidates[p].id, "name": candidates[p].name, "email": candidates[p].email}
+                             for p in members],
+                "pairs": pairs,
+            })
+        groups.sort(key=lambda g: (-g["size"], -g["max_score"]))
+        stats = {
+            "contacts": len(candidates),
+            "blocks": len(blocks),
+            "skipped_blocks": skipped,
+            "comparisons": len(compared),
+            "groups": len(groups),
+            "duplicated_contacts": sum(g["size"] for g in groups),
+        }
+        return groups, stats
+
+    def run(self, source=None, report_path=REPORT_PATH):
+        """
+        Busca duplicados en los contactos (ver 'iter_contacts') y escribe el
+        informe (de forma atómica). Devuelve (grupos, estadísticas).
+        ¡Esta función es BLOQUEANTE (E/S y CPU)!
+        """
+        groups, stats = self.find(self.iter_contacts(source))
+        report = {
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "threshold": self.threshold,
+            "max_block": self.max_block,
+            "stats": stats,
+            "groups": groups,
+        }
+        tmp_path = f"{report_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, report_path)
+        except OSError as e:
+            raise RuntimeError(f"Error al guardar el informe de duplicados: {e}") from e
+        return groups, stats
@@ -0,0 +1,192 @@
+# Services/ExportService.py
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import os
+import sys
+# Lector JSON incremental: los contactos se leen registro a registro
+import JsonStream
+from SharedState import global_state
+
+# Formatos de exportación disponibles
+FORMATS = ("csv", "ndjson", "json", "parquet")
+# Compresiones disponibles para los formatos de texto
+COMPRESSIONS = {"gz": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+# Códecs de Parquet para cada opción de compresión (Parquet no tiene bz2 ni xz)
+PARQUET_CODECS = {None: "snappy", "gz": "gzip"}
+# Columnas de cada fila exportada
+FIELDS = ("id", "name", "email", "is_client", "is_featured")
+# Filas que se acumulan antes de escribir un bloque
+CHUNK_ROWS = 10000
+
+# Define la clase ExportService, que exporta los contactos cruzados con
+# sus marcas de cliente y cliente destacado.
+class ExportService:
+
+    # Constructor de la clase
+    def __init__(self, db_path="db"):
+        # Define la ruta del directorio de datos
+        self.DB_PATH = db_path
+
+    # --- Lectura ---
+
+    def _read_ids(self, filename, key):
+        # Conjunto de ids de un archivo (ej. clients.json), leído en streaming.
+        # Si el archivo no existe (o no hay, 'None'), el conjunto queda vacío.
+        if filename is None:
+            return set()
+        filepath = os.path.join(self.DB_PATH, filename)
+        if not os.path.exists(filepath):
+            return set()
+        return {record["id"] for k, index, record in JsonStream.iter_entries(filepath)
+                if k == key and index is not None}
+
+    def iter_rows(self, source=None, as_of=None):
+        """
+        Devuelve un iterador con las filas a exportar: (id, nombre, email,
+        es_cliente, es_destacado).
+        - Sin 'source' y con la caché de 'global_state' caliente, las filas
+          salen de memoria, con las marcas ya calculadas al sincronizar.
+        - Con 'as_of' (una fecha) se exportan los snapshots vigentes en esa
+          fecha: de memoria si ya están cruzados, si no en streaming.
+        - Si no, se lee 'contacts.json' (o el archivo 'source', ej. un
+          snapshot) en streaming: la memoria no depende del número de contactos.
+        La fecha se resuelve AL LLAMAR (no al empezar a recorrer las filas):
+        un 'as_of' no válido falla antes de escribir nada.
+        """
+        files = {"contacts.json": source or "contacts.json", "clients.json": "clients.json",
+                 "featured_clients.json": "featured_clients.json"}
+        if as_of is not None:
+            from Services.ContactsService import ContactsService
+            files, _, datasets = ContactsService().resolve_as_of(as_of)
+        else:
+            datasets = global_state.get_datasets() if source is None else None
+        return self._iter_rows(files, datasets)
+
+    def _iter_rows(self, files, datasets):
+        # Genera las filas de los datasets ya cruzados o, si no hay, de los archivos.
+        if datasets is not None:
+            for contact in datasets.contacts:
+                yield (contact.get_id, contact.get_name, contact.get_email,
+                       contact.get_is_client, contact.get_is_featured)
+            return
+
+        client_ids = self._read_ids(files["clients.json"], "Clientes")
+        featured_ids = self._read_ids(files["featured_clients.json"], "Clientes destacados")
+        source = files["contacts.json"]
+        filepath = source if os.path.exists(source) else os.path.join(self.DB_PATH, source)
+        for record in JsonStream.iter_records(filepath):
+            cid = record["id"]
+            # Limpieza de datos: igual que ContactsService ('False' -> "Desconocido")
+            name = record.get("name") if record.get("name") is not False else "Desconocido"
+            email = record.get("email") if record.get("email") is not False else "Desconocido"
+            yield cid, name, email, cid in client_ids, cid in featured_ids
+
+    # --- Escritura ---
+
+    @staticmethod
+    def _chunks(rows, chunk_rows):
+        # Agrupa las filas en listas de como máximo 'chunk_rows' elementos.
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _write_text(self, out, rows, fmt, chunk_rows):
+        # Escribe CSV / NDJSON / JSON por bloques. Devuelve el número de filas.
+        count = 0
+        if fmt == "json":
+            out.write("[")
+        for chunk in self._chunks(rows, chunk_rows):
+            buffer = io.StringIO()
+            if fmt == "csv":
+                writer = csv.writer(buffer, lineterminator="\n")
+                if count == 0:
+                    writer.writerow(FIELDS)
+                writer.writerows(chunk)
+            else:
+                lines = (json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) for row in chunk)
+                if fmt == "ndjson":
+                    buffer.write("\n".join(lines) + "\n")
+                else:
+                    buffer.write(("," if count else "") + ",\n".join(lines))
+            # Un solo 'write' por bloque: la memoria usada es la de un bloque.
+            out.write(buffer.getvalue())
+            count += len(chunk)
+        if fmt == "json":
+            out.write("]\n")
+        elif fmt == "csv" and count == 0:
+            csv.writer(out, lineterminator="\n").writerow(FIELDS)
+        return count
+
+    def _write_parquet(self, path, rows, compression, chunk_rows):
+        # Escribe Parquet (columnar) por lotes. Requiere 'pyarrow' (opcional).
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("El formato 'parquet' requiere instalar 'pyarrow'") from e
+        schema = pa.schema([("id", pa.int64()), ("name", pa.string()), ("email", pa.string()),
+                            ("is_client", pa.bool_()), ("is_featured", pa.bool_())])
+        codec = PARQUET_CODECS[compression]
+        count = 0
+        with pq.ParquetWriter(path, schema, compression=codec) as writer:
+            for chunk in self._chunks(rows, chunk_rows):
+                columns = list(zip(*chunk))
+                writer.write_batch(pa.record_batch([pa.array(c) for c in columns], schema=schema))
+                count += len(chunk)
+        return count
+
+    def export(self, output, fmt="csv", compression=None, source=None, chunk_rows=CHUNK_ROWS, as_of=None):
+        """
+        Exporta los contactos a 'output' ("-" = salida estándar), o los
+        vigentes en la fecha 'as_of' (ver 'iter_rows').
+        'fmt' es uno de FORMATS y 'compression' uno de COMPRESSIONS (o None).
+        El archivo se escribe primero como temporal y se renombra al final,
+        así nunca queda una exportación a medias. Devuelve el número de filas.
+        ¡Esta función es BLOQUEANTE (E/S)!
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato no soportado: {fmt}")
+        if fmt == "parquet":
+            if compression not in PARQUET_CODECS:
+                raise ValueError(f"Compresión no soportada en Parquet: {compression} "
+                                 f"(use 'gz' o ninguna, que equivale a snappy)")
+        elif compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"Compresión no soportada: {compression}")
+        if source is not None and as_of is not None:
+            raise ValueError("'source' y 'as_of' no se pueden usar a la vez")
+        rows = self.iter_rows(source, as_of)
+
+        try:
+            if output == "-":
+                if fmt == "parquet" or compression:
+                    raise ValueError("La salida estándar solo admite formatos de texto sin comprimir")
+                return self._write_text(sys.stdout, rows, fmt, chunk_rows)
+
+            tmp_path = f"{output}.tmp"
+            try:
+                if fmt == "parquet":
+                    count = self._write_parquet(tmp_path, rows, compression, chunk_rows)
+                else:
+                    opener = COMPRESSIONS.get(compression, open)
+                    with opener(tmp_path, "wt", encoding="utf-8", newline="") as out:
+                        count = self._write_text(out, rows, fmt, chunk_rows)
+                os.replace(tmp_path, output)
+            except BaseException:
+                # Si algo falla, no se deja el temporal a medias.
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            return count
+        # OSError: disco; ValueError: JSON inválido en el origen o parámetros
+        # incorrectos; KeyError/TypeError: registros sin la forma esperada.
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise RuntimeError(f"Error al exportar los contactos: {e}") from e
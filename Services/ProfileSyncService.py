@@ -0,0 +1,85 @@
+# Services/ProfileSyncService.py
+# Sincroniza TODOS los perfiles de API de 'config.json' (ver
+# 'ConfigManager.get_profiles') a la vez, en un solo proceso:
+# - Un único 'httpx.AsyncClient' compartido: su pool de conexiones
+#   (keep-alive) se reutiliza entre perfiles y entre ciclos, con un
+#   máximo de conexiones para todo el proceso.
+# - Un 'RateLimiter' por perfil: cada tenant respeta su propio límite
+#   de peticiones por segundo.
+# - Las descargas corren en el bucle de asyncio; la decodificación, la
+#   comparación con disco y la codificación van al pool de procesos
+#   (WorkerPool.py), esperando desde un hilo por perfil.
+# Así N tenants cuestan un proceso, no N copias de la aplicación.
+import asyncio
+import httpx
+from ConfigManager import ConfigManager
+from RateLimiter import RateLimiter
+from Repositories.SynchronyRepository import EndpointLatency
+from Services.SynchronyService import SynchronyService
+
+# Conexiones simultáneas (y en reposo) del pool compartido
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE = 10
+
+# Define la clase ProfileSyncService.
+class ProfileSyncService:
+
+    # Constructor de la clase
+    def __init__(self, config_manager=None):
+        self.config = config_manager or ConfigManager()
+        self._client = None
+        # {nombre: (perfil, SynchronyService)}: se reutilizan entre ciclos
+        # (conservan su token) mientras el perfil no cambie en 'config.json'
+        self._services = {}
+
+    def _get_client(self):
+        # El cliente compartido se crea la primera vez (dentro del bucle).
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(EndpointLatency.DEFAULT_CONNECT, read=EndpointLatency.DEFAULT_READ),
+                limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE))
+        return self._client
+
+    def _service(self, profile):
+        # Servicio del perfil; se rehace si el perfil cambió.
+        cached = self._services.get(profile["name"])
+        if cached is None or cached[0] != profile:
+            service = SynchronyService(profile, self._get_client(), RateLimiter(profile["rate_limit"]))
+            cached = self._services[profile["name"]] = (profile, service)
+        return cached[1]
+
+    async def _sync_profile(self, profile):
+        service = self._service(profile)
+        bodies = await service.fetch_all()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, service.store, bodies)
+
+    async def sync_all(self):
+        """
+        Sincroniza todos los perfiles a la vez.
+        Devuelve {nombre: mensaje} y {nombre: error} (el fallo de un perfil
+        no detiene a los demás). Los perfiles mal configurados (ver
+        'ConfigManager.get_invalid_profiles') aparecen como errores.
+        """
+        profiles = self.config.get_profiles()
+        # Olvida los perfiles que ya no están en la configuración
+        names = {profile["name"] for profile in profiles}
+        self._services = {name: value for name, value in self._services.items() if name in names}
+        results = await asyncio.gather(*(self._sync_profile(profile) for profile in profiles),
+                                       return_exceptions=True)
+        done = {}
+        errors = {name: f"Perfil omitido: {reason}" for name, reason in self.config.get_invalid_profiles().items()}
+        for profile, result in zip(profiles, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, Exception):
+                errors[profile["name"]] = str(result)
+            else:
+                done[profile["name"]] = result
+        return done, errors
+
+    async def aclose(self):
+        """Cierra el pool de conexiones compartido."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
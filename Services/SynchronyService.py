@@ -2,210 +2,303 @@
 import json
 import asyncio
 import os
+import shutil
 from datetime import datetime
 # Importa el repositorio que se comunica con la API
 from Repositories.SynchronyRepository import SynchronyRepository
-# Importa Process y Pipe para ejecutar tareas en paralelo (en diferentes procesos)
-from multiprocessing import Process, Pipe
+# Importa el pool de procesos persistente (decodificación, comparación
+# y codificación de cada dataset, en paralelo)
+from WorkerPool import worker_pool
 from ConfigManager import ConfigManager
+# Importa el catálogo de archivos para registrar los archivos escritos
+from FileCatalog import file_catalog, FileCatalog
+# Importa el motor de retención de snapshots
+import SnapshotRetention
+# Importa la comparación por registros y el registro de cambios (NDJSON)
+import SnapshotDiff
+from Changelog import changelog, Changelog
+# Importa el estado global (caché de datasets) y el servicio que cruza los datos
+from SharedState import global_state
+from Services.ContactsService import ContactsService, DATASET_FILES
+# Perfilado opcional de cada sincronización
+from Profiler import profiler
+
+# Datasets que se sincronizan (cada uno se guarda en '<dataset>.json')
+DATASETS = ("clients", "contacts", "featured_clients")
+
+# --- Etapas de CPU (se ejecutan en los procesos de WorkerPool) ---
+# Son funciones de nivel de módulo para poder enviarlas al pool.
+
+def _compare(filepath, encoded, data):
+    """
+    Compara 'data' (ya codificado en 'encoded') con lo que hay en disco.
+    Devuelve (es_nuevo, cambios): 'cambios' es la lista de registros
+    añadidos, eliminados y modificados (ver 'SnapshotDiff.iter_diff_data').
+    """
+    try:
+        with open(filepath, "rb") as f:
+            old = f.read()
+    except OSError:
+        # Si el archivo principal no existe, cualquier dato se considera "nuevo"
+        old = None
+    # Lo normal es que el archivo lo escribiera esta misma función: basta
+    # comparar los bytes, sin decodificar el archivo antiguo.
+    if old == encoded:
+        return False, []
+    old_data = None
+    if old is not None:
+        try:
+            old_data = json.loads(old)
+        except (ValueError, UnicodeDecodeError):
+            # Archivo corrupto: se fuerza la re-escritura (todo cuenta como añadido)
+            pass
+        else:
+            if old_data == data:
+                return False, []
+    return True, list(SnapshotDiff.iter_diff_data(old_data, data))
+
+def prepare_dataset(db_path, filename, body, want_data):
+    """
+    Decodifica 'body' (bytes JSON de la API), lo compara con el archivo de
+    disco y, si cambió, lo codifica (indent=2) en un archivo temporal junto
+    al definitivo. Devuelve (es_nuevo, ruta temporal o None, datos o None,
+    cambios por registro). Los datos decodificados solo vuelven al proceso
+    principal si cambiaron o si se piden ('want_data', ej. con la caché
+    fría): un ciclo sin cambios no copia nada entre procesos.
+    """
+    try:
+        data = json.loads(body)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise RuntimeError(f"Error al recibir la respuesta, No es un JSON: {type(e).__name__}") from None
+    # 'ensure_ascii=False' guarda tildes y 'ñ'; 'indent=2' lo hace legible
+    encoded = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    filepath = os.path.join(db_path, filename)
+    is_new, changes = _compare(filepath, encoded, data)
+    tmp_path = None
+    if is_new:
+        # No termina en '.json': el vigilante de archivos lo ignora
+        tmp_path = f"{filepath}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(encoded)
+    return is_new, tmp_path, data if is_new or want_data else None, changes
 
 # Define la clase SynchronyService, que orquesta la sincronización de datos.
 class SynchronyService:
     
     # Constructor de la clase
-    def __init__(self):
+    # Sin argumentos sincroniza el perfil principal en 'db'. Con 'profile'
+    # (ver 'ConfigManager.get_profiles') usa sus credenciales, endpoints y
+    # carpeta; 'client' y 'limiter' se pasan al repositorio (ver
+    # 'ProfileSyncService', que sincroniza todos los perfiles a la vez).
+    def __init__(self, profile=None, client=None, limiter=None):
         # Instancia el repositorio para acceder a los métodos de la API
-        self.synchronyRepository = SynchronyRepository()
+        self.synchronyRepository = SynchronyRepository(profile, client, limiter)
         _config = ConfigManager()
+        self.profile = profile
+        # Nombre del perfil para los mensajes del log ("" = el principal)
+        self._log_prefix = f"[{profile['name']}] " if profile and not self.is_default else ""
         # Define la ruta del directorio donde se guardarán los archivos JSON
-        self.DB_PATH = "db"
+        self.DB_PATH = profile["db_path"] if profile else "db"
+        # Catálogo de la carpeta: el global para 'db'; uno propio para la de cada perfil
+        self.catalog = file_catalog if self.is_default else FileCatalog(self.DB_PATH)
+        # Registro de cambios de la carpeta (igual que el catálogo)
+        self.changelog = changelog if self.is_default else Changelog(self.DB_PATH)
         # Define la ruta del archivo de log
         self.LOGS = "logs/logs.log"
         # Obtiene el host (aunque no se usa en este fragmento, es parte de la config)
-        self.HOST = _config.get_ping()
+        self.HOST = profile["ping"] if profile else _config.get_ping()
         # Crea el directorio 'db' si no existe. 'exist_ok=True' evita un error si ya existe.
         os.makedirs(self.DB_PATH, exist_ok=True)
+
+    @property
+    def is_default(self):
+        """True si los datos van a 'db' (perfil principal): solo esos se
+        publican en 'global_state' y pasan por la retención de snapshots."""
+        return self.profile is None or self.profile["db_path"] == "db"
     
-    # --- Métodos de Tarea (Diseñados para Procesos Hijos) ---
-    # Cada uno de estos métodos (clients, contacts, featured_clients) está
-    # diseñado para ser ejecutado en un Proceso separado.
-    # Reciben un argumento 'conn' (una conexión de Tubería/Pipe) para devolver el resultado.
+    def _publish_datasets(self, clients, contacts, featured):
+        """
+        Publica los datos recién descargados (ya decodificados) en la caché
+        de 'global_state', cruzados e indexados, para que listar contactos
+        justo después de sincronizar no lea nada del disco.
+        """
+        hashes = {}
+        for name in DATASET_FILES:
+            # Si el archivo no cambió, solo cuesta un 'stat'.
+            file_catalog.refresh_file(name)
+            entry = file_catalog.get(name)
+            hashes[name] = entry.sha256 if entry else None
+        # Con los datasets anteriores, solo se rehace el cruce de los
+        # archivos cuyo hash cambió.
+        previous = global_state.get_previous_datasets()
+        global_state.set_datasets(ContactsService().build_datasets(contacts, clients, featured, hashes, previous))
 
-    def clients(self, conn):
-        try:
-            # Crea un nuevo bucle de eventos asyncio (necesario para ejecutar 'async' en un nuevo proceso).
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            # Ejecuta la tarea asíncrona del repositorio (la llamada a la API)
-            result = loop.run_until_complete(self.synchronyRepository.get_all_clients())
-            # Envía el resultado (los datos) de vuelta al proceso padre
-            conn.send(result)
-        except Exception as e:
-            # Si algo falla, envía un diccionario de error de vuelta
-            conn.send({"Error": f"{type(e).__name__}: {e}"})
-        finally:
-            # Cierra la conexión del pipe, sea cual sea el resultado
-            conn.close()
+    def _commit_file(self, dataset, tmp_path, timestamp):
+        # Coloca el archivo ya codificado por el pool: primero la copia con
+        # timestamp (historial) y después el archivo principal, que se
+        # sustituye en un solo paso ('os.replace').
+        filename = f"{dataset}.json"
+        snapshot = f"{dataset}_{timestamp}.json"
+        shutil.copyfile(tmp_path, os.path.join(self.DB_PATH, snapshot))
+        os.replace(tmp_path, os.path.join(self.DB_PATH, filename))
+        # Sus cambios ya están en el registro: se confirman en cuanto el
+        # archivo principal tiene los datos nuevos.
+        self.changelog.confirm(dataset)
+        # Registra los archivos en el catálogo (tamaño, registros, hash)
+        self.catalog.refresh_file(filename)
+        self.catalog.refresh_file(snapshot)
 
-    def contacts(self, conn):
-        try:
-            # Lógica idéntica a 'clients', pero para el endpoint de contactos
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            result = loop.run_until_complete(self.synchronyRepository.get_all_contacts())
-            conn.send(result)
-        except Exception as e:
-            conn.send({"Error": f"{type(e).__name__}: {e}"})
-        finally:
-            conn.close()
+    @staticmethod
+    def _discard_temp(prepared):
+        # Borra los temporales que no llegaron a colocarse (ej. tras un error).
+        for result in prepared.values():
+            if isinstance(result, tuple) and result[1] and os.path.exists(result[1]):
+                os.remove(result[1])
 
-    def featured_clients(self, conn):
-        try:
-            # Lógica idéntica a 'clients', pero para el endpoint de clientes destacados
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            result = loop.run_until_complete(self.synchronyRepository.get_featured_clients())
-            conn.send(result)
-        except Exception as e:
-            conn.send({"Error": f"{e}"})
-        finally:
-            conn.close()
-
-    # Método para crear/sobrescribir un archivo JSON
-    def create_json(self, name, data):
-        # Construye la ruta completa al archivo (ej: "db/clients.json")
-        filepath = os.path.join(self.DB_PATH, name)
-        try:
-            # Abre el archivo en modo escritura ('w')
-            with open(filepath, 'w', encoding='utf-8') as f:
-                # Escribe los 'data' en el archivo 'f' con formato JSON
-                # ensure_ascii=False permite guardar tildes y 'ñ' correctamente
-                # indent=2 formatea el JSON para que sea legible
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except IOError as e:
-            # Maneja errores si no se puede escribir el archivo
-            print(f"Error al escribir el archivo {filepath}: {e}")
-
-    # --- NUEVA FUNCIÓN ---
-    def _is_data_new(self, filename, new_data):
-        """Compara new_data con el contenido actual de filename."""
-        filepath = os.path.join(self.DB_PATH, filename)
+    def _store(self, log, prepared):
+        """
+        Guarda los datasets preparados por el pool: 'prepared' es
+        {dataset: (es_nuevo, archivo temporal, datos, cambios)}. Si algo
+        cambió, coloca los archivos principales y los snapshots con
+        timestamp, después de añadir los cambios al registro ('Changelog.py').
+        Devuelve el mensaje del resultado.
+        """
+        # --- LÓGICA DELTA-CHECK (Comprobación de cambios) ---
+        # La comparación con el archivo en disco ya la hizo el pool
+        changed = [dataset for dataset in DATASETS if prepared[dataset][0]]
+        data = {dataset: prepared[dataset][2] for dataset in DATASETS}
+
+        # Si NINGUNO de los archivos tiene datos nuevos
+        if not changed:
+            log.write(f"{self._log_prefix}No hay datos nuevos. Sincronización omitida.\n")
+            log.flush() # Asegura que se escriba en el log
+            # Los datos en disco son los mismos: si la caché está fría,
+            # se aprovecha lo descargado para llenarla.
+            if self.is_default and global_state.get_datasets() is None:
+                self._publish_datasets(data["clients"], data["contacts"], data["featured_clients"])
+            # Termina la función aquí para no hacer escrituras innecesarias
+            return "No hay datos nuevos. Sincronización omitida."
+
+        # Si llegamos aquí, al menos un archivo tiene datos nuevos
+        log.write(f"{self._log_prefix}Datos nuevos detectados. Guardando archivos...\n")
+        log.flush()
+        # Genera un timestamp (marca de tiempo) para los archivos de archivo/historial
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+
+        # Añade al registro de cambios los registros añadidos, eliminados y
+        # modificados (ya calculados por el pool), con el mismo timestamp.
+        # Va ANTES de sustituir los archivos: si falla, no se toca nada y la
+        # siguiente sincronización vuelve a comparar con los archivos antiguos.
+        seqs = self.changelog.append(timestamp, ((dataset, op, key, change)
+                                                 for dataset in changed
+                                                 for op, key, change in prepared[dataset][3]))
+
+        # --- Escritura de Archivos ---
+        # Solo los que cambiaron: archivo principal y su snapshot con timestamp.
+        # Cada uno confirma sus cambios en el registro (ver '_commit_file').
+        for dataset in changed:
+            self._commit_file(dataset, prepared[dataset][1], timestamp)
+
+        if seqs:
+            log.write(f"{self._log_prefix}Registro de cambios: {seqs[1] - seqs[0] + 1} cambios "
+                      f"(secuencias {seqs[0]}-{seqs[1]}).\n")
         
-        # Si el archivo principal no existe, cualquier dato se considera "nuevo"
-        if not os.path.exists(filepath):
-            return True
-            
-        try:
-            # Intenta leer el archivo JSON existente
-            with open(filepath, 'r', encoding='utf-8') as f:
-                # Carga y decodifica el JSON del archivo a un objeto Python
-                old_data = json.load(f)
-            # Compara el objeto antiguo con el objeto nuevo.
-            # Devuelve True si son diferentes, False si son iguales.
-            return old_data != new_data
-        except (json.JSONDecodeError, IOError):
-            # Si el archivo viejo está corrupto (mal JSON) o no se puede leer,
-            # tratamos los datos nuevos como si fueran nuevos para forzar una re-escritura.
-            return True
+        log.write(f"{self._log_prefix}Sincronización completada. Archivos guardados con timestamp: {timestamp}\n")
+        log.flush()
 
-    # --- FUNCIÓN MODIFICADA (Orquestador Principal) ---
-    def run_process(self):
-        p1, p2, p3 = None, None, None # Inicializa variables de proceso
-        log = None # Inicializa variable de log
+        # La caché compartida y la retención solo cubren la carpeta 'db'.
+        if not self.is_default:
+            return f"Sincronización completada. Archivos guardados con timestamp: {timestamp}"
+
+        # Publica los datos ya decodificados en la caché compartida.
+        self._publish_datasets(data["clients"], data["contacts"], data["featured_clients"])
+
+        # Aplicar la política de retención (si está activada) para que
+        # los snapshots antiguos no se acumulen en 'db'. Los datos ya están
+        # guardados: un fallo aquí se registra, pero la sincronización no falla.
+        if ConfigManager().get_retention()["enabled"]:
+            try:
+                plan, bundle = SnapshotRetention.run_retention()
+                if bundle:
+                    log.write(f"Retención: {plan.describe()} Paquete: {bundle}\n")
+            except Exception as e:
+                log.write(f"Retención: Error al archivar los snapshots: {e}\n")
+            log.flush()
+
+        return f"Sincronización completada. Archivos guardados con timestamp: {timestamp}"
+
+    def _run_stages(self, fn, jobs):
+        """
+        Ejecuta las etapas de los tres datasets en paralelo en el pool y
+        guarda el resultado. ¡Esta función es BLOQUEANTE!
+        """
+        prepared = {}
         try:
             # Abre el archivo de logs en modo 'append' (añadir al final)
             with open(self.LOGS, "a", encoding="utf-8") as log:
-                        
-                # --- Configuración de Procesos y Tuberías (Pipes) ---
-                # pr1 = extremo padre (recibe), ch1 = extremo hijo (envía)
-                pr1, ch1 = Pipe()
-                # Define el Proceso 1: ejecutará 'self.clients' y usará 'ch1' para enviar datos
-                p1 = Process(target=self.clients, args=(ch1,))
-                
-                pr2, ch2 = Pipe()
-                p2 = Process(target=self.contacts, args=(ch2,))
-                
-                pr3, ch3 = Pipe()
-                p3 = Process(target=self.featured_clients, args=(ch3,))
-                
-                # --- Ejecución ---
-                # Inicia los 3 procesos. Ahora se ejecutan en paralelo.
-                p1.start()
-                p2.start()
-                p3.start()
-                
-                # --- Recolección de Resultados ---
-                # El proceso padre espera (se bloquea) aquí hasta recibir datos de cada hijo
-                clients_result = pr1.recv()
-                contacts_result = pr2.recv()
-                featured_result = pr3.recv()
-                
-                # Espera a que los procesos hijos terminen completamente
-                p1.join()
-                p2.join()
-                p3.join()
-                
+                results = worker_pool.map(fn, jobs, return_exceptions=True)
+                prepared = dict(zip(DATASETS, results))
                 # --- Verificación de Errores ---
-                # Agrupa todos los resultados para una fácil comprobación
-                all_results = {
-                    "clients": clients_result,
-                    "contacts": contacts_result,
-                    "featured_clients": featured_result
-                }
-                # Revisa si alguno de los resultados fue un diccionario de error
-                for name, result in all_results.items():
-                    if isinstance(result, dict) and "Error" in result:
-                        # Si un proceso falló, detiene toda la sincronización
-                        raise RuntimeError(f"Error en '{name}': {result['Error']}")
-                
-                # --- LÓGICA DELTA-CHECK (Comprobación de cambios) ---
-                # Compara el resultado de la API con el archivo en disco
-                is_new_clients = self._is_data_new("clients.json", clients_result)
-                is_new_contacts = self._is_data_new("contacts.json", contacts_result)
-                is_new_featured = self._is_data_new("featured_clients.json", featured_result)
-
-                # Si NINGUNO de los archivos tiene datos nuevos
-                if not (is_new_clients or is_new_contacts or is_new_featured):
-                    log.write("No hay datos nuevos. Sincronización omitida.\n")
-                    log.flush() # Asegura que se escriba en el log
-                    return # Termina la función aquí para no hacer escrituras innecesarias
-
-                # Si llegamos aquí, al menos un archivo tiene datos nuevos
-                log.write("Datos nuevos detectados. Guardando archivos...\n")
-                log.flush()
-                # Genera un timestamp (marca de tiempo) para los archivos de archivo/historial
-                timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-
-                # --- Escritura de Archivos ---
-                
-                # 1. Sobrescribir los archivos principales (solo si cambiaron)
-                if is_new_clients:
-                    self.create_json("clients.json", clients_result)
-                if is_new_contacts:
-                    self.create_json("contacts.json", contacts_result)
-                if is_new_featured:
-                    self.create_json("featured_clients.json", featured_result)
-                
-                # 2. Crear los archivos de archivo/historial con timestamp (solo si cambiaron)
-                if is_new_clients:
-                    self.create_json(f"clients_{timestamp}.json", clients_result)
-                if is_new_contacts:
-                    self.create_json(f"contacts_{timestamp}.json", contacts_result)
-                if is_new_featured:
-                    self.create_json(f"featured_clients_{timestamp}.json", featured_result)
-                
-                log.write(f"Sincronización completada. Archivos guardados con timestamp: {timestamp}\n")
-                log.flush()
+                # Si un dataset falló, se detiene toda la sincronización
+                for name, result in prepared.items():
+                    if isinstance(result, BaseException):
+                        raise RuntimeError(f"Error en '{name}': {type(result).__name__}: {result}")
+                return self._store(log, prepared)
         
         except Exception as e:
-            # --- Manejo de Errores Graves ---
-            # Si algo falla en el orquestador principal (ej. un error de Runtime)
-            with open(self.LOGS, 'a', encoding='utf-8') as log_error:
-                log_error.write(f"Falló la Sincronización: {e}\n")
-            
-            # Limpieza de procesos: intenta terminar cualquier proceso hijo que
-            # pudiera haber quedado colgado (zombie)
-            for p in [p1, p2, p3]:
-                if p and p.is_alive(): # Si el proceso existe y sigue vivo
-                    p.terminate() # Forzar su finalización
-                    p.join() # Limpiar el proceso
\ No newline at end of file
+            # Borra los temporales que el pool llegó a escribir
+            self._discard_temp(prepared)
+            self._fail(e)
+
+    def _fail(self, error):
+        # --- Manejo de Errores Graves ---
+        # Si algo falla (ej. un error de Runtime), se registra en el log
+        with open(self.LOGS, 'a', encoding='utf-8') as log_error:
+            log_error.write(f"{self._log_prefix}Falló la Sincronización: {error}\n")
+        # Propaga el error para que quien llamó (menú, CLI o descargador)
+        # sepa que la sincronización NO se completó.
+        raise RuntimeError(f"Falló la Sincronización: {error}") from error
+
+    def _want_data(self):
+        # Los datos decodificados solo hacen falta de vuelta si se van a
+        # publicar en una caché fría (si está caliente, basta con lo que cambie).
+        return self.is_default and global_state.get_datasets() is None
+
+    # --- FUNCIÓN MODIFICADA (Orquestador Principal) ---
+    @profiler.profiled("sync.run_process")
+    def run_process(self):
+        """
+        Sincroniza el perfil: descarga los tres datasets a la vez (en un
+        bucle propio de este hilo) y el pool los decodifica, compara y
+        codifica en paralelo. ¡Esta función es BLOQUEANTE!
+        """
+        try:
+            bodies = asyncio.run(self.fetch_all())
+        except Exception as e:
+            self._fail(e)
+        return self.store(bodies)
+
+    # --- Descarga (en el bucle) y guardado (en el pool) ---
+
+    async def fetch_all(self):
+        """
+        Descarga los tres endpoints a la vez en el bucle actual con el
+        cliente y el limitador del repositorio. Devuelve los cuerpos sin
+        decodificar ({dataset: bytes}) o lanza RuntimeError.
+        """
+        repository = self.synchronyRepository
+        results = await asyncio.gather(*(repository.get_raw(dataset) for dataset in DATASETS),
+                                       return_exceptions=True)
+        for name, result in zip(DATASETS, results):
+            if isinstance(result, BaseException):
+                raise RuntimeError(f"Error en '{name}': {type(result).__name__}: {result}")
+        return dict(zip(DATASETS, results))
+
+    def store(self, bodies):
+        """
+        Guarda lo descargado con 'fetch_all': el pool decodifica, compara y
+        codifica cada dataset. ¡Esta función es BLOQUEANTE! Usar con 'run_in_executor'.
+        """
+        want_data = self._want_data()
+        return self._run_stages(prepare_dataset,
+                                [(self.DB_PATH, f"{dataset}.json", bodies[dataset], want_data) for dataset in DATASETS])
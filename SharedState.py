@@ -1,39 +1,246 @@
 # SharedState.py
+import threading
+from collections import OrderedDict
 
 # --- Nota sobre Concurrencia ---
-# No se necesitan locks (candados) porque asyncio
-# se ejecuta en un solo hilo.
-# La gestión de concurrencia de asyncio (event loop)
-# evita que 'set_files' y 'get_files' se ejecuten
-# exactamente al mismo tiempo y corrompan los datos.
+# El estado se escribe desde el bucle de asyncio (vigilante de archivos)
+# y se lee también desde hilos del ejecutor ('run_in_executor').
+# Por eso:
+# - Los datos se guardan como TUPLAS inmutables junto a un número de
+#   versión, en un único atributo '(versión, archivos)'. Leerlo es atómico
+#   y no hace falta copiar nada: nadie puede modificar una tupla.
+# - Las escrituras usan un candado y solo incrementan la versión si
+#   algo cambió de verdad.
+# - Los consumidores pueden esperar un cambio ('wait_for_change', para
+#   asyncio) o suscribirse con una función ('subscribe', desde cualquier hilo).
+
+# Datasets históricos ("as of") que se conservan en memoria
+HISTORY_SIZE = 2
+
+# Define una clase con los datasets ya decodificados, cruzados e indexados.
+# Se construye una sola vez (al sincronizar o en el primer arranque) y
+# nunca se modifica: si los datos cambian se publica un objeto nuevo.
+class Datasets:
+    __slots__ = ("contacts", "contacts_by_id", "positions", "client_ids", "featured_ids",
+                 "client_bits", "featured_bits", "raw", "hashes")
+
+    # Constructor de la clase
+    def __init__(self, contacts, positions, client_ids, featured_ids, client_bits, featured_bits, raw, hashes):
+        # Tupla de 'ContactModel' con 'is_client' e 'is_featured' ya calculados
+        self.contacts = tuple(contacts)
+        # Índice {id: ContactModel}
+        self.contacts_by_id = {contact.get_id: contact for contact in self.contacts}
+        # Índice {id: posición en 'contacts'}
+        self.positions = positions
+        # Conjuntos de ids para comprobar pertenencia en O(1)
+        self.client_ids = frozenset(client_ids)
+        self.featured_ids = frozenset(featured_ids)
+        # Marcas por posición de contacto (ver Bitset.py): el bit i indica
+        # si 'contacts[i]' es cliente / cliente destacado.
+        self.client_bits = client_bits
+        self.featured_bits = featured_bits
+        # Datos tal y como llegaron de la API: {"contacts.json": {...}, ...}
+        self.raw = raw
+        # Hash (sha256) de cada archivo en disco cuando se publicaron los datos.
+        # Sirve para detectar si alguien modificó los archivos después.
+        self.hashes = hashes
+
+    def select(self, is_client=None, is_featured=None):
+        """
+        Devuelve los contactos que cumplen las marcas indicadas (None = no
+        filtrar por esa marca). Se combinan las marcas bit a bit y solo se
+        recorren las posiciones resultantes.
+        """
+        if is_client is None and is_featured is None:
+            return list(self.contacts)
+        mask = None
+        for bits, wanted in ((self.client_bits, is_client), (self.featured_bits, is_featured)):
+            if wanted is None:
+                continue
+            bits = bits if wanted else ~bits
+            mask = bits if mask is None else mask & bits
+        return [self.contacts[position] for position in mask.positions()]
 
 # Define una clase para almacenar el estado compartido de la aplicación.
 class AppState:
-    
+
     # Constructor de la clase
     def __init__(self):
-        # Inicializa una variable interna (privada)
-        # para guardar la lista de archivos de la base de datos ('db').
-        self._db_files = []
+        # Instantánea actual: (versión, tupla de archivos de 'db').
+        # Se reemplaza entera en cada cambio (copy-on-write).
+        self._snapshot = (0, ())
+        # Candado para las escrituras y las listas de espera/suscriptores
+        self._lock = threading.Lock()
+        # Corutinas esperando un cambio: lista de (bucle, futuro)
+        self._waiters = []
+        # Funciones suscritas: callback(versión)
+        self._subscribers = []
+        # Caché de datasets (objeto 'Datasets') o None si está fría
+        self._datasets = None
+        # Últimos datasets invalidados por 'validate_datasets': se usan para
+        # reconstruir solo la parte cuyos archivos cambiaron.
+        self._previous_datasets = None
+        # Datasets de fechas pasadas ('ContactsService.get_datasets(as_of)'):
+        # {hashes de los snapshots: Datasets}, el más usado al final. Los
+        # snapshots no cambian, así que nunca hace falta invalidarlos.
+        self._history = OrderedDict()
 
-    def set_files(self, new_files):
-        """Actualiza la lista de archivos."""
-        # Este método es un 'setter'.
-        # Reemplaza la lista antigua de archivos por la 'new_files' proporcionada.
-        self._db_files = new_files
+    @property
+    def version(self):
+        """Número de versión actual (crece con cada cambio)."""
+        return self._snapshot[0]
+
+    def snapshot(self):
+        """Devuelve (versión, archivos) de forma atómica y sin copias."""
+        return self._snapshot
+
+    def set_files(self, new_files, force=False):
+        """
+        Actualiza la lista de archivos. Solo incrementa la versión si la
+        lista cambió (o si 'force' es True, ej. cuando cambiaron los
+        metadatos de algún archivo aunque los nombres sean los mismos).
+        Devuelve True si hubo una nueva versión.
+        """
+        new_files = tuple(new_files)
+        with self._lock:
+            version, files = self._snapshot
+            if new_files == files and not force:
+                return False
+            version += 1
+            self._snapshot = (version, new_files)
+            waiters, self._waiters = self._waiters, []
+            subscribers = list(self._subscribers)
+        self._notify(version, waiters, subscribers)
+        return True
 
     def get_files(self):
-        """Obtiene la lista de archivos."""
-        # Este método es un 'getter'.
-        # Devuelve una COPIA de la lista de archivos.
-        # '.copy()' es importante para evitar que el código
-        # que llama a esta función modifique accidentalmente la
-        # lista original en 'self._db_files'.
-        return self._db_files.copy()
+        """Obtiene la lista de archivos (tupla inmutable, sin copia)."""
+        return self._snapshot[1]
+
+    # --- Caché de datasets ---
+
+    def set_datasets(self, datasets):
+        """Publica los datasets recién decodificados (reemplaza los anteriores)."""
+        with self._lock:
+            self._datasets = datasets
+            self._previous_datasets = None
+
+    def get_datasets(self):
+        """Devuelve el objeto 'Datasets' actual o None (caché fría)."""
+        return self._datasets
+
+    def get_previous_datasets(self):
+        """
+        Devuelve los datasets actuales o, si la caché se invalidó porque
+        cambió algún archivo, los últimos publicados (o None).
+        """
+        return self._datasets or self._previous_datasets
+
+    def clear_datasets(self):
+        """Vacía la caché: la próxima lectura volverá a cargar desde disco."""
+        with self._lock:
+            self._datasets = None
+            self._previous_datasets = None
+
+    def validate_datasets(self, lookup):
+        """
+        Comprueba la caché contra el catálogo de archivos. 'lookup(nombre)'
+        devuelve la entrada del catálogo (o None). Si algún archivo ya no
+        tiene el hash con el que se publicaron los datos (ej. se editó a
+        mano), la caché se vacía. Devuelve True si la caché sigue siendo válida.
+        """
+        with self._lock:
+            datasets = self._datasets
+            if datasets is None:
+                return False
+            for name, sha256 in datasets.hashes.items():
+                entry = lookup(name)
+                if (entry.sha256 if entry else None) != sha256:
+                    self._previous_datasets = datasets
+                    self._datasets = None
+                    return False
+            return True
+
+    def get_history_datasets(self, key):
+        """Devuelve los datasets históricos de 'key' (hashes) o None."""
+        with self._lock:
+            datasets = self._history.get(key)
+            if datasets is not None:
+                self._history.move_to_end(key)
+            return datasets
+
+    def set_history_datasets(self, key, datasets):
+        """Guarda unos datasets históricos (se descartan los menos usados)."""
+        with self._lock:
+            self._history[key] = datasets
+            self._history.move_to_end(key)
+            while len(self._history) > HISTORY_SIZE:
+                self._history.popitem(last=False)
+
+    def get_latest_history_datasets(self):
+        """Los últimos datasets históricos usados (o None)."""
+        with self._lock:
+            return next(reversed(self._history.values()), None)
+
+    # --- Notificación de cambios ---
+
+    @staticmethod
+    def _notify(version, waiters, subscribers):
+        # Despierta a las corutinas en espera, cada una en SU bucle de
+        # eventos ('call_soon_threadsafe' funciona desde cualquier hilo).
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future, version)
+        # Llama a los suscriptores fuera del candado.
+        for callback in subscribers:
+            try:
+                callback(version)
+            except Exception:
+                # Un suscriptor defectuoso no debe romper al resto.
+                pass
+
+    async def wait_for_change(self, since_version):
+        """
+        Espera (sin bloquear el bucle) hasta que la versión sea distinta
+        de 'since_version' y devuelve la nueva versión.
+        """
+        # Import diferido: los comandos de solo lectura de Cli.py usan este
+        # módulo (caché de datasets) y no necesitan cargar asyncio.
+        import asyncio
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._snapshot[0] != since_version:
+                return self._snapshot[0]
+            future = loop.create_future()
+            entry = (loop, future)
+            self._waiters.append(entry)
+        try:
+            return await future
+        finally:
+            # Si la espera se canceló, se retira de la lista.
+            with self._lock:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+
+    def subscribe(self, callback):
+        """Registra 'callback(versión)', llamado en cada cambio (desde el hilo que escribe)."""
+        with self._lock:
+            self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        """Elimina un suscriptor."""
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+def _resolve(future, version):
+    # Completa el futuro si nadie lo canceló mientras tanto.
+    if not future.done():
+        future.set_result(version)
 
 # --- Instancia Global ---
 # Se crea una instancia única (Singleton) de la clase AppState.
 # Otros módulos de la aplicación (como las Vistas o las Tareas)
 # importarán 'global_state' para acceder y modificar
 # la lista de archivos de forma centralizada.
-global_state = AppState()
\ No newline at end of file
+global_state = AppState()
@@ -0,0 +1,153 @@
+# SnapshotDiff.py
+import argparse
+import hashlib
+import json
+import os
+import sys
+# Lector JSON incremental: los archivos se recorren registro a registro
+import JsonStream
+
+# Define la ruta del directorio base para todos los archivos
+DB_PATH = "db"
+
+def _digest(record):
+    """Huella corta (16 bytes) del contenido canónico de un registro."""
+    canonical = json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+def _key(record, digest=None):
+    """
+    Clave de alineación: el campo 'id'. Los registros sin 'id' se
+    identifican por su contenido (solo pueden aparecer como añadidos
+    o eliminados).
+    """
+    if isinstance(record, dict) and "id" in record:
+        return record["id"]
+    return ("sin-id", digest or _digest(record))
+
+def field_changes(old, new):
+    """Devuelve {campo: (antes, después)} para los campos que cambiaron."""
+    if not (isinstance(old, dict) and isinstance(new, dict)):
+        return {"*": (old, new)}
+    return {k: (old.get(k), new.get(k)) for k in old.keys() | new.keys() if old.get(k) != new.get(k)}
+
+def iter_diff_records(old_records, new_records):
+    """
+    Compara dos secuencias de registros alineándolas por 'id' (hash join, O(n)).
+    'old_records' es una FUNCIÓN que devuelve un iterable nuevo cada vez,
+    porque la secuencia antigua se recorre dos veces.
+    Genera tuplas (operación, id, datos):
+    - ("added", id, registro)
+    - ("removed", id, registro)
+    - ("modified", id, {campo: (antes, después)})
+    En memoria solo se guarda {id: huella} de la versión antigua y los
+    registros nuevos que cambiaron, nunca los dos árboles completos.
+    """
+    # 1. Primera pasada por la versión antigua: índice {id: huella}.
+    index = {}
+    for record in old_records():
+        digest = _digest(record)
+        index[_key(record, digest)] = digest
+
+    # 2. Pasada por la versión nueva: añadidos y candidatos a modificados.
+    modified = {}
+    for record in new_records:
+        digest = _digest(record)
+        key = _key(record, digest)
+        old_digest = index.pop(key, None)
+        if old_digest is None:
+            yield "added", key, record
+        elif old_digest != digest:
+            modified[key] = record
+
+    # 3. Segunda pasada por la versión antigua: eliminados (los que quedan
+    #    en el índice) y detalle campo a campo de los modificados.
+    for record in old_records():
+        key = _key(record)
+        if key in index:
+            del index[key]
+            yield "removed", key, record
+        elif key in modified:
+            yield "modified", key, field_changes(record, modified.pop(key))
+
+def iter_diff(old_path, new_path):
+    """Compara dos archivos JSON de 'db' en streaming (ver 'iter_diff_records')."""
+    return iter_diff_records(lambda: JsonStream.iter_records(old_path), JsonStream.iter_records(new_path))
+
+def iter_data_records(data):
+    """
+    Registros de un JSON ya decodificado: los elementos de sus arrays de
+    primer nivel (lo mismo que 'JsonStream.iter_records' en un archivo).
+    """
+    if isinstance(data, list):
+        yield from data
+    elif isinstance(data, dict):
+        for value in data.values():
+            if isinstance(value, list):
+                yield from value
+
+def iter_diff_data(old_data, new_data):
+    """Compara dos JSON ya decodificados ('old_data' puede ser None: todo es nuevo)."""
+    return iter_diff_records(lambda: iter_data_records(old_data), iter_data_records(new_data))
+
+def resolve_path(name):
+    """Acepta una ruta o un nombre de archivo de 'db'."""
+    if os.path.exists(name):
+        return name
+    return os.path.join(DB_PATH, name)
+
+def change_to_dict(op, key, data):
+    """Un cambio como diccionario JSON: {"op", "id", "data"}."""
+    if op == "modified":
+        data = {field: {"old": old, "new": new} for field, (old, new) in data.items()}
+    return {"op": op, "id": key, "data": data}
+
+def format_change(op, key, data):
+    """Formatea un cambio en una o varias líneas de texto."""
+    if op == "modified":
+        fields = ", ".join(f"{field}: {old!r} -> {new!r}" for field, (old, new) in sorted(data.items(), key=lambda i: str(i[0])))
+        return f"~ id={key}: {fields}"
+    symbol = "+" if op == "added" else "-"
+    return f"{symbol} id={key}: {json.dumps(data, ensure_ascii=False)}"
+
+def print_diff(old_path, new_path, limit=None, as_json=False, out=None):
+    """
+    Imprime las diferencias entre dos archivos y un resumen final.
+    Con 'as_json' cada cambio se escribe como una línea JSON (NDJSON).
+    'limit' limita el número de cambios mostrados (el resumen cuenta todos).
+    Devuelve el diccionario de totales.
+    """
+    out = out or sys.stdout
+    totals = {"added": 0, "removed": 0, "modified": 0}
+    for op, key, data in iter_diff(old_path, new_path):
+        totals[op] += 1
+        if limit is not None and sum(totals.values()) > limit:
+            continue
+        if as_json:
+            out.write(json.dumps(change_to_dict(op, key, data), ensure_ascii=False, default=str) + "\n")
+        else:
+            out.write(format_change(op, key, data) + "\n")
+    if not as_json:
+        shown = "" if limit is None or sum(totals.values()) <= limit else f" (se muestran {limit})"
+        out.write(f"Resumen: {totals['added']} añadidos, {totals['removed']} eliminados, "
+                  f"{totals['modified']} modificados{shown}.\n")
+    return totals
+
+def main(argv=None):
+    """Punto de entrada de línea de comandos: python SnapshotDiff.py VIEJO NUEVO"""
+    parser = argparse.ArgumentParser(description="Compara dos archivos de 'db' registro a registro (por 'id').")
+    parser.add_argument("old", help="Archivo antiguo (ruta o nombre dentro de 'db')")
+    parser.add_argument("new", help="Archivo nuevo (ruta o nombre dentro de 'db')")
+    parser.add_argument("--json", action="store_true", help="Salida NDJSON (un cambio por línea)")
+    parser.add_argument("--limit", type=int, default=None, help="Número máximo de cambios a mostrar")
+    args = parser.parse_args(argv)
+    try:
+        print_diff(resolve_path(args.old), resolve_path(args.new), args.limit, args.json)
+    except (OSError, ValueError) as e:
+        print(f"Error al comparar los archivos: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+# --- Bloque de Ejecución ---
+if __name__ == "__main__":
+    sys.exit(main())
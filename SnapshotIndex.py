@@ -0,0 +1,184 @@
+# SnapshotIndex.py
+# Índice ordenado de los snapshots de 'db' (<dataset>_<YYYYmmddHHMMSS>.json)
+# para consultar los datos "tal y como estaban" en un momento dado.
+# Cada sincronización solo guarda snapshot de los datasets que cambiaron,
+# así que el vigente en un instante es, para cada dataset, el ÚLTIMO con
+# timestamp igual o anterior: se busca por bisección en la lista ordenada.
+# El índice se rehace solo cuando cambia la carpeta (su 'mtime' cambia al
+# crear o borrar archivos), sin volver a listar 'db' en cada consulta.
+#
+# La retención (SnapshotRetention.py) mueve snapshots a 'db/archive': si el
+# vigente en un instante está archivado, NO se usa en silencio uno anterior
+# que siga en 'db', sino que se avisa de en qué paquete está.
+import bisect
+import os
+import tarfile
+import threading
+from datetime import datetime
+from FileCatalog import classify, DATASET_TYPES
+
+# Define la ruta del directorio base para todos los archivos
+DB_PATH = "db"
+# Carpeta de los paquetes de la retención (dentro de la de datos)
+ARCHIVE_DIR = "archive"
+
+# Formatos aceptados para el "as of" (de más a menos preciso), cada uno con
+# los campos que faltan para llegar al FINAL del periodo que indica.
+_FORMATS = (("%Y-%m-%dT%H:%M:%S", {}), ("%Y-%m-%d %H:%M:%S", {}), ("%Y%m%d%H%M%S", {}),
+            ("%Y-%m-%dT%H:%M", {"second": 59}), ("%Y-%m-%d %H:%M", {"second": 59}),
+            ("%Y-%m-%d", {"hour": 23, "minute": 59, "second": 59}),
+            ("%Y%m%d", {"hour": 23, "minute": 59, "second": 59}))
+
+def parse_as_of(text):
+    """
+    Convierte un instante en el timestamp de los snapshots (YYYYmmddHHMMSS).
+    Acepta "2025-11-05", "2025-11-05 12:38", "2025-11-05T12:38:19",
+    "20251105" o "20251105123819" (también sin ceros, ej. "2025-1-5").
+    Sin hora se toma el FINAL de ese día (o minuto): "as of 2025-11-05"
+    incluye la última sincronización del día.
+    Lanza ValueError si el formato no es válido.
+    """
+    text = str(text).strip()
+    for fmt, fill in _FORMATS:
+        try:
+            moment = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        return moment.replace(**fill).strftime("%Y%m%d%H%M%S")
+    raise ValueError(f"Fecha no válida: '{text}' (ej. 2025-11-05 o 2025-11-05T12:38:19)")
+
+def format_timestamp(timestamp):
+    """'20251105123819' -> '2025-11-05 12:38:19'."""
+    return datetime.strptime(timestamp, "%Y%m%d%H%M%S").strftime("%Y-%m-%d %H:%M:%S")
+
+# Define la clase SnapshotIndex.
+class SnapshotIndex:
+
+    # Constructor de la clase
+    def __init__(self, db_path=DB_PATH):
+        self._db_path = db_path
+        self._lock = threading.Lock()
+        # 'mtime' de la carpeta con el que se construyó el índice
+        self._mtime_ns = None
+        # {dataset: ([timestamps ordenados], [archivos en el mismo orden])}
+        self._index = {}
+        # Lo mismo para los snapshots archivados: ('mtime' de la carpeta y
+        # del índice de lo archivado, {dataset: ([timestamps], [paquetes])})
+        self._archive_key = None
+        self._archived = {}
+        # Nombres de cada paquete leído directamente (no cambian nunca)
+        self._bundle_names = {}
+
+    def _current(self):
+        # Devuelve el índice, reconstruyéndolo si la carpeta cambió.
+        try:
+            mtime_ns = os.stat(self._db_path).st_mtime_ns
+        except OSError:
+            return {}
+        with self._lock:
+            if mtime_ns != self._mtime_ns:
+                found = {dataset: [] for dataset in DATASET_TYPES}
+                for name in os.listdir(self._db_path):
+                    dataset, timestamp = classify(name)
+                    if timestamp and dataset in found:
+                        found[dataset].append((timestamp, name))
+                self._index = {}
+                for dataset, items in found.items():
+                    items.sort()
+                    self._index[dataset] = ([ts for ts, _ in items], [name for _, name in items])
+                self._mtime_ns = mtime_ns
+            return self._index
+
+    def _bundle_members(self, path):
+        # Snapshots de un paquete que no está en el índice de lo archivado
+        # (ej. de antes de existir): hay que descomprimirlo, una sola vez.
+        name = os.path.basename(path)
+        if name not in self._bundle_names:
+            try:
+                with tarfile.open(path) as tar:
+                    self._bundle_names[name] = tar.getnames()
+            except (OSError, tarfile.TarError):
+                self._bundle_names[name] = []
+        return self._bundle_names[name]
+
+    def _current_archived(self):
+        # Devuelve el índice de los snapshots archivados, rehecho si cambió
+        # la carpeta de paquetes o su índice.
+        from SnapshotRetention import MANIFEST_FILE
+        archive_path = os.path.join(self._db_path, ARCHIVE_DIR)
+        manifest = os.path.join(archive_path, MANIFEST_FILE)
+        try:
+            key = (os.stat(archive_path).st_mtime_ns,
+                   os.stat(manifest).st_mtime_ns if os.path.exists(manifest) else None)
+        except OSError:
+            return {}
+        with self._lock:
+            if key != self._archive_key:
+                found, listed = {dataset: [] for dataset in DATASET_TYPES}, set()
+
+                def add(bundle, name):
+                    dataset, timestamp = classify(name)
+                    if timestamp and dataset in found:
+                        found[dataset].append((timestamp, bundle))
+
+                if key[1] is not None:
+                    with open(manifest, "r", encoding="utf-8") as f:
+                        for line in f:
+                            bundle, _, name = line.rstrip("\n").partition("\t")
+                            listed.add(bundle)
+                            add(bundle, name)
+                for bundle in os.listdir(archive_path):
+                    if ".tar." in bundle and not bundle.endswith(".tmp") and bundle not in listed:
+                        for name in self._bundle_members(os.path.join(archive_path, bundle)):
+                            add(bundle, name)
+                self._archived = {}
+                for dataset, items in found.items():
+                    items.sort()
+                    self._archived[dataset] = ([ts for ts, _ in items], [b for _, b in items])
+                self._archive_key = key
+            return self._archived
+
+    def timestamps(self, dataset="contacts"):
+        """Timestamps disponibles de un dataset, ordenados."""
+        return list(self._current().get(dataset, ((), ()))[0])
+
+    def resolve(self, dataset, as_of):
+        """
+        Devuelve (archivo, timestamp) del snapshot de 'dataset' vigente en
+        'as_of' (YYYYmmddHHMMSS, ver 'parse_as_of'), o None si no hay
+        ninguno igual o anterior.
+        """
+        timestamps, names = self._current().get(dataset, ((), ()))
+        i = bisect.bisect_right(timestamps, as_of) - 1
+        if i < 0:
+            return None
+        return names[i], timestamps[i]
+
+    def resolve_files(self, as_of):
+        """
+        Archivos de los tres datasets vigentes en 'as_of':
+        {"contacts.json": "contacts_<ts>.json", ...}. Los clientes
+        destacados son opcionales (None si no hay snapshot).
+        Lanza RuntimeError si no hay contactos o clientes de esa fecha, o
+        si el snapshot vigente de algún dataset está archivado.
+        """
+        files = {}
+        for dataset in DATASET_TYPES:
+            found = self.resolve(dataset, as_of)
+            # ¿Hay uno archivado más reciente que el encontrado (y no posterior a 'as_of')?
+            timestamps, bundles = self._current_archived().get(dataset, ((), ()))
+            i = bisect.bisect_right(timestamps, as_of) - 1
+            if i >= 0 and (found is None or timestamps[i] > found[1]):
+                raise RuntimeError(
+                    f"El snapshot de '{dataset}' vigente en {format_timestamp(as_of)} "
+                    f"({dataset}_{timestamps[i]}.json) está archivado en "
+                    f"'{os.path.join(self._db_path, ARCHIVE_DIR, bundles[i])}'. "
+                    f"Extráigalo a '{self._db_path}' para consultar esa fecha.")
+            if found is None and dataset != "featured_clients":
+                raise RuntimeError(f"No hay ningún snapshot de '{dataset}' anterior a "
+                                   f"{format_timestamp(as_of)}.")
+            files[f"{dataset}.json"] = found[0] if found else None
+        return files
+
+# --- Instancia Global ---
+snapshot_index = SnapshotIndex()
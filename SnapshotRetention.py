@@ -0,0 +1,157 @@
+# SnapshotRetention.py
+import os
+import tarfile
+import threading
+from datetime import datetime
+# Importa el catálogo (tamaño, tipo de dataset y timestamp de cada archivo)
+from FileCatalog import file_catalog
+from ConfigManager import ConfigManager
+
+# Define la ruta del directorio base y del directorio de archivado
+DB_PATH = "db"
+ARCHIVE_PATH = os.path.join(DB_PATH, "archive")
+# Índice de lo archivado: una línea "<paquete>\t<snapshot>" por archivo, para
+# saber qué snapshots hay en los paquetes sin descomprimirlos (SnapshotIndex.py)
+MANIFEST_FILE = "manifest.txt"
+# Una sola retención a la vez (ej. la de tras sincronizar y la del menú de
+# archivos): dos a la vez archivarían los mismos snapshots. Reentrante porque
+# 'run_retention' lo toma y llama a 'apply_retention', que también lo toma.
+_retention_lock = threading.RLock()
+# Formato del timestamp de los archivos históricos
+TIMESTAMP_FORMAT = "%Y%m%d%H%M%S"
+
+# Define una clase con el resultado de evaluar la política de retención.
+class RetentionPlan:
+
+    # Constructor de la clase
+    def __init__(self, keep, expire):
+        # Listas de entradas del catálogo (CatalogEntry)
+        self.keep = keep
+        self.expire = expire
+
+    @property
+    def freed_bytes(self):
+        return sum(entry.size for entry in self.expire)
+
+    def describe(self):
+        """Resumen en texto del plan."""
+        return (f"Se conservan {len(self.keep)} snapshots y se archivan {len(self.expire)} "
+                f"({self.freed_bytes / (1024 * 1024):.1f} MB).")
+
+def plan_retention(entries, policy):
+    """
+    Decide qué snapshots (archivos '<dataset>_<timestamp>.json') se conservan.
+    Para cada tipo de dataset se conserva la unión de:
+    - los 'keep_last' más recientes,
+    - el más reciente de cada uno de los últimos 'keep_daily' días,
+    - el más reciente de cada una de las últimas 'keep_weekly' semanas.
+    Después, si el total supera 'max_total_mb', se archivan los más antiguos
+    (nunca el snapshot más reciente de cada dataset).
+    Los archivos principales (ej. 'contacts.json') nunca se tocan.
+    """
+    # Agrupa los snapshots por dataset, del más reciente al más antiguo.
+    by_dataset = {}
+    for entry in entries:
+        if entry.timestamp:
+            by_dataset.setdefault(entry.dataset, []).append(entry)
+
+    keep, expire, newest = [], [], set()
+    for snapshots in by_dataset.values():
+        snapshots.sort(key=lambda e: e.timestamp, reverse=True)
+        newest.add(snapshots[0].name)
+        kept = set(e.name for e in snapshots[:policy["keep_last"]])
+        days, weeks = set(), set()
+        for entry in snapshots:
+            moment = datetime.strptime(entry.timestamp, TIMESTAMP_FORMAT)
+            day = moment.date()
+            week = moment.isocalendar()[:2]
+            if day not in days and len(days) < policy["keep_daily"]:
+                days.add(day)
+                kept.add(entry.name)
+            if week not in weeks and len(weeks) < policy["keep_weekly"]:
+                weeks.add(week)
+                kept.add(entry.name)
+        for entry in snapshots:
+            (keep if entry.name in kept else expire).append(entry)
+
+    # Límite de tamaño total: se archivan primero los más antiguos.
+    max_bytes = policy["max_total_mb"] * 1024 * 1024
+    total = sum(entry.size for entry in keep)
+    if max_bytes > 0 and total > max_bytes:
+        for entry in sorted(keep, key=lambda e: e.timestamp):
+            if total <= max_bytes:
+                break
+            if entry.name in newest:
+                continue
+            keep.remove(entry)
+            expire.append(entry)
+            total -= entry.size
+
+    return RetentionPlan(keep, expire)
+
+def apply_retention(plan, compression="gz"):
+    """
+    Archiva en UN solo paquete comprimido todos los snapshots caducados y
+    después los elimina de 'db'. Devuelve la ruta del paquete (o None).
+    ¡Esta función es BLOQUEANTE (E/S)! Usar con 'run_in_executor'.
+    """
+    with _retention_lock:
+        # Un snapshot pudo borrarse después de calcular el plan (ej. a mano,
+        # o archivado ya por otra retención)
+        expire = [entry for entry in plan.expire if os.path.exists(os.path.join(DB_PATH, entry.name))]
+        if not expire:
+            return None
+        os.makedirs(ARCHIVE_PATH, exist_ok=True)
+        stamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        # Temporal propio de este proceso (otro programa podría archivar a la vez)
+        tmp_path = os.path.join(ARCHIVE_PATH, f"snapshots_{stamp}.{os.getpid()}.tmp")
+
+        # 1. Escribe el paquete en un archivo temporal (una sola pasada).
+        with tarfile.open(tmp_path, f"w:{compression}") as tar:
+            for entry in expire:
+                tar.add(os.path.join(DB_PATH, entry.name), arcname=entry.name)
+        # 2. Solo cuando el paquete está completo se hace visible, con un
+        #    nombre libre: NUNCA se sobrescribe un paquete (dos retenciones
+        #    en el mismo segundo llevan un contador: "_1", "_2"...)
+        bundle = os.path.join(ARCHIVE_PATH, f"snapshots_{stamp}.tar.{compression}")
+        counter = 0
+        while os.path.exists(bundle):
+            counter += 1
+            bundle = os.path.join(ARCHIVE_PATH, f"snapshots_{stamp}_{counter}.tar.{compression}")
+        os.replace(tmp_path, bundle)
+        # 3. Se anota en el índice de lo archivado (si esto falla, el paquete
+        #    se lee directamente al consultarlo)...
+        with open(os.path.join(ARCHIVE_PATH, MANIFEST_FILE), "a", encoding="utf-8") as f:
+            f.writelines(f"{os.path.basename(bundle)}\t{entry.name}\n" for entry in expire)
+        # 4. ...y se eliminan los originales.
+        for entry in expire:
+            try:
+                os.remove(os.path.join(DB_PATH, entry.name))
+            except FileNotFoundError:
+                pass
+        return bundle
+
+def _db_files():
+    # Archivos '.json' de 'db' (sin carpetas, ej. las de los perfiles)
+    return [f for f in os.listdir(DB_PATH) if f.endswith(".json") and os.path.isfile(os.path.join(DB_PATH, f))]
+
+def run_retention(dry_run=False, plan=None):
+    """
+    Evalúa (y, si 'dry_run' es False, aplica) la política de retención
+    configurada en 'config.json'. Devuelve (plan, ruta del paquete o None).
+    Con 'plan' (ej. el que el usuario ya confirmó en un 'dry_run') se
+    aplica ese mismo plan en lugar de calcular otro.
+    """
+    policy = ConfigManager().get_retention()
+    with _retention_lock:
+        if plan is None:
+            # Asegura que el catálogo refleja el estado actual del directorio.
+            file_catalog.refresh(_db_files())
+            plan = plan_retention(file_catalog.entries(), policy)
+        if dry_run:
+            return plan, None
+        bundle = apply_retention(plan, policy["compression"])
+        # Quita del catálogo los archivos archivados.
+        if bundle:
+            file_catalog.refresh(_db_files())
+        return plan, bundle
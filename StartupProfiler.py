@@ -0,0 +1,149 @@
+# StartupProfiler.py
+# Mide el arranque de la aplicación ('python App.py --startup-report'):
+# - El tiempo de importación de cada módulo (propio y acumulado).
+# - Hitos del arranque (ej. "configuración cargada", "menú visible").
+# Al terminar escribe un informe ordenado en 'logs/startup_report.txt'.
+#
+# Funciona con un 'finder' en 'sys.meta_path': para cada módulo que se
+# importa, envuelve su 'loader' y cronometra 'exec_module'. Solo se
+# instala si se pide el informe; en un arranque normal no cuesta nada.
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Ruta del informe
+REPORT_PATH = os.path.join("logs", "startup_report.txt")
+# Número de módulos que se muestran en el informe
+TOP_MODULES = 40
+
+# Define un 'loader' que envuelve al original y cronometra la ejecución del módulo.
+class _TimedLoader:
+
+    # Constructor de la clase
+    def __init__(self, loader, profiler):
+        self._loader = loader
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._enter(module.__name__)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit()
+
+    def __getattr__(self, name):
+        # Cualquier otro atributo (ej. 'get_resource_reader') se delega.
+        return getattr(self._loader, name)
+
+# Define el 'finder' que se coloca el primero en 'sys.meta_path'.
+class _TimingFinder:
+
+    # Constructor de la clase
+    def __init__(self, profiler):
+        self._profiler = profiler
+
+    def find_spec(self, name, path, target=None):
+        # Busca el módulo con el resto de 'finders' y envuelve su 'loader'.
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, self._profiler)
+                return spec
+        return None
+
+# Define la clase StartupProfiler: acumula los tiempos y genera el informe.
+class StartupProfiler:
+
+    # Constructor de la clase
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._finder = None
+        # {módulo: [tiempo propio, tiempo acumulado]} en segundos
+        self.modules = {}
+        # Lista de (etiqueta, segundos desde el inicio)
+        self.marks = []
+        # Pila de importaciones en curso (una por hilo):
+        # [módulo, inicio, tiempo de los hijos]
+        self._local = threading.local()
+
+    # --- Cronómetro de importaciones ---
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, name):
+        self._stack().append([name, time.perf_counter(), 0.0])
+
+    def _exit(self):
+        stack = self._stack()
+        name, started, children = stack.pop()
+        elapsed = time.perf_counter() - started
+        # El tiempo de este módulo se descuenta del "propio" de quien lo importó.
+        if stack:
+            stack[-1][2] += elapsed
+        self.modules[name] = [elapsed - children, elapsed]
+
+    def install(self):
+        """Empieza a cronometrar las importaciones."""
+        if self._finder is None:
+            self._finder = _TimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def uninstall(self):
+        """Deja de cronometrar (los módulos ya importados no se ven afectados)."""
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        self._finder = None
+
+    # --- Hitos ---
+
+    def mark(self, label):
+        """Registra un hito del arranque."""
+        self.marks.append((label, time.perf_counter() - self._start))
+
+    # --- Informe ---
+
+    def report(self):
+        """Devuelve el informe como texto."""
+        lines = [f"Informe de arranque ({datetime.now():%Y-%m-%d %H:%M:%S})", ""]
+        lines.append("Hitos (ms desde el inicio de App.py):")
+        for label, seconds in self.marks:
+            lines.append(f"  {seconds * 1000:9.1f}  {label}")
+        total_imports = sum(own for own, _ in self.modules.values())
+        lines.append("")
+        lines.append(f"Módulos importados: {len(self.modules)} ({total_imports * 1000:.1f} ms en total)")
+        lines.append(f"  {'propio ms':>9}  {'acum. ms':>9}  módulo")
+        ranked = sorted(self.modules.items(), key=lambda item: item[1][0], reverse=True)
+        for name, (own, cumulative) in ranked[:TOP_MODULES]:
+            lines.append(f"  {own * 1000:9.1f}  {cumulative * 1000:9.1f}  {name}")
+        return "\n".join(lines) + "\n"
+
+    def finish(self, label="menú visible", path=REPORT_PATH):
+        """Registra el último hito, deja de cronometrar y escribe el informe."""
+        self.mark(label)
+        self.uninstall()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.report())
+        except OSError as e:
+            print(f"Error al guardar el informe de arranque: {e}")
+            return None
+        return path
+
+def start():
+    """Crea un perfilador, lo instala y lo devuelve."""
+    profiler = StartupProfiler()
+    profiler.install()
+    return profiler
@@ -0,0 +1,43 @@
+# Views/AnalyticsView.py
+
+def _percent(part, total):
+    # Porcentaje con un decimal ("-" si no hay contactos).
+    return f"{part / total * 100:.1f}%" if total else "-"
+
+# Define la función 'analytics_view'.
+# Muestra las estadísticas calculadas por 'AnalyticsService.summary'.
+def analytics_view(summary):
+
+    # Sin datos (ej. error al calcular): no hay nada que mostrar.
+    if not summary:
+        return
+
+    current = summary["current"]
+    print("--- Estadísticas de Contactos ---")
+    if current is None:
+        print("No hay contactos para analizar.")
+        print("Asegúrate de 'Sincronizar Datos' (Opción 2) primero.")
+    else:
+        total = current["total"]
+        print(f"Contactos:            {total}")
+        print(f"Clientes:             {current['clients']} ({_percent(current['clients'], total)})")
+        print(f"Clientes destacados:  {current['featured']} ({_percent(current['featured'], total)})")
+        print(f"Sin email:            {current['missing_email']} ({_percent(current['missing_email'], total)})")
+        print(f"Sin nombre:           {current['missing_name']} ({_percent(current['missing_name'], total)})")
+        print(f"Dominios distintos:   {current['unique_domains']}")
+        print("\nDominios de email más frecuentes:")
+        for domain, count in current["top_domains"]:
+            print(f"  {domain:<30} {count:>8} ({_percent(count, total)})")
+
+    # Evolución entre snapshots (uno por sincronización con cambios)
+    history = summary["history"]
+    if history:
+        print("\n--- Evolución por Snapshot ---")
+        print(f"{'Fecha':<20}{'Contactos':>10}{'Cambio':>9}{'Clientes':>10}{'Destac.':>9}{'Sin email':>11}")
+        for row in history:
+            ts = row["timestamp"]
+            date = f"{ts[0:4]}-{ts[4:6]}-{ts[6:8]} {ts[8:10]}:{ts[10:12]}:{ts[12:14]}"
+            delta = f"{row['delta_total']:+d}" if row["delta_total"] is not None else "-"
+            print(f"{date:<20}{row['total']:>10}{delta:>9}{row['clients']:>10}{row['featured']:>9}"
+                  f"{row['missing_email']:>11}")
+    print(f"\n(Motor de cálculo: {summary['backend']})")
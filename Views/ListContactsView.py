@@ -23,6 +23,7 @@ def list_contacts_view(contacts):
         # en una cadena de texto legible para el usuario ("Sí" o "No").
         # (Esto se llama operador ternario).
         client_status = "Sí" if contact.get_is_client else "No"
+        featured_status = "Sí" if contact.get_is_featured else "No"
         
         # Imprime los detalles formateados de este contacto específico.
         # (Nota: Asume que .get_id, .get_name, etc., son propiedades
@@ -31,6 +32,7 @@ def list_contacts_view(contacts):
         print(f" 	Nombre: {contact.get_name}")
         print(f" 	Email: {contact.get_email}")
         print(f" 	Es Cliente: {client_status}")
+        print(f" 	Cliente Destacado: {featured_status}")
         
         # Imprime una línea separadora para distinguir este contacto del siguiente.
         print("-" * 20)
\ No newline at end of file
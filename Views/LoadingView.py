@@ -1,15 +1,6 @@
-import os
 import asyncio
-
-# --- Función de Utilidad ---
-
-# Método para limpiar la pantalla de la consola
-def clear():
-    # 'os.system' ejecuta un comando en la terminal.
-    # 'os.name == "nt"' comprueba si el sistema operativo es Windows (NT).
-    # Si es Windows, usa el comando "cls".
-    # Si es otro (como Linux o macOS), usa el comando "clear".
-    os.system("cls" if os.name == "nt" else "clear")
+# Capa de dibujo en la terminal (secuencias ANSI, sin crear procesos)
+from Views.ScreenRenderer import screen
 
 # --- Clase de Vista de Carga ---
 
@@ -36,15 +27,16 @@ class LoadingView:
     async def _run(self):
         i = 0 # Inicializa un contador para saber qué frame mostrar
         
+        # 1. Limpia la consola UNA sola vez al empezar.
+        screen.clear()
+        
         # Bucle principal: se ejecuta mientras el evento '_stop_event' NO esté activado.
         while not self._stop_event.is_set():
-            # 1. Limpia la consola
-            clear()
-            
-            # 2. Imprime el frame actual.
+            # 2. Dibuja el frame actual. 'render' solo reescribe la línea
+            # que cambió (sin limpiar la pantalla ni crear procesos).
             # 'i % len(self.frames)' asegura que el índice vuelva a 0
             # cuando llegue al final de la lista (ej. 0, 1, 2, 0, 1, 2, ...)
-            print(self.frames[i % len(self.frames)])
+            screen.render([self.frames[i % len(self.frames)]])
             
             # 3. Pausa asíncrona. Esto es clave:
             # 'await asyncio.sleep' detiene ESTA tarea por 'self.delay' segundos,
@@ -75,4 +67,6 @@ class LoadingView:
         if self._task:
             # 'await self._task' espera a que la tarea '_run' termine
             # limpiamente antes de continuar.
-            await self._task
\ No newline at end of file
+            await self._task
+        # Termina el frame para que lo siguiente se escriba debajo.
+        screen.end_frame()
\ No newline at end of file
@@ -15,7 +15,8 @@ async def MainMenuView(clear, blocking_input):
     print("3. Administrar Archivos Locales")
     print("4. Configuración")
     print("5. Probar Conexión (Ping API)")
-    print("6. Salir")
+    print("6. Estadísticas de Contactos")
+    print("7. Salir")
     print("-" * 32)
     print("Estado: Tareas en segundo plano activas.")
     
@@ -26,18 +27,18 @@ async def MainMenuView(clear, blocking_input):
         try:
             # Llama y 'espera' (await) a la función de entrada asíncrona.
             # 'blocking_input' debe ser una corutina que devuelve la entrada como string.
-            option_str = await blocking_input("Seleccione una opción (1-6): ")
+            option_str = await blocking_input("Seleccione una opción (1-7): ")
             
             # Intenta convertir el string recibido en un número entero.
             # Esto lanzará un 'ValueError' si la entrada no es un número (ej. "a").
             option = int(option_str)
             
-            # Comprueba si el número está dentro del rango válido (1 a 6).
-            if 1 <= option <= 6:
+            # Comprueba si el número está dentro del rango válido (1 a 7).
+            if 1 <= option <= 7:
                 # Si es válido, devuelve el número de la opción y sale de la función.
                 return option
             else:
-                # Si el número está fuera de rango (ej. 7), informa al usuario.
+                # Si el número está fuera de rango (ej. 8), informa al usuario.
                 print("Opción no válida. Intente de nuevo.")
                 
         # Captura el error si la conversión 'int()' falló.
@@ -48,7 +48,7 @@ async def manage_config_menu(config_manager, clear, blocking_input):
         if new_interval:
             # Usa el config_manager para guardar el nuevo intervalo
             config_manager.set_download_interval(new_interval)
-            print("El cambio se aplicará en la próxima ejecución de la tarea.")
+            print("El cambio se aplicará de inmediato en la tarea de descarga.")
     
     # La opción '3' (Volver) no necesita un 'elif' porque la función
     # simplemente terminará, volviendo al bucle principal que la llamó.
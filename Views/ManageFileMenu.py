@@ -1,4 +1,93 @@
 import asyncio
+# Importa el catálogo de archivos (tamaño, fecha, registros y tipo de dataset)
+from FileCatalog import file_catalog
+# Importa la herramienta de comparación de snapshots (diff por 'id')
+import SnapshotDiff
+
+# Número máximo de cambios que se muestran al comparar dos archivos
+DIFF_LIMIT = 200
+
+# Criterios de ordenación disponibles: letra -> (descripción, clave, descendente)
+SORT_KEYS = {
+    "n": ("nombre", lambda e: e.name, False),
+    "f": ("fecha", lambda e: e.mtime_ns, True),
+    "t": ("tamaño", lambda e: e.size, True),
+    "r": ("registros", lambda e: e.records or 0, True),
+}
+
+def _format_size(size):
+    # Convierte bytes a una unidad legible (ej. 2.1 KB)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def _visible_entries(files, sort_key, filter_text, group):
+    """
+    Devuelve las entradas del catálogo que se deben mostrar,
+    ya filtradas, ordenadas y (opcionalmente) agrupadas por dataset.
+    Los archivos que el catálogo aún no conoce se omiten hasta el próximo escaneo.
+    """
+    entries = []
+    for name in files:
+        entry = file_catalog.get(name)
+        if entry is None:
+            continue
+        if filter_text and filter_text not in name.lower() and filter_text != entry.dataset:
+            continue
+        entries.append(entry)
+    _, key, reverse = SORT_KEYS[sort_key]
+    entries.sort(key=key, reverse=reverse)
+    if group:
+        # 'sort' es estable: agrupar después de ordenar mantiene el orden elegido
+        entries.sort(key=lambda e: e.dataset)
+    return entries
+
+def _parse_indices(text, count):
+    """
+    Convierte una selección como "1,3-5 8" en índices (base 0).
+    Lanza ValueError si algún número no es válido o está fuera de rango.
+    """
+    indices = []
+    for part in text.replace(",", " ").split():
+        if "-" in part:
+            first, last = (int(n) for n in part.split("-", 1))
+            numbers = range(first, last + 1)
+        else:
+            numbers = [int(part)]
+        for n in numbers:
+            if not 1 <= n <= count:
+                raise ValueError(f"Número de archivo fuera de rango: {n}")
+            if n - 1 not in indices:
+                indices.append(n - 1)
+    if not indices:
+        raise ValueError("No se indicó ningún archivo.")
+    return indices
+
+def _render_listing(state_files, sort_key, filter_text, group):
+    """
+    Calcula el listado de archivos (con sus metadatos del catálogo).
+    Devuelve (nombres en el orden mostrado, líneas de texto).
+    """
+    entries = _visible_entries(state_files, sort_key, filter_text, group)
+    # 'files' son los nombres en el MISMO orden en que se muestran.
+    files = [entry.name for entry in entries]
+    
+    # Comprueba si se encontraron archivos.
+    if not files:
+        return files, ["No se encontraron archivos .json en 'db'."]
+    # Si hay archivos, los lista con un índice numérico (empezando en 1).
+    lines = [f"Archivos disponibles en 'db' (orden: {SORT_KEYS[sort_key][0]}"
+             f"{', filtro: ' + filter_text if filter_text else ''}):"]
+    current_group = None
+    for i, entry in enumerate(entries, 1):
+        if group and entry.dataset != current_group:
+            current_group = entry.dataset
+            lines.append(f"  [{current_group}]")
+        records = "JSON inválido" if entry.error else f"{entry.records} reg."
+        lines.append(f"  {i:>3}. {entry.name:<40} {_format_size(entry.size):>9}  "
+                     f"{records:>12}  {entry.modified:%Y-%m-%d %H:%M}")
+    return files, lines
 
 # Define una función asíncrona (corutina) para el submenú de gestión de archivos.
 # Recibe:
@@ -13,42 +102,106 @@ async def manage_files_menu(clear, global_state, blocking_input, FileManager, Ba
     # Obtiene el bucle de eventos de asyncio. Se usará para ejecutar tareas bloqueantes
     # (como abrir un editor) en un hilo separado.
     loop = asyncio.get_event_loop()
+
+    # Opciones de visualización (se mantienen mientras el menú está abierto)
+    sort_key = "n"      # Ordenar por nombre
+    filter_text = ""    # Sin filtro
+    group = False       # Sin agrupar por tipo de dataset
     
-    # Inicia el bucle principal del menú (se repite hasta que el usuario elija 'q').
-    while True:
-        # Limpia la pantalla en cada iteración.
+    # Listado ya calculado y la "clave" con la que se calculó:
+    # (versión del estado, orden, filtro, agrupación). Solo se recalcula
+    # si la versión se movió o el usuario cambió cómo se muestra.
+    listing_key = None
+    files, listing = [], []
+
+    async def confirm_listing(names):
+        # Si el listado cambió mientras se escribía el comando, muestra a qué
+        # archivos corresponden los números (los del listado mostrado) y
+        # pide confirmación antes de actuar sobre ellos.
+        if not stale:
+            return True
+        print("La lista de archivos cambió mientras escribía. Los números se refieren a la que se mostraba:")
+        for name in names:
+            print(f"  - {name}")
+        answer = await blocking_input("¿Continuar? (s/n): ")
+        return answer.strip().lower() == "s"
+
+    def draw():
+        # Dibuja la pantalla completa con el listado ya calculado.
         clear()
         print("--- ADMINISTRAR ARCHIVOS ---")
-        
-        # Obtiene la lista de archivos MÁS RECIENTE desde el objeto de estado global.
-        files = global_state.get_files()
-        
-        # Comprueba si se encontraron archivos.
-        if not files:
-            print("No se encontraron archivos .json en 'db'.")
-        else:
-            # Si hay archivos, los lista con un índice numérico (empezando en 1).
-            print("Archivos disponibles en 'db':")
-            for i, filename in enumerate(files, 1):
-                print(f"  {i}. {filename}")
+        for line in listing:
+            print(line)
         
         # Muestra las opciones del menú.
         print("\nOpciones:")
         print("  'v [num]' - Ver archivo (ej: v 1)")
         print("  'a'       - Añadir nuevo archivo")
         print("  'e [num]' - Editar archivo (ej: e 2)")
-        print("  'd [num]' - Eliminar archivo (ej: d 2)")
+        print("  'd [nums]' - Eliminar uno o varios archivos (ej: d 2 / d 1,3-5)")
+        print("  'c [num] [num]' - Comparar dos archivos por 'id' (ej: c 2 1)")
+        print("  'r'       - Aplicar la política de retención (archivar snapshots antiguos)")
+        print("  's [n|f|t|r]' - Ordenar por nombre, fecha, tamaño o registros")
+        print("  'f [texto]'   - Filtrar por nombre o tipo ('f' sin texto lo quita)")
+        print("  'g'       - Agrupar por tipo de dataset (activar/desactivar)")
         print("  'q'       - Volver al menú principal")
+    
+    # Inicia el bucle principal del menú (se repite hasta que el usuario elija 'q').
+    while True:
+        # Obtiene la lista de archivos MÁS RECIENTE (y su versión) desde el
+        # objeto de estado global, de forma atómica y sin copias.
+        version, state_files = global_state.snapshot()
+        if listing_key != (version, sort_key, filter_text, group):
+            listing_key = (version, sort_key, filter_text, group)
+            files, listing = _render_listing(state_files, sort_key, filter_text, group)
+        draw()
         
         # Espera (await) la entrada del usuario usando la función asíncrona.
         # Esto no bloquea el bucle de eventos principal.
-        choice = await blocking_input("Seleccione: ")
+        # Mientras tanto, si el estado cambia (ej. el descargador guardó nuevos
+        # snapshots), NO se redibuja: borraría lo que el usuario está tecleando
+        # y cambiaría los números que está usando. Se avisa una vez y el
+        # listado se actualiza tras pulsar Enter.
+        shown_version = version
+        input_task = asyncio.ensure_future(blocking_input("Seleccione: "))
+        notified = False
+        while True:
+            change_task = asyncio.ensure_future(global_state.wait_for_change(version))
+            done, _ = await asyncio.wait({input_task, change_task}, return_when=asyncio.FIRST_COMPLETED)
+            if input_task in done:
+                change_task.cancel()
+                break
+            version, _ = global_state.snapshot()
+            if not notified:
+                notified = True
+                print("\n(La lista de archivos ha cambiado: pulse Enter para actualizarla.)")
+                print("Seleccione: ", end="", flush=True)
+        choice = input_task.result()
+        # Los números se resuelven con el listado que se MOSTRÓ ('files');
+        # si cambió entretanto, se pide confirmación (ver 'confirm_listing').
+        stale = global_state.snapshot()[0] != shown_version
         # Limpia y normaliza la entrada (quita espacios, convierte a minúsculas).
         choice = choice.strip().lower()
         
         # Si la opción es 'q' (quit/salir), rompe el bucle 'while True'.
         if choice == 'q':
             break
+
+        # --- ORDENAR / FILTRAR / AGRUPAR (s, f, g) ---
+        # Solo cambian cómo se muestra la lista: no se lee ningún archivo.
+        if choice == 'g':
+            group = not group
+            continue
+        if choice == 'f' or choice.startswith('f '):
+            filter_text = choice[2:].strip()
+            continue
+        if choice.startswith('s '):
+            if choice[2:].strip() in SORT_KEYS:
+                sort_key = choice[2:].strip()
+            else:
+                print("Criterio no válido. Use 's n', 's f', 's t' o 's r'.")
+                await asyncio.sleep(1)
+            continue
         
         # --- AÑADIR (a) ---
         if choice == 'a':
@@ -61,16 +214,72 @@ async def manage_files_menu(clear, global_state, blocking_input, FileManager, Ba
                 # en un hilo separado para no congelar la aplicación.
                 await loop.run_in_executor(None, FileManager.add_db_file, new_filename)
                 
-                # Fuerza al vigilante de archivos a recargar la lista
+                # Recarga la lista de archivos (y el catálogo)
                 # para que el nuevo archivo aparezca inmediatamente.
-                await BackgroundTasks.run_file_watcher(force_update=True)
+                await BackgroundTasks.refresh_file_list_once()
             
-            # Pausa (bloqueante) para que el usuario vea el resultado.
-            input("Presione Enter para continuar...")
+            # Pausa para que el usuario vea el resultado (en un hilo,
+            # para no bloquear el bucle de asyncio).
+            await blocking_input("Presione Enter para continuar...")
             # 'continue' salta al inicio del 'while True'
             continue
 
-        # --- MANEJO DE COMANDOS CON ARGUMENTOS (v, e, d) ---
+        # --- RETENCIÓN (r) ---
+        if choice == 'r':
+            clear()
+            # 'apply_retention_policy' es BLOQUEANTE (pide confirmación).
+            archived = await loop.run_in_executor(None, FileManager.apply_retention_policy)
+            if archived:
+                await BackgroundTasks.refresh_file_list_once()
+            await blocking_input("\nPresione Enter para continuar...")
+            continue
+
+        # --- COMPARAR (c) ---
+        if choice.startswith('c '):
+            try:
+                old_index, new_index = _parse_indices(choice[2:], len(files))
+            except ValueError:
+                print("Formato incorrecto. Use 'c [antiguo] [nuevo]' con dos archivos distintos.")
+                await asyncio.sleep(1)
+                continue
+            old_name, new_name = files[old_index], files[new_index]
+            if not await confirm_listing([old_name, new_name]):
+                continue
+            clear()
+            print(f"--- Diferencias: {old_name} -> {new_name} ---")
+            # La comparación lee ambos archivos en streaming (E/S BLOQUEANTE):
+            # se ejecuta en un hilo separado. Un archivo pudo desaparecer
+            # (retención o borrado manual) o no ser un JSON válido.
+            try:
+                await loop.run_in_executor(
+                    None, SnapshotDiff.print_diff,
+                    SnapshotDiff.resolve_path(old_name), SnapshotDiff.resolve_path(new_name), DIFF_LIMIT)
+            except (OSError, ValueError) as e:
+                print(f"Error al comparar los archivos: {e}")
+            await blocking_input("\nPresione Enter para continuar...")
+            continue
+
+        # --- ELIMINAR VARIOS (d) ---
+        if choice.startswith('d '):
+            try:
+                selected = [files[i] for i in _parse_indices(choice[2:], len(files))]
+            except ValueError as e:
+                print(f"Selección no válida: {e}")
+                await asyncio.sleep(1)
+                continue
+            if not await confirm_listing(selected):
+                continue
+            clear()
+            # 'delete_db_files' es BLOQUEANTE (pide UNA confirmación síncrona).
+            # Debe ejecutarse en un hilo separado.
+            deleted = await loop.run_in_executor(None, FileManager.delete_db_files, selected)
+            # Si se eliminó algún archivo, fuerza la recarga de la lista.
+            if deleted:
+                await BackgroundTasks.refresh_file_list_once()
+            await blocking_input("\nPresione Enter para continuar...")
+            continue
+
+        # --- MANEJO DE COMANDOS CON ARGUMENTOS (v, e) ---
         try:
             # Divide la entrada (ej. "v 1" -> ["v", "1"])
             parts = choice.split()
@@ -94,14 +303,15 @@ async def manage_files_menu(clear, global_state, blocking_input, FileManager, Ba
                 
             # Obtiene el nombre del archivo seleccionado.
             filename = files[file_index]
+            if action in ('v', 'e') and not await confirm_listing([filename]):
+                continue
             
             # --- VER (v) ---
             if action == 'v':
                 clear()
-                # 'view_db_file' es síncrona pero rápida (solo imprime).
-                # No necesita 'run_in_executor'.
-                FileManager.view_db_file(filename)
-                await blocking_input("\nPresione Enter para continuar...")
+                # 'view_db_file' es un visor paginado BLOQUEANTE (pide
+                # 'input()' en cada página). Se ejecuta en un hilo separado.
+                await loop.run_in_executor(None, FileManager.view_db_file, filename)
             
             # --- EDITAR (e) ---
             elif action == 'e':
@@ -109,22 +319,11 @@ async def manage_files_menu(clear, global_state, blocking_input, FileManager, Ba
                 # 'edit_db_file' es BLOQUEANTE (abre un editor externo).
                 # Debe ejecutarse en un hilo separado.
                 await loop.run_in_executor(None, FileManager.edit_db_file, filename)
+                # Actualiza el catálogo (tamaño, registros, hash) del archivo editado.
+                await BackgroundTasks.refresh_file_list_once()
                 await blocking_input("\nPresione Enter para continuar...")
             
-            # --- ELIMINAR (d) ---
-            elif action == 'd':
-                clear()
-                # 'delete_db_file' es BLOQUEANTE (pide confirmación síncrona).
-                # Debe ejecutarse en un hilo separado.
-                deleted = await loop.run_in_executor(None, FileManager.delete_db_file, filename)
-                
-                # Si el archivo fue realmente eliminado...
-                if deleted:
-                    # ...fuerza la recarga de la lista de archivos.
-                    await BackgroundTasks.run_file_watcher(force_update=True)
-                await blocking_input("\nPresione Enter para continuar...")
-            
-            # Si la acción no es v, e, o d
+            # Si la acción no es v ni e
             else:
                 print("Acción no reconocida.")
                 await asyncio.sleep(1)
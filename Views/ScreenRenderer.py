@@ -0,0 +1,121 @@
+# Views/ScreenRenderer.py
+# Capa mínima de dibujo en la terminal.
+# - 'clear()' limpia la pantalla con secuencias de escape ANSI, sin lanzar
+#   procesos (antes se usaba 'os.system("clear")', que crea una shell y un
+#   proceso 'clear' en cada llamada).
+# - 'render(lines)' dibuja un "frame" (lista de líneas) y, en los siguientes,
+#   solo reescribe las líneas que cambiaron respecto al frame anterior.
+# - En terminales sin soporte ANSI (TERM=dumb, salida redirigida o consola
+#   antigua de Windows) se usa texto plano.
+import os
+import sys
+
+# --- Secuencias de Escape ANSI ---
+# Cursor a la esquina superior izquierda + borrar pantalla + borrar historial
+_CLEAR = "\x1b[H\x1b[2J\x1b[3J"
+# Borrar desde el cursor hasta el final de la línea
+_CLEAR_LINE = "\x1b[K"
+# Borrar desde el cursor hasta el final de la pantalla
+_CLEAR_BELOW = "\x1b[J"
+
+def _move_to(row):
+    # Mueve el cursor al inicio de la fila 'row' (empezando en 1).
+    return f"\x1b[{row};1H"
+
+def _enable_windows_ansi(stream):
+    # Activa el modo "terminal virtual" de la consola de Windows (Windows 10+).
+    # Devuelve False si no se puede (consola antigua).
+    try:
+        import ctypes
+        import msvcrt
+        kernel32 = ctypes.windll.kernel32
+        handle = msvcrt.get_osfhandle(stream.fileno())
+        mode = ctypes.c_uint32()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        # ENABLE_VIRTUAL_TERMINAL_PROCESSING = 0x0004
+        return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))
+    except (ImportError, AttributeError, OSError, ValueError):
+        return False
+
+def supports_ansi(stream):
+    """Indica si 'stream' es una terminal que entiende secuencias ANSI."""
+    try:
+        if not stream.isatty():
+            return False
+    except (AttributeError, ValueError):
+        return False
+    if os.environ.get("TERM") == "dumb":
+        return False
+    if os.name == "nt":
+        return _enable_windows_ansi(stream)
+    return True
+
+# Define la clase Screen: recuerda el último frame dibujado.
+class Screen:
+
+    # Constructor de la clase
+    def __init__(self, stream=None):
+        self._stream = stream or sys.stdout
+        # ¿Se pueden usar secuencias ANSI? (se decide una sola vez)
+        self.ansi = supports_ansi(self._stream)
+        # Líneas del último frame dibujado con 'render'
+        self._frame = []
+
+    def clear(self):
+        """Limpia la pantalla (sin crear procesos)."""
+        self._frame = []
+        if self.ansi:
+            self._stream.write(_CLEAR)
+        else:
+            # Sin ANSI no se puede borrar: se separa con una línea en blanco.
+            self._stream.write("\n")
+        self._stream.flush()
+
+    def render(self, lines):
+        """
+        Dibuja 'lines' a partir de la primera fila de la pantalla,
+        reescribiendo solo las líneas distintas del frame anterior.
+        Se asume que la zona se limpió antes con 'clear()'.
+        """
+        lines = list(lines)
+        if lines == self._frame:
+            return
+        if self.ansi:
+            out = []
+            for row, line in enumerate(lines):
+                if row >= len(self._frame) or self._frame[row] != line:
+                    out.append(_move_to(row + 1) + line + _CLEAR_LINE)
+            # Si el frame nuevo es más corto, borra lo que sobra.
+            if len(lines) < len(self._frame):
+                out.append(_move_to(len(lines) + 1) + _CLEAR_BELOW)
+            # Deja el cursor debajo del frame (para los 'print' siguientes).
+            out.append(_move_to(len(lines) + 1))
+            self._stream.write("".join(out))
+        elif len(lines) == 1 and len(self._frame) <= 1:
+            # Texto plano, una línea: se sobrescribe con retorno de carro.
+            padding = " " * max(0, len(self._frame[0]) - len(lines[0])) if self._frame else ""
+            self._stream.write("\r" + lines[0] + padding)
+        else:
+            # Texto plano, varias líneas: se escribe el frame completo.
+            self._stream.write("\n".join(lines) + "\n")
+        self._stream.flush()
+        self._frame = lines
+
+    def end_frame(self):
+        """
+        Termina el frame actual: lo siguiente que se escriba empieza en una
+        línea nueva y el próximo 'render' vuelve a dibujar todo.
+        """
+        if self._frame and not self.ansi and len(self._frame) == 1:
+            self._stream.write("\n")
+            self._stream.flush()
+        self._frame = []
+
+# --- Instancia Global ---
+# Una única pantalla compartida por todas las vistas.
+screen = Screen()
+
+def clear():
+    """Limpia la consola (atajo para 'screen.clear()')."""
+    screen.clear()
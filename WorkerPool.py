@@ -0,0 +1,114 @@
+# WorkerPool.py
+# Pool de procesos persistente para el trabajo de CPU de la sincronización
+# (decodificar el JSON descargado, compararlo con el de disco y codificarlo
+# con 'indent=2'). Ese trabajo en el hilo principal retiene el GIL y
+# congela el menú; en procesos aparte corre en paralelo de verdad.
+#
+# El pool se crea UNA vez al arrancar y se reutiliza en cada ciclo (antes
+# se lanzaban procesos nuevos en cada sincronización). Los procesos se
+# crean la primera vez que se usan, así que crear el pool no retrasa el
+# arranque. Su tamaño es una fracción de los núcleos de la máquina
+# ("worker_pool_ratio" en 'config.json').
+import os
+import threading
+
+# Fracción de núcleos por defecto
+DEFAULT_RATIO = 0.5
+
+def pool_size(ratio, cpu_count=None):
+    """Número de procesos para 'ratio' x núcleos (al menos 1)."""
+    cpus = cpu_count or os.cpu_count() or 1
+    try:
+        return max(1, round(cpus * float(ratio)))
+    except (TypeError, ValueError):
+        return max(1, round(cpus * DEFAULT_RATIO))
+
+# Define la clase WorkerPool.
+class WorkerPool:
+
+    # Constructor de la clase
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self.size = 0
+        # Tareas enviadas y veces que se tuvo que recrear el pool
+        self.submitted = 0
+        self.restarts = 0
+
+    def start(self, config_manager=None):
+        """
+        Crea el pool (si no existe) con el tamaño de la configuración.
+        Es barato: los procesos se crean al enviar las primeras tareas.
+        """
+        with self._lock:
+            if self._executor is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                if config_manager is None:
+                    from ConfigManager import ConfigManager
+                    config_manager = ConfigManager()
+                self.size = pool_size(config_manager.get_worker_pool_ratio())
+                # "spawn" en todas las plataformas (el de Windows): la app tiene
+                # hilos vivos y un 'fork' con hilos puede dejar candados bloqueados.
+                self._executor = ProcessPoolExecutor(max_workers=self.size,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def submit(self, fn, /, *args):
+        """
+        Envía 'fn(*args)' al pool y devuelve un 'Future'. 'fn' debe ser una
+        función de nivel de módulo (se envía por nombre a los procesos).
+        Si un proceso murió (pool roto), el pool se recrea una vez.
+        """
+        from concurrent.futures.process import BrokenProcessPool
+        executor = self.start()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._discard(executor)
+            future = self.start().submit(fn, *args)
+        self.submitted += 1
+        return future
+
+    def map(self, fn, jobs, return_exceptions=False):
+        """
+        Ejecuta 'fn(*job)' para cada job en paralelo y devuelve los resultados
+        en orden. Con 'return_exceptions', un job que falla devuelve su
+        excepción en lugar de lanzarla (como 'asyncio.gather'), y se espera
+        a todos los demás.
+        """
+        from concurrent.futures.process import BrokenProcessPool
+        futures = [self.submit(fn, *job) for job in jobs]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    # Un proceso murió a mitad: se recrea el pool para la próxima vez
+                    self._discard(self._executor)
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+    def _discard(self, executor):
+        with self._lock:
+            if executor is not None and executor is self._executor:
+                self._executor = None
+                self.restarts += 1
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """Detiene los procesos (al cerrar la aplicación)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def summary(self):
+        return {"size": self.size, "running": self._executor is not None,
+                "submitted": self.submitted, "restarts": self.restarts}
+
+# --- Instancia Global ---
+worker_pool = WorkerPool()